@@ -10,6 +10,7 @@ from .recipe import InvalidRecipeError,\
 #
 from .recipe_set import InvalidRecipeSetError,\
 	RecipeSet, RecipeSetEmbed
+from .recipe_set_cache import CompiledRecipeSetCache
 #
 from .production_profiler import TargetItemNotFoundError,\
 	ProductionProfiler
@@ -16,3 +16,207 @@ class CoefficientMatrix(_scipy_m_.ndarray):
 			shape, dtype = float)
 		self.fill(0.0)
 		return self
+
+
+	def expand(self, shape) -> "CoefficientMatrix":
+		"""
+		return a new matrix with larger <shape>, filled with the values of this
+		matrix at the top-left corner and zeros elsewhere;
+		"""
+		if (shape[0] < self.shape[0]) or (shape[1] < self.shape[1]):
+			raise ValueError("cannot expand matrix to smaller shape")
+		new = type(self)(shape)
+		new[:self.shape[0], :self.shape[1]] = self
+		return new
+
+
+	@classmethod
+	def from_coo(cls, shape, row_ids, col_ids, values) -> "CoefficientMatrix":
+		"""
+		construct a matrix from coordinate (COO) triplets, in a single
+		vectorized scatter; duplicated coordinates are not allowed;
+		"""
+		new = cls(shape)
+		new[row_ids, col_ids] = values
+		return new
+
+
+	def set_row(self, row_id: int, col_ids: list, values: list) -> None:
+		"""
+		overwrite a row, all columns not in <col_ids> are set to zero;
+		"""
+		self[row_id] = 0
+		self[row_id, col_ids] = values
+		return
+
+
+	def submatrix(self, row_ids: list, col_ids: list) -> "numpy.ndarray":
+		"""
+		return the dense sub-matrix at the mesh of <row_ids> and <col_ids>, as
+		plain numpy.ndarray;
+		"""
+		return _scipy_m_.asarray(self[_scipy_m_.ix_(row_ids, col_ids)])
+
+
+	def toarray(self) -> "numpy.ndarray":
+		"""
+		return the matrix as plain numpy.ndarray;
+		"""
+		return _scipy_m_.asarray(self)
+
+
+class SparseCoefficientMatrix(object):
+	"""
+	sparse alternative of CoefficientMatrix, memory and build time scale with
+	the number of non-zero coefficients instead of #Recipes by #Items;
+
+	the matrix is kept as a compressed sparse row (CSR) matrix; on the first
+	row update, coefficients are split into rows, such that rows can be
+	updated incrementally; the CSR matrix is then re-compiled on demand for
+	slicing, and is kept until the next row update;
+	"""
+	def __init__(self, shape) -> None:
+		"""
+		PARAMETERS
+		----------
+		shape:
+			shape of the matrix, i.e. #Recipes by #Items;
+		"""
+		super(SparseCoefficientMatrix, self).__init__()
+		self.shape = (int(shape[0]), int(shape[1]))
+		# "row_id": (tuple of col_ids, tuple of values), zero rows are absent;
+		# None if not split from self._csr yet
+		self._rows = {}
+		# compiled csr_matrix, lazy load if self._rows is not None
+		self._csr = None
+		return
+
+
+	@classmethod
+	def from_coo(cls, shape, row_ids, col_ids, values)\
+			-> "SparseCoefficientMatrix":
+		"""
+		construct a matrix from coordinate (COO) triplets, in a single
+		vectorized conversion; duplicated coordinates are not allowed;
+		"""
+		new = cls(shape)
+		new._rows = None
+		new._csr = _scipy_m_.csr_matrix((
+			_scipy_m_.asarray(values, dtype = float),
+			(_scipy_m_.asarray(row_ids, dtype = int),
+			_scipy_m_.asarray(col_ids, dtype = int))), shape = new.shape)
+		return new
+
+
+	def _split_rows(self) -> dict:
+		"""
+		(internal only) return rows of self._csr, in the format of self._rows;
+		"""
+		indptr = self._csr.indptr.tolist()
+		indices = self._csr.indices.tolist()
+		data = self._csr.data.tolist()
+		return {i: (tuple(indices[a:b]), tuple(data[a:b]))\
+			for i, (a, b) in enumerate(zip(indptr[:-1], indptr[1:])) if b > a}
+
+
+	def expand(self, shape) -> "SparseCoefficientMatrix":
+		"""
+		return a new matrix with larger <shape>, filled with the values of this
+		matrix at the top-left corner and zeros elsewhere;
+		"""
+		if (shape[0] < self.shape[0]) or (shape[1] < self.shape[1]):
+			raise ValueError("cannot expand matrix to smaller shape")
+		new = type(self)(shape)
+		if self._rows is None:
+			self._rows = self._split_rows()
+		new._rows = self._rows.copy()
+		return new
+
+
+	def copy(self) -> "SparseCoefficientMatrix":
+		new = type(self)(self.shape)
+		# rows and compiled matrices are replaced but never modified in place,
+		# thus can be shared
+		new._rows = None if (self._rows is None) else self._rows.copy()
+		new._csr = self._csr
+		return new
+
+
+	def set_row(self, row_id: int, col_ids: list, values: list) -> None:
+		"""
+		overwrite a row, all columns not in <col_ids> are set to zero;
+		"""
+		if not (0 <= row_id < self.shape[0]):
+			raise IndexError("row %d is out of range" % row_id)
+		if self._rows is None:
+			self._rows = self._split_rows()
+		if len(col_ids):
+			self._rows[row_id] = (tuple(col_ids), tuple(values))
+		else:
+			self._rows.pop(row_id, None)
+		self._csr = None
+		return
+
+
+	def nnz(self) -> int:
+		"""
+		number of stored (non-zero) coefficients;
+		"""
+		if self._rows is None:
+			return self._csr.nnz
+		return sum([len(v[0]) for v in self._rows.values()])
+
+
+	def tocsr(self) -> "scipy.sparse.csr_matrix":
+		"""
+		return the compiled matrix as scipy.sparse.csr_matrix;
+		"""
+		if self._csr is None:
+			row_ids = sorted(self._rows.keys())
+			indptr = _scipy_m_.zeros(self.shape[0] + 1, dtype = int)
+			for i in row_ids:
+				indptr[i + 1] = len(self._rows[i][0])
+			indptr = indptr.cumsum()
+			indices = [j for i in row_ids for j in self._rows[i][0]]
+			data = [v for i in row_ids for v in self._rows[i][1]]
+			self._csr = _scipy_m_.csr_matrix((
+				_scipy_m_.asarray(data, dtype = float),
+				_scipy_m_.asarray(indices, dtype = int), indptr),
+				shape = self.shape)
+		return self._csr
+
+
+	def submatrix(self, row_ids: list, col_ids: list) -> "numpy.ndarray":
+		"""
+		return the dense sub-matrix at the mesh of <row_ids> and <col_ids>, as
+		plain numpy.ndarray;
+		"""
+		csr = self.tocsr()
+		return csr[_scipy_m_.asarray(row_ids, dtype = int)]\
+			[:, _scipy_m_.asarray(col_ids, dtype = int)].toarray()
+
+
+	def toarray(self) -> "numpy.ndarray":
+		"""
+		return the matrix as dense numpy.ndarray;
+		"""
+		return self.tocsr().toarray()
+
+
+	def __getstate__(self) -> dict:
+		# the compiled csr_matrix is re-compiled on demand, unless not split
+		state = vars(self).copy()
+		if self._rows is not None:
+			state["_csr"] = None
+		return state
+
+
+def get_coef_matrix_type(matrix_format: str) -> type:
+	"""
+	return the coefficient matrix class of given format, 'dense' or 'sparse';
+	"""
+	if matrix_format == "dense":
+		return CoefficientMatrix
+	elif matrix_format == "sparse":
+		return SparseCoefficientMatrix
+	raise ValueError("unrecognized matrix format '%s'" % matrix_format)
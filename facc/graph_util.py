@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 
-import itertools as _itertools_m_
 from . import scipy_interface as _scipy_m_
 
 
@@ -38,6 +37,219 @@ class UnweightedDirectedGraph(_scipy_m_.ndarray):
 		return self
 
 
+	def expand(self, size: int) -> "UnweightedDirectedGraph":
+		"""
+		return a new graph with more vertices; vertices in this graph keep
+		their ids and edges, added vertices are not connected;
+		"""
+		if size < len(self):
+			raise ValueError("cannot expand graph to fewer vertices")
+		new = type(self)(size)
+		new[:len(self), :len(self)] = self
+		return new
+
+
+	@classmethod
+	def from_edges(cls, size: int, src: list, dest: list)\
+			-> "UnweightedDirectedGraph":
+		"""
+		construct a graph of <size> vertices from edges src[i] -> dest[i], in
+		a single vectorized scatter;
+		"""
+		new = cls(size)
+		new[src, dest] = True
+		return new
+
+
+	def neighbors(self, vertex: int, direction: str = "down") -> list:
+		"""
+		return ids of direct successors ('down') or predecessors ('up') of
+		<vertex>;
+		"""
+		if direction == "down":
+			return self[vertex].nonzero()[0].tolist()
+		elif direction == "up":
+			return self[:, vertex].nonzero()[0].tolist()
+		raise ValueError("'direction' must be either 'up' or 'down'")
+
+
+	def set_neighbors(self, vertex: int, ids: list, direction: str = "down")\
+			-> None:
+		"""
+		add edges from <vertex> to <ids> ('down'), or from <ids> to <vertex>
+		('up');
+		"""
+		if direction == "down":
+			self[vertex, ids] = True
+		elif direction == "up":
+			self[ids, vertex] = True
+		else:
+			raise ValueError("'direction' must be either 'up' or 'down'")
+		return
+
+
+	def clear_vertex(self, vertex: int) -> None:
+		"""
+		remove all edges from/to <vertex>;
+		"""
+		self[vertex, :] = False
+		self[:, vertex] = False
+		return
+
+
+	def toarray(self) -> "numpy.ndarray":
+		"""
+		return the adjacency matrix as plain numpy.ndarray;
+		"""
+		return _scipy_m_.asarray(self)
+
+
+	def get_cyclic_vertex_groups(self) -> list:
+		"""
+		find all cyclic dependencies in the graph, and return a list of such
+		vertex groups which are mutually disconnected (disjoint);
+
+		RETURNS
+		-------
+		list:
+			list of found such subgraphs; each cycle (loop) is represented as
+			a <set> of indices of involved vertices;
+		"""
+		return find_cyclic_groups(self.get_successor_lists())
+
+
+	def get_successor_lists(self) -> list:
+		"""
+		return the adjacency lists of the graph, i.e. the list of direct
+		successors (as list of vertex ids) of each vertex;
+		"""
+		successors = [[] for i in range(len(self))]
+		src, dest = self.nonzero()
+		for u, v in zip(src.tolist(), dest.tolist()):
+			successors[u].append(v)
+		return successors
+
+
+class SparseUnweightedDirectedGraph(object):
+	"""
+	sparse alternative of UnweightedDirectedGraph, stored as adjacency lists;
+	memory and traversal cost scale with the number of edges instead of N by
+	N vertices;
+
+	both successors and predecessors of each vertex are kept as sorted tuples
+	of vertex ids; tuples are replaced but never modified in place, thus
+	copies of the graph share them;
+	"""
+	def __init__(self, size: int) -> None:
+		"""
+		PARAMETERS
+		----------
+		size:
+			number of vertices;
+		"""
+		super(SparseUnweightedDirectedGraph, self).__init__()
+		self._succ = [()] * size
+		self._pred = [()] * size
+		return
+
+
+	@classmethod
+	def from_edges(cls, size: int, src: list, dest: list)\
+			-> "SparseUnweightedDirectedGraph":
+		"""
+		construct a graph of <size> vertices from edges src[i] -> dest[i];
+		duplicated edges are merged;
+		"""
+		succ = [set() for i in range(size)]
+		pred = [set() for i in range(size)]
+		for u, v in zip(map(int, src), map(int, dest)):
+			succ[u].add(v)
+			pred[v].add(u)
+		new = cls(0)
+		new._succ = [tuple(sorted(i)) for i in succ]
+		new._pred = [tuple(sorted(i)) for i in pred]
+		return new
+
+
+	def __len__(self) -> int:
+		return len(self._succ)
+
+
+	@property
+	def shape(self) -> tuple:
+		return (len(self), len(self))
+
+
+	def __getitem__(self, key: tuple) -> bool:
+		"""
+		graph[u, v] is True if edge u -> v exists;
+		"""
+		u, v = key
+		return v in self._succ[u]
+
+
+	def copy(self) -> "SparseUnweightedDirectedGraph":
+		new = type(self)(0)
+		new._succ = self._succ.copy()
+		new._pred = self._pred.copy()
+		return new
+
+
+	def expand(self, size: int) -> "SparseUnweightedDirectedGraph":
+		"""
+		return a new graph with more vertices; vertices in this graph keep
+		their ids and edges, added vertices are not connected;
+		"""
+		if size < len(self):
+			raise ValueError("cannot expand graph to fewer vertices")
+		new = self.copy()
+		new._succ.extend([()] * (size - len(self)))
+		new._pred.extend([()] * (size - len(self)))
+		return new
+
+
+	def neighbors(self, vertex: int, direction: str = "down") -> tuple:
+		"""
+		return ids of direct successors ('down') or predecessors ('up') of
+		<vertex>;
+		"""
+		if direction == "down":
+			return self._succ[vertex]
+		elif direction == "up":
+			return self._pred[vertex]
+		raise ValueError("'direction' must be either 'up' or 'down'")
+
+
+	def set_neighbors(self, vertex: int, ids: list, direction: str = "down")\
+			-> None:
+		"""
+		add edges from <vertex> to <ids> ('down'), or from <ids> to <vertex>
+		('up');
+		"""
+		if direction == "down":
+			fwd, bwd = self._succ, self._pred
+		elif direction == "up":
+			fwd, bwd = self._pred, self._succ
+		else:
+			raise ValueError("'direction' must be either 'up' or 'down'")
+		ids = set(ids)
+		fwd[vertex] = tuple(sorted(ids.union(fwd[vertex])))
+		for i in ids:
+			bwd[i] = tuple(sorted(set(bwd[i]) | {vertex}))
+		return
+
+
+	def clear_vertex(self, vertex: int) -> None:
+		"""
+		remove all edges from/to <vertex>;
+		"""
+		for fwd, bwd in [(self._succ, self._pred), (self._pred, self._succ)]:
+			for i in fwd[vertex]:
+				bwd[i] = tuple([j for j in bwd[i] if j != vertex])
+			fwd[vertex] = ()
+		return
+
+
 	def get_cyclic_vertex_groups(self) -> list:
 		"""
 		find all cyclic dependencies in the graph, and return a list of such
@@ -49,7 +261,25 @@ class UnweightedDirectedGraph(_scipy_m_.ndarray):
 			list of found such subgraphs; each cycle (loop) is represented as
 			a <set> of indices of involved vertices;
 		"""
-		return self._extract_cycles(self)
+		return find_cyclic_groups(self._succ)
+
+
+	def get_successor_lists(self) -> list:
+		"""
+		return the adjacency lists of the graph, i.e. the list of direct
+		successors (as tuple of vertex ids) of each vertex;
+		"""
+		return list(self._succ)
+
+
+	def toarray(self) -> "numpy.ndarray":
+		"""
+		return the adjacency matrix as dense numpy.ndarray;
+		"""
+		ret = _scipy_m_.zeros((len(self), len(self)), dtype = bool)
+		for u, vs in enumerate(self._succ):
+			ret[u, list(vs)] = True
+		return ret
 
 
 	#@staticmethod
@@ -120,159 +350,501 @@ class UnweightedDirectedGraph(_scipy_m_.ndarray):
 	#	return _adj[_scipy_m_.ix_(mask_ids, mask_ids)], mask_ids
 
 
-	@staticmethod
-	def _extract_cycles(
-			_adj: _scipy_m_.ndarray,
-		) -> list:
+class BipartiteIndex(object):
+	"""
+	integer index between two kinds of vertices, rows (e.g. Recipes) and
+	columns (e.g. Items), with directed edges in both ways, i.e. row -> column
+	(e.g. products) and column -> row (e.g. inputs); memory and build time
+	scale with the number of edges, unlike links between rows, which may grow
+	quadratic with the number of rows sharing a column;
+
+	the index is kept in both directions, i.e. the columns of each row and the
+	rows of each column, as sorted tuples of ids; tuples are replaced but never
+	modified in place, thus copies of the index share them;
+
+	the condensation of the index and reachability queries on it are
+	memoized, see get_condensation() and reachable_row_mask(); the memo is
+	dropped on any modification;
+	"""
+	def __init__(self, shape) -> None:
 		"""
-		extract cycles in given adjacency matrix;
+		PARAMETERS
+		----------
+		shape:
+			number of rows by number of columns;
+		"""
+		super(BipartiteIndex, self).__init__()
+		self.shape = (int(shape[0]), int(shape[1]))
+		# columns of rows, row -> column ('down') and column -> row ('up')
+		self._row_down = [()] * self.shape[0]
+		self._row_up = [()] * self.shape[0]
+		# rows of columns, column -> row ('down') and row -> column ('up')
+		self._col_down = [()] * self.shape[1]
+		self._col_up = [()] * self.shape[1]
+		# memoized condensation and reachability, lazy load; see
+		# get_condensation() and _get_reach_memo()
+		self._condensation = None
+		self._reach = None
+		return
+
+
+	def __getstate__(self) -> dict:
+		# the memo is rebuilt on demand
+		state = vars(self).copy()
+		state["_condensation"] = None
+		state["_reach"] = None
+		return state
+
+
+	@classmethod
+	def from_edges(cls, shape, down_edges: tuple, up_edges: tuple)\
+			-> "BipartiteIndex":
+		"""
+		construct an index from edges; duplicated edges are merged;
 
 		PARAMETERS
 		----------
-		_adj:
-			input graph represented in adjacency matrix;
+		shape:
+			number of rows by number of columns;
+
+		down_edges:
+			(row ids, column ids), i.e. edges row_ids[i] -> col_ids[i];
+
+		up_edges:
+			(row ids, column ids), i.e. edges col_ids[i] -> row_ids[i];
+		"""
+		new = cls(shape)
+		for (row_ids, col_ids), row_attr, col_attr in [
+				(down_edges, "_row_down", "_col_up"),
+				(up_edges, "_row_up", "_col_down"),
+			]:
+			row_cols = [set() for i in range(new.shape[0])]
+			col_rows = [set() for i in range(new.shape[1])]
+			for r, c in zip(map(int, row_ids), map(int, col_ids)):
+				row_cols[r].add(c)
+				col_rows[c].add(r)
+			setattr(new, row_attr, [tuple(sorted(i)) for i in row_cols])
+			setattr(new, col_attr, [tuple(sorted(i)) for i in col_rows])
+		return new
+
+
+	def copy(self) -> "BipartiteIndex":
+		new = type(self)((0, 0))
+		new.shape = self.shape
+		for attr in ["_row_down", "_row_up", "_col_down", "_col_up"]:
+			setattr(new, attr, getattr(self, attr).copy())
+		return new
+
+
+	def expand(self, shape) -> "BipartiteIndex":
+		"""
+		return a new index with more rows and/or columns; existing rows and
+		columns keep their ids and edges, added ones are not connected;
+		"""
+		if (shape[0] < self.shape[0]) or (shape[1] < self.shape[1]):
+			raise ValueError("cannot expand index to smaller shape")
+		new = self.copy()
+		n_rows, n_cols = int(shape[0]) - self.shape[0],\
+			int(shape[1]) - self.shape[1]
+		new._row_down.extend([()] * n_rows)
+		new._row_up.extend([()] * n_rows)
+		new._col_down.extend([()] * n_cols)
+		new._col_up.extend([()] * n_cols)
+		new.shape = (int(shape[0]), int(shape[1]))
+		return new
+
+
+	def row_neighbors(self, row: int, direction: str = "down") -> tuple:
+		"""
+		return ids of columns <row> points to ('down'), or pointing to <row>
+		('up');
+		"""
+		if direction == "down":
+			return self._row_down[row]
+		elif direction == "up":
+			return self._row_up[row]
+		raise ValueError("'direction' must be either 'up' or 'down'")
+
+
+	def col_neighbors(self, col: int, direction: str = "down") -> tuple:
+		"""
+		return ids of rows <col> points to ('down'), or pointing to <col>
+		('up');
+		"""
+		if direction == "down":
+			return self._col_down[col]
+		elif direction == "up":
+			return self._col_up[col]
+		raise ValueError("'direction' must be either 'up' or 'down'")
+
+
+	def col_degrees(self, direction: str = "down") -> "numpy.ndarray":
+		"""
+		return the number of rows each column points to ('down'), or pointing
+		to each column ('up'), as int array;
+		"""
+		col_rows = self._get_direction_lists(direction)[1]
+		return _scipy_m_.fromiter(map(len, col_rows), dtype = int,
+			count = len(col_rows))
+
+
+	def set_row(self, row: int, down_cols: list, up_cols: list) -> None:
+		"""
+		overwrite the edges of a row, i.e. row -> <down_cols> and <up_cols>
+		-> row; previous edges of this row are removed;
+		"""
+		if not (0 <= row < self.shape[0]):
+			raise IndexError("row %d is out of range" % row)
+		for cols, row_cols, col_rows in [
+				(down_cols, self._row_down, self._col_up),
+				(up_cols, self._row_up, self._col_down),
+			]:
+			self._condensation = None
+			self._reach = None
+			old, new = set(row_cols[row]), set(cols)
+			for c in old - new:
+				col_rows[c] = tuple([i for i in col_rows[c] if i != row])
+			for c in new - old:
+				col_rows[c] = tuple(sorted(col_rows[c] + (row, )))
+			row_cols[row] = tuple(sorted(new))
+		return
+
+
+	def clear_row(self, row: int) -> None:
+		"""
+		remove all edges from/to <row>;
+		"""
+		self.set_row(row, (), ())
+		return
+
+
+	def row_successors(self, row: int, direction: str = "down") -> set:
+		"""
+		return ids of rows directly connected to <row> through any column, in
+		<direction>; e.g. Recipes consuming any product of the Recipe
+		('down'), or producing any of its inputs ('up');
+		"""
+		row_cols, col_rows = self._get_direction_lists(direction)
+		ret = set()
+		for c in row_cols[row]:
+			ret.update(col_rows[c])
+		return ret
+
+
+	def reachable_rows(self, col_ids: list, direction: str = "down") -> set:
+		"""
+		return ids of all rows reachable from given columns in <direction>,
+		both directly and indirectly; each column is visited only once, thus
+		time complexity is linear to the number of edges involved;
+		"""
+		row_cols, col_rows = self._get_direction_lists(direction)
+		visited_cols = set(col_ids)
+		stack = list(visited_cols)
+		ret = set()
+		while stack:
+			for r in col_rows[stack.pop()]:
+				if r in ret:
+					continue
+				ret.add(r)
+				for c in row_cols[r]:
+					if c not in visited_cols:
+						visited_cols.add(c)
+						stack.append(c)
+		return ret
+
+
+	def reachable_row_mask(self, col_ids: list, direction: str = "down")\
+			-> int:
+		"""
+		return the bitset (as int, bit i for row i) of all rows reachable from
+		given columns in <direction>, both directly and indirectly; same as
+		reachable_rows(), but memoized, thus repeated queries are only bitwise
+		ORs of cached closures; see bitset_to_ids();
+
+		reachability is memoized per strongly connected component of the
+		index, i.e. rows and columns mutually reachable share one closure;
+		closures are resolved lazily, only for components reached by queries;
+		"""
+		if direction not in ["up", "down"]:
+			raise ValueError("'direction' must be either 'up' or 'down'")
+		dag = self.get_condensation()
+		row_mask = self._get_reach_memo()["row_mask"]
+		ret = 0
+		for c in col_ids:
+			comp = dag.component_of[self.shape[0] + c]
+			ret |= self._get_component_reach(comp, direction)
+			# rows in a cyclic component are reachable from themselves
+			if dag.cyclic[comp]:
+				ret |= row_mask[comp]
+		return ret
+
+
+	def get_condensation(self) -> "CondensationDAG":
+		"""
+		return the condensation of the index (lazy load), i.e. the DAG of its
+		strongly connected components; edges are row -> column (products) and
+		column -> row (inputs); rows are vertices 0, ..., #rows - 1, and
+		columns are vertices #rows + column id; see CondensationDAG;
+		"""
+		if self._condensation is None:
+			n_rows = self.shape[0]
+			successors = [[n_rows + c for c in cols] for cols in self._row_down]
+			successors.extend(self._col_down)
+			self._condensation = CondensationDAG(successors)
+		return self._condensation
+
+
+	def _get_reach_memo(self) -> dict:
+		"""
+		(internal only) return the reachability memo (lazy load), dict of:
+		"row_mask": bitset of rows in each component of the condensation;
+		"up"/"down": dicts of memoized "component": bitset of rows reachable in
+			that direction, excluding the component itself;
+		"""
+		if self._reach is None:
+			dag = self.get_condensation()
+			n_rows = self.shape[0]
+			row_mask = []
+			for comp in dag.components:
+				mask = 0
+				for v in comp:
+					if v < n_rows:
+						mask |= 1 << v
+				row_mask.append(mask)
+			self._reach = dict(row_mask = row_mask, up = {}, down = {})
+		return self._reach
+
+
+	def _get_component_reach(self, comp: int, direction: str) -> int:
+		"""
+		(internal only) return the memoized bitset of rows reachable from a
+		component, resolving closures of all components after it (in
+		<direction>) not memoized yet, in post-order;
+		"""
+		dag = self.get_condensation()
+		reach = self._get_reach_memo()
+		row_mask, memo = reach["row_mask"], reach[direction]
+		adj = dag.successors if direction == "down" else dag.predecessors
+		stack = [comp]
+		while stack:
+			comp = stack[-1]
+			if comp in memo:
+				stack.pop()
+				continue
+			pending = [i for i in adj[comp] if i not in memo]
+			if pending:
+				# condensation is acyclic, thus this terminates
+				stack.extend(pending)
+				continue
+			mask = 0
+			for i in adj[comp]:
+				mask |= memo[i] | row_mask[i]
+			memo[comp] = mask
+			stack.pop()
+		return memo[comp]
+
+
+	def _get_direction_lists(self, direction: str) -> tuple:
+		"""
+		(internal only) return the (row -> columns, column -> rows) lists of
+		traversal in <direction>;
+		"""
+		if direction == "down":
+			return self._row_down, self._col_down
+		elif direction == "up":
+			return self._row_up, self._col_up
+		raise ValueError("'direction' must be either 'up' or 'down'")
+
+
+	def get_cyclic_row_groups(self, row_ids: list = None) -> list:
+		"""
+		find all disjoint cyclic row groups, i.e. rows mutually reachable
+		through columns; the traversal is restricted to <row_ids> if given, or
+		all rows if None; a single row is cyclic only if it points to a column
+		pointing back to itself; see find_cyclic_groups();
 
 		RETURNS
 		-------
-		list of cycles (loops)
-		"""
-		# this algorithm is a stack version of recursive call simplified as:
-		# -- pseudocode --------------------------------------------------------
-		# /* this stack serves as the visit history */
-		# visit_stack <- [start node]
-		# function travel_next(visit_stack, found_loops&)
-		# {
-		#     /* visiting node: visit_stack->top() */
-		#     node = visit_stack->top()
-		#     if (node in visit_stack) /* already visited */
-		#     {
-		#         found_loops->add_path(
-		#             start=visit_stack->first_time(node),
-		#             end=visit_stack->current)
-		#         )
-		#         return
-		#     }
-		#     else
-		#     {
-		#         visit_stack->push(node)
-		#         for (next_node in node->next())
-		#         {
-		#             travel_next(next_node)
-		#         }
-		#         visit_stack->pop() /* pop self, i.e. pop(node) */
-		#         return
-		#     }
-		# }
-		# ----------------------------------------------------------------------
-		# this algorithm has time complexity O(N * M), space complexity O(N * M)
-		# where: N=number of nodes, M=avg edges of all nodes
-		cycles = []
-		notyet_visited = _scipy_m_.ones(len(_adj), dtype = bool)
-		while notyet_visited.any():
-			# operate in a small matrix
-			nyvis_trues = notyet_visited.nonzero()[0]
-			mapback = lambda x: _scipy_m_.take(nyvis_trues, list(x))
-			# w_adj is the working adjacency matrix that we only interested in
-			# other nodes are masked out
-			w_adj = _adj[_scipy_m_.ix_(nyvis_trues, nyvis_trues)]
-			_size = len(w_adj)
-			# initialize
-			# this is used to finally update mask, i.e. nodes are ever visited
-			# those nodes are not worthy visited again by the caller
-			curr_visited_nodes = set({0})
-			# visit path stack trace
-			visited_path = [0]
-			# candidate nodes to visit in next step
-			# list of lists
-			to_visit = [w_adj[0].nonzero()[0].tolist()]
-			# travel
-			while visited_path:
-				next_visit = to_visit[-1]
-				#print(visited_path)
-				# visit each node in next_visit
-				while next_visit:
-					_vid = next_visit.pop()
-					if _vid not in visited_path:
-						# add _vid to visited list
-						curr_visited_nodes.add(_vid)
-						# check if this node connects to downstream nodes
-						# no downstream connections cannot be in a loop
-						ds_conn = w_adj[_vid].nonzero()[0].tolist()
-						if ds_conn:
-							# append for deep travel
-							visited_path.append(_vid)
-							to_visit.append(ds_conn)
-							break
-					else:
-						# found cycle
-						# find the first occur of _vid, the start of cycle
-						_id = visited_path.index(_vid)
-						# add to cycle list
-						cycle_path = visited_path[_id:]
-						cycles.append(set(mapback(cycle_path)))
-						continue
-				#else:
-				if not to_visit[-1]:
-					to_visit.pop()
-					visited_path.pop()
-			# update mask
-			notyet_visited[mapback(curr_visited_nodes)] = False
-		# combine if two cycles share vertex/edge(s)
-		UnweightedDirectedGraph.\
-			_union_all_non_disjoint(cycles, inplace = True)
-		# debug
-		assert all([isinstance(i, set) for i in cycles]),\
-			"cycles assumed to be sets"
-		return cycles
-
-
-	@staticmethod
-	def _union_all_non_disjoint(
-			set_list: list,
-			inplace: bool = False
-		) -> list:
-		"""
-		union all non-disjoint sets in a list;
+		list of cyclic groups, each as a <set> of row ids;
+		"""
+		if row_ids is None:
+			# cyclic components always have rows, as rows/columns alternate
+			dag = self.get_condensation()
+			return [{v for v in comp if v < self.shape[0]}\
+				for comp, cyc in zip(dag.components, dag.cyclic) if cyc]
+		rows = sorted(set(row_ids))
+		# local vertex ids: rows first, then involved columns
+		row_vid = {r: i for i, r in enumerate(rows)}
+		col_vid, cols = {}, []
+		successors = []
+		for r in rows:
+			succ = []
+			for c in self._row_down[r]:
+				if c not in col_vid:
+					col_vid[c] = len(row_vid) + len(cols)
+					cols.append(c)
+				succ.append(col_vid[c])
+			successors.append(succ)
+		for c in cols:
+			successors.append([row_vid[r] for r in self._col_down[c]\
+				if r in row_vid])
+		n_rows = len(row_vid)
+		ret = []
+		for scc in strongly_connected_components(successors):
+			group = [rows[v] for v in scc if v < n_rows]
+			# a single row with more vertices is a row-column-row loop
+			if (len(group) >= 2) or (group and (len(scc) >= 2)):
+				ret.append(set(group))
+		return ret
 
+
+class CondensationDAG(object):
+	"""
+	condensation of a directed graph, i.e. the DAG with each strongly
+	connected component (SCC) collapsed into a single node;
+
+	components are numbered in topological order, i.e. edges only go from a
+	component to latter ones; the level of a component is the length of the
+	longest path to it from any source component (level 0), thus components
+	of the same level are mutually independent, and can be processed in
+	batch, level by level;
+	"""
+	def __init__(self, successors: list) -> None:
+		"""
 		PARAMETERS
 		----------
-		set_list:
-			list of sets;
+		successors:
+			adjacency lists of the graph; see strongly_connected_components();
+		"""
+		super(CondensationDAG, self).__init__()
+		sccs = strongly_connected_components(successors)
+		sccs.reverse()
+		# vertices of each component, as sorted tuple
+		self.components = [tuple(sorted(i)) for i in sccs]
+		self.component_of = [0] * len(successors)
+		for i, comp in enumerate(self.components):
+			for v in comp:
+				self.component_of[v] = i
+		# True if the component has any cycle, i.e. more than one vertex, or a
+		# single vertex with self-loop
+		self.cyclic = [(len(comp) >= 2) or (comp[0] in successors[comp[0]])\
+			for comp in self.components]
+		succ = [set() for i in self.components]
+		pred = [set() for i in self.components]
+		for u, vs in enumerate(successors):
+			cu = self.component_of[u]
+			for v in vs:
+				cv = self.component_of[v]
+				if cu != cv:
+					succ[cu].add(cv)
+					pred[cv].add(cu)
+		# component adjacency lists, as sorted tuples
+		self.successors = [tuple(sorted(i)) for i in succ]
+		self.predecessors = [tuple(sorted(i)) for i in pred]
+		# in topological order, all predecessors are already resolved
+		self.levels = [0] * len(self.components)
+		for i, ps in enumerate(self.predecessors):
+			if ps:
+				self.levels[i] = max([self.levels[p] for p in ps]) + 1
+		return
 
-		inplace:
-			True if changes made inplace on the input list;
 
-		RETURNS
-		-------
-		list of disjoint sets;
-		"""
-		# this is the naive algorithm doing this task
-		# comparing each set with every others
-		# joint if intersecting non-null
-		# this algorithm has time complexity O(N * M * P), space complexity O(N)
-		# where: N=number of initial sets, M=number of final sets
-		# P=avg. time doing check disjoint and make union,
-		# which is roughly O(avg n) i.e. average number of elements each set,
-		# (since python's set is implimented as hashes)
-		wk_list = set_list if inplace else list(set_list)
-		while True:
-			# NOTE: wk_list is changed within iterations
-			for (i, set_i), (j, set_j) in _itertools_m_.\
-				combinations(enumerate(wk_list), r = 2):
-				if not set_i.isdisjoint(set_j):
-					wk_list[i] = set_i.union(set_j)
-					# remove the union'd set
-					# NOTE: index for set_j starts from i + 1
-					del wk_list[j]
-					# now need to jump of two nested loops
-					# since wk_list has been changed
+	def __len__(self) -> int:
+		return len(self.components)
+
+
+	def get_level_groups(self) -> list:
+		"""
+		return component ids grouped by level, i.e. the i-th list has all
+		components of level i;
+		"""
+		ret = [[] for i in range(max(self.levels) + 1)] if self.levels else []
+		for i, lv in enumerate(self.levels):
+			ret[lv].append(i)
+		return ret
+
+
+def strongly_connected_components(successors: list) -> list:
+	"""
+	find strongly connected components (SCC) of a directed graph, with the
+	iterative version of Tarjan's algorithm; time complexity is O(V + E);
+
+	PARAMETERS
+	----------
+	successors:
+		adjacency lists of the graph, i.e. successors[u] is the iterable of
+		direct successors of vertex u; vertices are 0, 1, ..., V - 1;
+
+	RETURNS
+	-------
+	list of SCCs, each as a list of vertex ids; SCCs are in reverse
+	topological order, i.e. no edges from an SCC to any latter ones;
+	"""
+	n_vertices = len(successors)
+	index = [-1] * n_vertices
+	lowlink = [0] * n_vertices
+	on_stack = [False] * n_vertices
+	stack, sccs, counter = [], [], 0
+	for root in range(n_vertices):
+		if index[root] != -1:
+			continue
+		index[root] = lowlink[root] = counter
+		counter += 1
+		stack.append(root)
+		on_stack[root] = True
+		# call stack of (vertex, iterator of its unvisited successors)
+		work = [(root, iter(successors[root]))]
+		while work:
+			v, it = work[-1]
+			for w in it:
+				if index[w] == -1:
+					# descend into w, v is resumed from the iterator later
+					index[w] = lowlink[w] = counter
+					counter += 1
+					stack.append(w)
+					on_stack[w] = True
+					work.append((w, iter(successors[w])))
 					break
-			# outer loop
-			# else -> above break is not called
-			# -> nothing special find in past round
-			# -> should break
-			# otherwise, continue
+				elif on_stack[w] and (index[w] < lowlink[v]):
+					lowlink[v] = index[w]
 			else:
-				break
-			continue
-		return wk_list
+				# all successors of v done, return to caller
+				work.pop()
+				if work and (lowlink[v] < lowlink[work[-1][0]]):
+					lowlink[work[-1][0]] = lowlink[v]
+				if lowlink[v] == index[v]:
+					scc = []
+					while True:
+						w = stack.pop()
+						on_stack[w] = False
+						scc.append(w)
+						if w == v:
+							break
+					sccs.append(scc)
+	return sccs
+
+
+def find_cyclic_groups(successors: list) -> list:
+	"""
+	find all disjoint cyclic vertex groups of a directed graph, i.e. SCCs with
+	more than one vertex, or a single vertex with a self-loop; see
+	strongly_connected_components() for more information;
+
+	RETURNS
+	-------
+	list of cyclic groups, each as a <set> of vertex ids;
+	"""
+	return [set(scc) for scc in strongly_connected_components(successors)\
+		if (len(scc) >= 2) or (scc[0] in successors[scc[0]])]
+
+
+def bitset_to_ids(mask: int) -> list:
+	"""
+	return the sorted ids of set bits in <mask>, e.g. 0b1010 -> [1, 3];
+	"""
+	bits = bin(mask)[:1:-1]
+	ret, i = [], bits.find("1")
+	while i >= 0:
+		ret.append(i)
+		i = bits.find("1", i + 1)
+	return ret
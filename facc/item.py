@@ -1,26 +1,145 @@
 #!/usr/bin/env python3
 
+import sys as _sys_m_
 import warnings as _warnings_m_
 import textwrap as _textwrap_m_
+from . import scipy_interface as _scipy_m_
+
+
+def _flag_property(bit: int, doc: str) -> property:
+	"""
+	(internal only) make a bool property stored as <bit> of self._bits;
+	"""
+	def fget(self) -> bool:
+		return bool(self._bits & bit)
+	def fset(self, value: bool) -> None:
+		self._bits = (self._bits | bit) if value else (self._bits & ~bit)
+	return property(fget, fset, doc = doc)
+
+
+class ItemFlagStore(object):
+	"""
+	packed flags of many Items, as an array of bits (uint8) indexed by Item
+	id, e.g. of a RecipeSet.item_encoder; ItemFlags bound to the store read
+	and write their bits here, thus flags of all Items can be queried or set
+	as array operations; see ItemFlags.bind();
+
+	<version> is incremented on every write through bound ItemFlags; code
+	writing <bits> directly must increment it as well, so that results
+	derived from the flags can tell if they are still valid;
+	"""
+	__slots__ = ("bits", "version")
+
+
+	def __init__(self, size: int = 0) -> None:
+		"""
+		PARAMETERS
+		----------
+		size:
+			number of Items, all flags are False;
+		"""
+		super(ItemFlagStore, self).__init__()
+		self.bits = _scipy_m_.zeros(size, dtype = "uint8")
+		self.version = 0
+		return
+
+
+	def resize(self, size: int) -> None:
+		"""
+		grow the store to <size> Items, flags of added Items are False; bound
+		ItemFlags are kept bound;
+		"""
+		if size > len(self.bits):
+			self.bits = _scipy_m_.hstack([self.bits,
+				_scipy_m_.zeros(size - len(self.bits), dtype = "uint8")])
+		return
 
 
 class ItemFlags(object):
+	"""
+	flags of an Item, packed as bits of a single int; either kept locally, or
+	bound to a slot of an ItemFlagStore;
+	"""
+	__slots__ = ("_local", "_store", "_index")
+	_PRODUCT_OF_COMPLEX_RECIPE_ = 1 << 0
+	_CYCLIC_PRODUCT_ = 1 << 1
+	_TRIVIAL_ = 1 << 2
+	_FORCED_RAW_ = 1 << 3
+
+	product_of_complex_recipe = _flag_property(_PRODUCT_OF_COMPLEX_RECIPE_,
+		"True if one or more source recipe is multi-product")
+	cyclic_product = _flag_property(_CYCLIC_PRODUCT_,
+		"True if is unique product of a set of cyclic recipes")
+	trivial = _flag_property(_TRIVIAL_,
+		"True if manually set trivial")
+	forced_raw = _flag_property(_FORCED_RAW_,
+		"True if manually set as raw input")
+	# "flag name": bit
+	_flag_bits_ = dict(product_of_complex_recipe = _PRODUCT_OF_COMPLEX_RECIPE_,
+		cyclic_product = _CYCLIC_PRODUCT_, trivial = _TRIVIAL_,
+		forced_raw = _FORCED_RAW_)
+
+
 	def __init__(self):
 		super(ItemFlags, self).__init__()
-		# True if one or more source recipe is multi-product
-		self.product_of_complex_recipe = False
-		# True if is unique product of a set of cyclic recipes
-		self.cyclic_product = False
-		# True if manually set trivial
-		self.trivial = False
-		# True if manually set as raw input
-		self.forced_raw = False
+		# all flags are False
+		self._local = 0
+		# the bound ItemFlagStore and the slot, see bind()
+		self._store = None
+		self._index = None
+		return
+
+
+	@property
+	def _bits(self) -> int:
+		if self._store is None:
+			return self._local
+		return int(self._store.bits[self._index])
+
+
+	@_bits.setter
+	def _bits(self, value: int) -> None:
+		if self._store is None:
+			self._local = value
+		else:
+			self._store.bits[self._index] = value
+			self._store.version += 1
 		return
 
 
+	def bind(self, store: ItemFlagStore, index: int) -> None:
+		"""
+		store the flags in slot <index> of <store> from now on; current values
+		are written into the slot;
+		"""
+		bits = self._bits
+		self._store, self._index = store, index
+		self._bits = bits
+		return
+
+
+	def unbind(self) -> None:
+		"""
+		keep the flags locally from now on; current values are kept;
+		"""
+		self._local = self._bits
+		self._store, self._index = None, None
+		return
+
+
+	def is_bound_to(self, store: ItemFlagStore) -> bool:
+		"""
+		return True if the flags are stored in <store>;
+		"""
+		return self._store is store
+
+
 	def copy(self):
+		"""
+		return an unbound copy with identical values;
+		"""
 		ret = type(self)()
-		vars(ret).update(vars(self))
+		ret._local = self._bits
 		return ret
 
 
@@ -28,6 +147,9 @@ class Item(object):
 	"""
 	items caches the dependencies between Recipes:
 	"""
+	# no per-instance __dict__, large databases have tens of thousands Items
+	__slots__ = ("name", "input_of", "product_of", "flags")
+
 	def __init__(self,
 			name: str,
 			input_of: set = set(),
@@ -59,7 +181,7 @@ class Item(object):
 		super(Item, self).__init__()
 		if not isinstance(name, str):
 			raise TypeError("'name' must be of type 'str'")
-		self.name = name
+		self.name = _sys_m_.intern(name)
 		self.input_of = set(input_of)
 		self.product_of = set(product_of)
 		self.flags = ItemFlags() if flags is None else flags.copy()
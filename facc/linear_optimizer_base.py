@@ -117,8 +117,7 @@ class LinearOptimizerBase(object):
 		"""
 		# input as a list of Items
 		# first, retrieve all related recipes of this Item
-		all_recipes = _collections_m_.ChainMap(\
-			*[self.fetch_recipes_in_dependency(i, "up") for i in items])
+		all_recipes = self.fetch_recipes_in_dependency_of_items(items, "up")
 		# second, recipes
 		#   1. get names
 		recipe_names = sorted(all_recipes.keys()) # sort is optional
@@ -132,8 +131,8 @@ class LinearOptimizerBase(object):
 		#   2. encode into ids
 		item_ids = self.get_item_encoder().encode(item_names)
 		# slice matrix
-		mesh = _scipy_m_.ix_(recipe_ids, item_ids)
-		coef_matrix = self.get_recipe_set().get_coef_matrix()[mesh]
+		coef_matrix = self.get_recipe_set().get_coef_matrix().\
+			submatrix(recipe_ids, item_ids)
 		# building return values
 		attr_set = LinearOptimizerAttributeSet()
 		attr_set.recipe_names = recipe_names
@@ -182,12 +182,14 @@ class LinearProgrammingOptimizer(_linear_optimizer_base_m_.LinearOptimizerBase):
 		ignore = optim_args["ignore_trivial"]
 		wts = _collections_m_.defaultdict(lambda : 1.0,\
 			optim_args.get("weights", None))
-		for k in optim_data.item_names:
+		trivials = self.get_recipe_set().get_item_flag_mask("trivial",
+			optim_data.item_ids)
+		for k, trivial in zip(optim_data.item_names, trivials):
 			# update trivial items with values 0 only if
 			# 1) not set yet, and
 			# 2) ignore_trivial is False, and
 			# 3) this item is marked trivial
-			if (k not in wts) and (not ignore) and self.get_item(k).is_trivial():
+			if (k not in wts) and (not ignore) and trivial:
 				wts[k] = 0.0
 			# no need to set others
 		# replace original wts
@@ -227,7 +229,8 @@ class LinearProgrammingOptimizer(_linear_optimizer_base_m_.LinearOptimizerBase):
 		########################################################################
 		# mask each sub matrix by conditions
 		# c: is the raw inputs, including trivial if not ignored
-		c_bool = [self.get_item(i).is_raw(ignore_trivial) for i in _opt.item_names]
+		c_bool = self.get_recipe_set().get_item_raw_mask(_opt.item_ids,
+			ignore_trivial)
 		# A_eq, b_eq: these are optim_goals
 		eq_bool = [i in optim_goals for i in _opt.item_names]
 		# A_ub, b_ub
@@ -324,7 +327,7 @@ class LinearProgrammingOptimizer(_linear_optimizer_base_m_.LinearOptimizerBase):
 	def _apply_cyclic_product_optimizing(self, eq_ids, A_eq, b_eq, *,
 			#optim_goals: dict,
 			optim_data: _linear_optimizer_base_m_.LinearOptimizerAttributeSet,
-		) -> (_scipy_m_.ndarray, _scipy_m_.ndarray):
+		) -> ("numpy.ndarray", "numpy.ndarray"):
 		"""
 		(internal only) the way deal with cyclic products are separate them from
 		the A_eq and b_eq, create new lines that count how many executions are
@@ -342,11 +345,12 @@ class LinearProgrammingOptimizer(_linear_optimizer_base_m_.LinearOptimizerBase):
 		_opt = optim_data
 		A_eq = A_eq.copy()
 		b_eq = b_eq.copy()
+		cyclics = self.get_recipe_set().get_item_flag_mask("cyclic_product",
+			[_opt.item_ids[i] for i in eq_ids])
 		for eq_id, row_id in enumerate(eq_ids):
 			# eq_id: the id in A_eq and b_eq
 			# row_id: the id in A_T
-			iname = _opt.item_names[row_id]
-			if self.get_item(iname).is_cyclic_product():
+			if cyclics[eq_id]:
 				# rescue output count
 				output = b_eq[eq_id]
 				# new line, only concern about producing recipes (> 0)
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 
-import math as _math_m_
+import heapq as _heapq_m_
 import collections as _collections_m_
+from . import scipy_interface as _scipy_m_
 from . import recipe_set as _recipe_set_m_
 from . import linear_programming_optimizer as _linear_programming_optimizer_m_
 
@@ -15,6 +16,9 @@ class ProductionProfiler(object):
 	"""
 	solve the production profile using given recipe set;
 	"""
+	# significant digits of calculated results, see _snap_values()
+	_snap_digits_ = 12
+
 	def __init__(self,
 			recipe_set: _recipe_set_m_.RecipeSet,
 			copy: bool = False,
@@ -77,10 +81,24 @@ class ProductionProfiler(object):
 		# below is the wated material
 		# format signature is "item": count
 		self._wastings = _collections_m_.Counter()
+		# the linear programming optimizer, lazy load
+		self._linprog_optimizer = None
 		self.clear_current_profile()
 		return
 
 
+	def get_linprog_optimizer(self) -> _linear_programming_optimizer_m_.\
+			LinearProgrammingOptimizer:
+		"""
+		return the linear programming optimizer bound to the same RecipeSet
+		(lazy load); the optimizer is reused across calculations;
+		"""
+		if self._linprog_optimizer is None:
+			self._linprog_optimizer = _linear_programming_optimizer_m_.\
+				LinearProgrammingOptimizer(self.get_recipe_set(), copy = False)
+		return self._linprog_optimizer
+
+
 	def clear_current_profile(self) -> None:
 		"""
 		clear all cached results for a clean new calculation;
@@ -94,44 +112,90 @@ class ProductionProfiler(object):
 		return
 
 
-	def _recursion_add_targe(self,
-			item_name: str,
-			count: float,
-		) -> None:
+	def _get_item_topological_rank(self) -> callable:
+		"""
+		(internal only) return a function mapping Item name to its component
+		id in the condensation DAG of the RecipeSet (see
+		RecipeSet.get_condensation()); all consumers of an Item have higher
+		ranks than the Item, unless in the same cycle; Items not in any Recipe
+		are ranked 0;
+		"""
+		dag = self.get_recipe_set().get_condensation()
+		item_encoder = self.get_item_encoder()
+		offset = len(self.get_recipe_encoder())
+		def rank(item_name):
+			if item_name not in item_encoder:
+				return 0
+			return dag.component_of[offset\
+				+ item_encoder.encode([item_name])[0]]
+		return rank
+
+
+	def _propagate_targets(self,
+			targets: dict,
+		) -> (_collections_m_.Counter, _collections_m_.Counter,
+			_collections_m_.Counter):
 		"""
-		(internal only) recusively add an Item production target,
-		and all uptream dependencies;
+		(internal only) calculate Item production targets, and all uptream
+		dependencies;
+
+		demands are accumulated per Item, and Items are expanded in reverse
+		topological order (i.e. from final products towards raw materials), so
+		that each Item is expanded once after all its consumers, instead of
+		once per path to it; an Item is pushed again only if it gets more
+		demand after expanded, which is only possible within cycles or by
+		side products;
 
 		PARAMETERS
 		----------
-		item_name:
-			item_name of the production target;
+		targets:
+			dict of production targets in signature "item": count;
 
-		count:
-			count to produce;
+		RETURNS
+		-------
+		recipe_execs (Counter in signature "recipe": exec):
+			Recipe executions;
+
+		raw_inputs (Counter in signature "item": count):
+			raw input Items;
+
+		linprog_resolves (Counter in signature "item": count):
+			Items left for the linear programming optimizer;
 		"""
+		recipe_execs = _collections_m_.Counter()
+		raw_inputs = _collections_m_.Counter()
+		linprog_resolves = _collections_m_.Counter()
+		rank = self._get_item_topological_rank()
+		# accumulated demands of Items not yet expanded
+		pending = dict()
+		# max-heap of (-rank, item_name) of Items in <pending>
+		heap = list()
+		def push(iname, icount):
+			if iname in pending:
+				pending[iname] += icount
+			else:
+				pending[iname] = icount
+				_heapq_m_.heappush(heap, (-rank(iname), iname))
+			return
 		# initialize
-		stack = [(item_name, count)]
-		# stack recursion
-		while len(stack):
-			_iname, _icount = stack.pop()
-			# debug only
-			assert not _math_m_.isclose(_icount, 0, abs_tol = 1e-16), _icount
-			# if _icount too small, discard
-			#if _math_m_.isclose(_icount, 0, abs_tol = 1e-16):
-			#	continue
+		for iname, icount in targets.items():
+			push(iname, icount)
+		# heap propagation
+		while len(heap):
+			_, _iname = _heapq_m_.heappop(heap)
+			_icount = pending.pop(_iname)
+			# demands of different paths may cancel out
+			if _icount == 0:
+				continue
 			# get item instance
 			_item = self.get_item(_iname)
 			if _item.is_raw():
 				# raw material is added to _raw_inputs
-				self._raw_inputs.update({_iname: _icount})
+				raw_inputs.update({_iname: _icount})
 				continue
-			#elif _item.is_cyclic_product():
-			#	self._cyclic_products.update({_iname, _icount})
-			#	continue
 			elif _item.is_multifurcation() or _item.is_cyclic_product():
 				# add to _optim_items for later optimization
-				self._linprog_resolves.update({_iname: _icount})
+				linprog_resolves.update({_iname: _icount})
 				continue
 			else:
 				# the item can only be produced in one source
@@ -140,18 +204,34 @@ class ProductionProfiler(object):
 				_recipe = self.get_recipe(_rname)
 				# update the recipe execution
 				_rexec = _icount / _recipe.products[_iname]
-				self._recipe_execs.update({_rname: _rexec})
+				recipe_execs.update({_rname: _rexec})
 				# update all recipe inputs
 				for i, v in _recipe.inputs.items():
-					stack.append((i, v * _rexec))
+					push(i, v * _rexec)
 				# update all recipe products
 				for i, v in _recipe.products.items():
 					# critical to check the product name
-					# only push to stack if not same to _iname
+					# only push if not same to _iname
 					if i != _iname:
 						# NOTE: the count is negative here
-						stack.append((i, -v * _rexec))
-		return
+						push(i, -v * _rexec)
+		return recipe_execs, raw_inputs, linprog_resolves
+
+
+	def _get_unit_profile(self,
+			item_name: str,
+		) -> (dict, dict, dict):
+		"""
+		(internal only) return the profile of producing one <item_name>, as
+		returned by _propagate_targets(); the profile is linear to the count,
+		thus it is memoized in the RecipeSet (see RecipeSet.get_memo()) and
+		scaled for each request; the returned dicts must not be modified;
+		"""
+		memo = self.get_recipe_set().get_memo("unit_profile")
+		if item_name not in memo:
+			memo[item_name] = tuple(map(dict,
+				self._propagate_targets({item_name: 1.0})))
+		return memo[item_name]
 
 
 	def add_target(self,
@@ -174,11 +254,42 @@ class ProductionProfiler(object):
 		----------
 		TargetItemNotFoundError: if target item is not found in known recipes;
 		"""
-		if not self.has_item(item_name):
-			raise TargetItemNotFoundError("bad item name: '%s'" % item_name)
+		self.add_targets({item_name: count})
+		return
+
+
+	def add_targets(self,
+			targets: dict,
+		) -> None:
+		"""
+		add multiple Item production targets and all their dependencies to
+		currently cached calculation results; each target adds its unit
+		profile scaled by the count, calculated only once until the RecipeSet
+		or Item flags change (see _get_unit_profile());
+
+		PARAMETERS
+		----------
+		targets:
+			dict of targets in signature "product": count;
+
+		EXCEPTIONS
+		----------
+		TargetItemNotFoundError: if any target item is not found in known
+			recipes;
+		"""
+		for item_name in targets.keys():
+			if not self.has_item(item_name):
+				raise TargetItemNotFoundError("bad item name: '%s'"\
+					% item_name)
 		# add to targets stub
-		self._targets.update({item_name: count})
-		self._recursion_add_targe(item_name, count)
+		self._targets.update(targets)
+		for item_name, count in targets.items():
+			if count == 0:
+				continue
+			for src, dest in zip(self._get_unit_profile(item_name),
+					[self._recipe_execs, self._raw_inputs,
+					self._linprog_resolves]):
+				dest.update({k: v * count for k, v in src.items()})
 		return
 
 
@@ -187,8 +298,7 @@ class ProductionProfiler(object):
 		flush current cache of multi-srouce Items and run optimization; results
 		are automatically updated to cache;
 		"""
-		multi_opt = _linear_programming_optimizer_m_.\
-			LinearProgrammingOptimizer(self.get_recipe_set(), copy = False)
+		multi_opt = self.get_linprog_optimizer()
 		op_exec, op_raw, op_wst = multi_opt.optimize(self._linprog_resolves,
 			optim_args)
 		for src, dest in zip([op_exec, op_raw, op_wst],
@@ -227,12 +337,153 @@ class ProductionProfiler(object):
 		"""
 		if clean:
 			self.clear_current_profile()
-		for p, c in targets.items():
-			self.add_target(str(p), float(c))
+		self.add_targets({str(p): float(c) for p, c in targets.items()})
 		self.resolve_optimization_items(optim_args)
+		for d in [self._recipe_execs, self._raw_inputs, self._wastings]:
+			self._snap_values(d)
 		return self.get_current_profile()
 
 
+	@classmethod
+	def _snap_values(cls, values: dict) -> None:
+		"""
+		(internal only) round values in-place to <_snap_digits_> significant
+		digits; results summed in different orders (e.g. scaled memoized unit
+		profiles) then compare equal, instead of differing in the last bits;
+		"""
+		fmt = "%%.%dg" % cls._snap_digits_
+		for k, v in values.items():
+			values[k] = float(fmt % v)
+		return
+
+
+	def _stack_profiles(self,
+			profiles: list,
+		) -> (list, "numpy.ndarray"):
+		"""
+		(internal only) stack a list of dicts in signature "name": value into
+		a matrix, one row for each dict; return the sorted column names and
+		the matrix;
+		"""
+		names = sorted(set().union(*profiles))
+		cols = {v: i for i, v in enumerate(names)}
+		ret = _scipy_m_.zeros((len(profiles), len(names)), dtype = float)
+		for row, d in enumerate(profiles):
+			for k, v in d.items():
+				ret[row, cols[k]] = v
+		return names, ret
+
+
+	def calculate_targets_batch(self,
+			item_names: list,
+			counts: "numpy.ndarray",
+			*,
+			optim_args = {},
+		) -> (list, "numpy.ndarray", list, "numpy.ndarray", list,
+			"numpy.ndarray"):
+		"""
+		calculate the production profiles of K scenarios at once; cached
+		results of this profiler are not touched;
+
+		the part not resolved by optimization is linear to the targets, thus
+		it is a single matrix product of <counts> and unit profiles (see
+		_get_unit_profile()); the optimization is homogeneous in its goals
+		(i.e. scaling goals by t > 0 scales the results by t), thus it is
+		solved only once for each distinct direction of the goals of
+		scenarios, then scaled for the others;
+
+		PARAMETERS
+		----------
+		item_names:
+			names of the n target Items, as columns of <counts>;
+
+		counts:
+			K by n array, the i-th row is the targets of scenario i;
+
+		optim_args:
+			extra parameters passed to LinearOptimizer.optimize(); not
+			modified, each optimization gets a copy;
+
+		RETURNS
+		-------
+		recipe_names (list):
+			names of Recipes, as columns of <recipe_execs>;
+
+		recipe_execs (K by #Recipes numpy.ndarray):
+			Recipe executions of each scenario;
+
+		raw_names (list):
+			names of raw Items, as columns of <raw_inputs>;
+
+		raw_inputs (K by #raw Items numpy.ndarray):
+			raw input Items of each scenario;
+
+		waste_names (list):
+			names of wasted Items, as columns of <wastings>;
+
+		wastings (K by #wasted Items numpy.ndarray):
+			wasted Items of each scenario;
+
+		EXCEPTIONS
+		----------
+		ValueError: if <counts> is not of shape K by len(<item_names>);
+		TargetItemNotFoundError: if any target item is not found in known
+			recipes;
+		"""
+		item_names = [str(i) for i in item_names]
+		counts = _scipy_m_.asarray(counts, dtype = float)
+		if (counts.ndim != 2) or (counts.shape[1] != len(item_names)):
+			raise ValueError("'counts' must be of shape (K, %d)"\
+				% len(item_names))
+		for item_name in item_names:
+			if not self.has_item(item_name):
+				raise TargetItemNotFoundError("bad item name: '%s'"\
+					% item_name)
+		# non-optimization part, as matrix products
+		units = [self._get_unit_profile(i) for i in item_names]
+		exec_names, execs, raw_names, raws, resolve_names, resolves = [\
+			v for i in range(3) for v in self._stack_profiles(\
+				[u[i] for u in units])]
+		execs, raws, resolves = [counts.dot(i)\
+			for i in (execs, raws, resolves)]
+		# optimization part, solved once for each direction of goals
+		solved = dict()
+		optim_rows = list()
+		for row, goals in enumerate(resolves):
+			scale = abs(goals).max() if len(goals) else 0
+			if scale == 0:
+				continue
+			key = tuple(_scipy_m_.around(goals / scale, 12).tolist())
+			if key not in solved:
+				# the optimizer updates its arguments in place, each solve
+				# starts from a copy
+				solved[key] = (scale, self.get_linprog_optimizer().optimize(\
+					{k: v for k, v in zip(resolve_names, goals.tolist())\
+						if v != 0},
+					dict(optim_args)))
+			base_scale, res = solved[key]
+			optim_rows.append((row, scale / base_scale, res))
+		# merge
+		ret = list()
+		for i, (names, mat) in enumerate([(exec_names, execs),
+				(raw_names, raws), ([], _scipy_m_.zeros((len(counts), 0)))]):
+			optim_names, optim_mat = self._stack_profiles(\
+				[res[i] for row, factor, res in optim_rows])
+			all_names = sorted(set(names) | set(optim_names))
+			cols = {v: j for j, v in enumerate(all_names)}
+			merged = _scipy_m_.zeros((len(counts), len(all_names)),
+				dtype = float)
+			merged[:, [cols[k] for k in names]] += mat
+			if optim_rows:
+				rows = [row for row, factor, res in optim_rows]
+				factors = _scipy_m_.asarray([factor\
+					for row, factor, res in optim_rows]).reshape(-1, 1)
+				merged[_scipy_m_.ix_(rows, [cols[k] for k in optim_names])]\
+					+= optim_mat * factors
+			ret.extend([all_names, merged])
+		return tuple(ret)
+
+
 	def get_current_profile(self) -> (dict, dict, dict, dict):
 		"""
 		return current calculated profiles of overall target, recipe execution,
@@ -277,4 +528,6 @@ class ProductionProfiler(object):
 				sum_cons.update({iname: count * rexec})
 			for iname, count in recipe.products.items():
 				sum_prod.update({iname: count * rexec})
+		self._snap_values(sum_cons)
+		self._snap_values(sum_prod)
 		return sum_cons, sum_prod
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import sys as _sys_m_
 import collections as _collections_m_
 
 
@@ -11,10 +12,22 @@ class Recipe(object):
 	pass
 
 
+def _intern_counter(counts) -> _collections_m_.Counter:
+	"""
+	(internal only) return a Counter of <counts> with str keys interned; names
+	of the same Item then share a single str object across all Recipes;
+	"""
+	return _collections_m_.Counter({(_sys_m_.intern(k) if type(k) is str\
+		else k): v for k, v in _collections_m_.Counter(counts).items()})
+
+
 class Recipe(object):
 	"""
 	recipe of crafting items
 	"""
+	# no per-instance __dict__, large databases have tens of thousands Recipes
+	__slots__ = ("inputs", "products", "craft_time", "category", "name")
+
 	def __init__(self,
 			inputs: dict,
 			products: dict,
@@ -55,11 +68,11 @@ class Recipe(object):
 		super(Recipe, self).__init__()
 		# collections.Counter alike dict
 		# make values into float
-		self.inputs = _collections_m_.Counter(inputs)
-		self.products = _collections_m_.Counter(products)
+		self.inputs = _intern_counter(inputs)
+		self.products = _intern_counter(products)
 		#
 		self.craft_time = float(craft_time)
-		self.category = str(category)
+		self.category = _sys_m_.intern(str(category))
 		# if name is None, try to derive from the product
 		# derive is only valid if products list has only one item
 		# else raise ValueError
@@ -70,7 +83,7 @@ class Recipe(object):
 			else:
 				raise ValueError(
 					"'name' is required with non-single-product recipe")
-		self.name = str(name)
+		self.name = _sys_m_.intern(str(name))
 		if net_yield:
 			self.update_net_yield()
 		# debugs
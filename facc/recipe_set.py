@@ -2,14 +2,13 @@
 
 import collections as _collections_m_
 import warnings as _warnins_m_
-import itertools as _itertools_m_
 from . import abc as _abc_m_
 from . import recipe as _recipe_m_
 from . import item as _item_m_
 from . import text_label_encoder as _text_label_encoder_m_
-from . import graph_util as _graph_util_m_
-from . import coef_matrix as _coef_matrix_m_
 from . import scipy_interface as _scipy_m_
+# NOTE: graph_util and coef_matrix define subclasses of numpy.ndarray, thus are
+# lazy loaded where needed; see scipy_interface for more information
 
 
 class InvalidRecipeSetError(ValueError):
@@ -20,10 +19,23 @@ class RecipeSet(object):
 	"""
 	collection of Recipes and involved Items for organizing and searching;
 	"""
+	# with coef_matrix_format="auto", a coefficient matrix larger than this
+	# number of cells is sparse; 8 MB if dense
+	_sparse_coef_matrix_cells_ = 1 << 20
+	# validity of cyclic groups, shared by all instances, as dict of
+	# "net coefficients of the group": is_valid; cleared if full
+	_cyclic_group_validity_cache_ = {}
+	_cyclic_group_validity_cache_size_ = 4096
+	# totals below this fraction of the largest one in the same row of the
+	# total requirements table are dropped as float noise
+	_total_requirements_rtol_ = 1e-12
+
+
 	def __init__(self,
 			recipe_list: list or "iterator",
 			copy: bool = True,
 			net_yield: bool = False,
+			coef_matrix_format: str = "auto",
 		) -> None:
 		"""
 		PARAMETERS
@@ -38,20 +50,55 @@ class RecipeSet(object):
 			if True, make all recipes in the list are net;
 			see Recipe.__init__() for more information;
 			this parameter only affects when copy=True;
+
+		coef_matrix_format:
+			'dense', 'sparse' or 'auto'; the backend of the coefficient matrix,
+			see RecipeSet.to_coef_matrix(); 'auto' selects sparse only for
+			large matrices (e.g. of mod packs);
 		"""
+		if coef_matrix_format not in ["dense", "sparse", "auto"]:
+			raise ValueError("'coef_matrix_format' must be one of: 'dense', "\
+				+ "'sparse' and 'auto'")
+		self.coef_matrix_format = coef_matrix_format
 		# self._recipes is a dict of "recipe_name": Recipe()
 		self._recipes = {}
 		# self._items is a dict of "item_name": Item()
 		self._items = _abc_m_.DefaultValueDict(lambda x: _item_m_.Item(x))
-		# self._recipe_upstr/dwstr are dicts of "recipe_name": "recipe_name"
-		self._recipe_upstr = _collections_m_.defaultdict(set)
-		self._recipe_dwstr = _collections_m_.defaultdict(set)
+		# flags of Items in self._items, indexed by encoded Item ids; see
+		# _bind_item_flags()
+		self._item_flags = None
+		# integer index of encoded Recipes (rows) and Items (columns); Recipe
+		# links are derived from it on demand, see get_recipe_item_index()
+		self._index = None
 		# recipe/item name encoders
 		self.recipe_encoder = _text_label_encoder_m_.TextLabelEncoder()
 		self.item_encoder = _text_label_encoder_m_.TextLabelEncoder()
 		# matrix representations, lazy load
 		self._graph = None
 		self._coef_mat = None
+		# COO triplets of the coefficient matrix, made in setup for bulk
+		# construction; dropped once loaded, or if stale; see
+		# _make_coo_triplets()
+		self._coo_triplets = None
+		# cyclic groups, as dict of frozenset({"recipe_name"}): is_valid
+		self._cyclic_groups = {}
+		# and the group of each involved recipe, "recipe_name": frozenset
+		self._recipe_cyclic_group = {}
+		# incremented on every change of Recipes, and the generation last
+		# passed verify(); see get_generation()
+		self._generation = 0
+		self._verified_generation = None
+		# memos of results derived from this set, and the state they are
+		# derived from; see get_memo()
+		self._memos = {}
+		self._memo_stamp = None
+		# total requirements table, and the state it is built from (lazy load);
+		# see get_total_requirements()
+		self._total_requirements = None
+		self._total_requirements_stamp = None
+		# True if encoders and matrices are shared with another
+		# RecipeSet; copied on first modification, see get_exclusion_view()
+		self._cow_shared = False
 		# data filling in
 		self.is_net_yield = net_yield
 		for r in recipe_list:
@@ -61,6 +108,27 @@ class RecipeSet(object):
 		return
 
 
+	def __getstate__(self) -> dict:
+		# self._items is a DefaultValueDict with a lambda factory, which is not
+		# picklable; dump it as plain dict instead
+		state = vars(self).copy()
+		state["_items"] = dict(self._items)
+		# memos and the total requirements table are not persisted
+		state["_memos"] = {}
+		state["_memo_stamp"] = None
+		state["_total_requirements"] = None
+		state["_total_requirements_stamp"] = None
+		return state
+
+
+	def __setstate__(self, state: dict) -> None:
+		vars(self).update(state)
+		items = _abc_m_.DefaultValueDict(lambda x: _item_m_.Item(x))
+		items.update(state["_items"])
+		self._items = items
+		return
+
+
 	def _add_recipe(self,
 			recipe: _recipe_m_.Recipe,
 			copy: bool = True,
@@ -77,7 +145,7 @@ class RecipeSet(object):
 			raise TypeError("'recipe' must be type of 'Recipe'")
 		# dict key overwrite warning
 		if self.has_recipe(recipe.name):
-			warnins.warn("overwriting: %s" % str(recipe))
+			_warnins_m_.warn("overwriting: %s" % str(recipe))
 		if copy:
 			self._recipes[recipe.name] = recipe.copy(net_yield)
 		else:
@@ -92,18 +160,17 @@ class RecipeSet(object):
 		0) summarize Item collection appear in all Recipes;
 		1) Recipes products -> Item collection;
 		2) Item collection -> Recipe inputs;
-		3) Recipe -> Recipe down/upstream dependencies;
+		3) Recipe <-> Item integer index, Recipe down/upstream dependencies
+		   are derived from it;
 		4) Item flags;
 		5) check cyclic group; mark the unique products of the cyclic groups;
 
 		results are stored in:
 		self._items
-		self._recipe_upstr
-		self._recipe_dwstr
+		self._index
 		"""
+		self._generation += 1
 		self._items.clear()
-		self._recipe_upstr.clear()
-		self._recipe_dwstr.clear()
 		# goal 0, 1, 2
 		for recp in self.iterate_recipes(True):
 			# put recipe name to the correct input_of/product_of list
@@ -112,23 +179,24 @@ class RecipeSet(object):
 				self.get_item(i).input_of.add(recp.name)
 			for i in recp.products.keys():
 				self.get_item(i).product_of.add(recp.name)
-		# goal 3, 4
-		# link recipe upstream/downstream using Item
+		# goal 4
 		# update Item product_of_complex_recipe flag
 		for i in self.iterate_items(True):
-			for _dw, _up in _itertools_m_.product(i.input_of, i.product_of):
-				self._recipe_upstr.setdefault(_dw, set()).add(_up)
-				self._recipe_dwstr.setdefault(_up, set()).add(_dw)
 			_flag = any([(self.get_recipe(r).n_products() >= 2)
 				for r in i.product_of])
 			i.setflag_product_of_complex_recipe(_flag)
 		# refresh encoders
 		self.recipe_encoder.train(self.iterate_recipes())
 		self.item_encoder.train(self.iterate_items())
+		self._item_flags = _item_m_.ItemFlagStore(len(self.item_encoder))
+		self._bind_item_flags(self.iterate_items())
+		# goal 3
+		self._index = self.to_recipe_item_index()
 		# for correctness, clear these data
 		# since these are calculated upon linkages
 		self._graph = None
 		self._coef_mat = None
+		self._coo_triplets = self._make_coo_triplets()
 		# now deal with cyclic recipes
 		self._cache_cyclic_recipe_groups()
 		return
@@ -144,29 +212,90 @@ class RecipeSet(object):
 		4) mark these Items' cyclic_product flag
 		"""
 		#print(len(self._recipes))
-		cyclic_groups = self.get_graph().get_cyclic_vertex_groups()
+		cyclic_groups = self._index.get_cyclic_row_groups()
 		#print(cyclic_groups)
 		#print(self.has_recipe("uranium-fuel-consumption"))
+		self._cyclic_groups.clear()
+		self._recipe_cyclic_group.clear()
 		for cyc in cyclic_groups:
-			recps = self.recipe_encoder.decode(cyc)
-			if self._is_cyclic_group_valid(recps):
-				# now get all products of these recipes
-				all_prods = self.extract_items_from_recipes(recps,\
-					"product_only")
-				# find these prods which are unique to the cycle
-				# i.e. all recipes in prod.product_of is in the cycle
-				for p in all_prods:
-					p_obj = self.get_item(p)
-					if all([r in recps for r in p_obj.product_of]):
-						p_obj.setflag_cyclic_product(True)
-						#print(p)
-			else:
-				_warnins_m_.warn("cyclic group '%s' detected, however, it seems\
-					perpetual; cyclic optimization on this group is disabled"\
-					% (",".join(recps)), UserWarning)
+			self._add_cyclic_group(self.recipe_encoder.decode(cyc))
+		# only products of cyclic groups can be cyclic products
+		self._update_cyclic_product_flags(self.extract_items_from_recipes(\
+			self._recipe_cyclic_group.keys(), "product_only"))
+		return
+
+
+	def _add_cyclic_group(self, recipe_names: list) -> None:
+		"""
+		(internal only) check and record a cyclic group; warns if the group is
+		not valid; see _is_cyclic_group_valid() for more information;
+		"""
+		group = frozenset(recipe_names)
+		valid = self._is_cyclic_group_valid(list(group))
+		if not valid:
+			_warnins_m_.warn("cyclic group '%s' detected, however, it seems\
+				perpetual; cyclic optimization on this group is disabled"\
+				% (",".join(sorted(group))), UserWarning)
+		self._cyclic_groups[group] = valid
+		for r in group:
+			self._recipe_cyclic_group[r] = group
+		return
+
+
+	def _remove_cyclic_group(self, group: frozenset) -> None:
+		"""
+		(internal only) remove a recorded cyclic group;
+		"""
+		del self._cyclic_groups[group]
+		for r in group:
+			del self._recipe_cyclic_group[r]
 		return
 
 
+	def _update_cyclic_product_flags(self, item_names: list) -> None:
+		"""
+		(internal only) update cyclic_product flag of given Items; an Item is a
+		cyclic product if all its source Recipes are in the same valid cyclic
+		group; i.e. it is unique to the cycle;
+		"""
+		for i in item_names:
+			if not self.has_item(i):
+				continue
+			item = self.get_item(i)
+			flag = False
+			if item.product_of:
+				group = self._recipe_cyclic_group.get(\
+					next(iter(item.product_of)), None)
+				flag = (group is not None) and self._cyclic_groups[group]\
+					and item.product_of.issubset(group)
+			item.setflag_cyclic_product(flag)
+		return
+
+
+	def _get_cyclic_groups_among(self, recipe_names: set) -> list:
+		"""
+		(internal only) find cyclic groups only within the subgraph of given
+		Recipes; return a list of sets of Recipe names;
+		"""
+		return [set(self.recipe_encoder.decode(g))
+			for g in self._index.get_cyclic_row_groups(\
+				self.recipe_encoder.encode(recipe_names))]
+
+
+	def _fetch_recipe_closure(self,
+			recipe_name: str,
+			direction: "up" or "down",
+		) -> set:
+		"""
+		(internal only) names of all Recipes reachable from given Recipe in
+		<direction>; the query Recipe itself is included only if it is
+		reachable from itself;
+		"""
+		rid = self.recipe_encoder.encode([recipe_name])[0]
+		return set(self.recipe_encoder.decode(self._index.reachable_rows(\
+			self._index.row_neighbors(rid, direction), direction)))
+
+
 	def _is_cyclic_group_valid(self, recipe_list: list) -> bool:
 		"""
 		(internal only) check cyclic group if is valid;
@@ -174,28 +303,73 @@ class RecipeSet(object):
 		recipes (i.e. all zeros), such that all Items have non-positive output;
 		i.e. the group must be "consuming" something, or, not perpetual;
 		this can be checked with UNBOUNDED linear programming;
+
+		results are cached by the content of the group's Recipes, shared by
+		all RecipeSet's, thus copies and views skip the check; obvious cases
+		are decided structurally without linear programming, see
+		_check_cyclic_group_structure();
 		"""
 		recipe_list = sorted(recipe_list)
-		n_recipes = len(recipe_list)
-		assert n_recipes >= 2
-		all_items = self.extract_items_from_recipes(recipe_list)
-		all_items = sorted(all_items)
-		n_items = len(all_items)
-		coef_matrix = _coef_matrix_m_.\
-			CoefficientMatrix((len(recipe_list), len(all_items)))
-		for ir, rname in enumerate(recipe_list):
+		assert len(recipe_list) >= 2
+		# net coefficients of each recipe, i.e. shared Items are combined
+		coefs = []
+		for rname in recipe_list:
 			recipe = self.get_recipe(rname)
-			#print(rname)
-			for iname, count in recipe.inputs.items():
-				#print(iname)
-				coef_matrix[ir, all_items.index(iname)] = -count
-			for iname, count in recipe.products.items():
-				#print(iname)
-				coef_matrix[ir, all_items.index(iname)] = count
+			coef = _collections_m_.Counter(recipe.products)
+			coef.subtract(recipe.inputs)
+			coefs.append(coef)
+		key = tuple(sorted([tuple(sorted(c.items())) for c in coefs]))
+		cache = RecipeSet._cyclic_group_validity_cache_
+		if key not in cache:
+			valid = self._check_cyclic_group_structure(coefs)
+			if valid is None:
+				valid = self._check_cyclic_group_linprog(coefs)
+			if len(cache) >= self._cyclic_group_validity_cache_size_:
+				cache.clear()
+			cache[key] = valid
+		return cache[key]
+
+
+	@staticmethod
+	def _check_cyclic_group_structure(coefs: list) -> bool or None:
+		"""
+		(internal only) decide the validity of a cyclic group only from the
+		signs of net coefficients (list of dicts, one per Recipe); return None
+		if not decidable; see _is_cyclic_group_valid();
+		"""
+		# perpetual if any single recipe consumes nothing
+		for c in coefs:
+			if all([v >= 0 for v in c.values()]):
+				return False
+		# valid if every recipe consumes any Item that the group never
+		# produces, i.e. any operation consumes something from outside
+		produced = {i for c in coefs for i, v in c.items() if v > 0}
+		if all([any([(v < 0) and (i not in produced) for i, v in c.items()])
+				for c in coefs]):
+			return True
+		return None
+
+
+	@staticmethod
+	def _check_cyclic_group_linprog(coefs: list) -> bool:
+		"""
+		(internal only) decide the validity of a cyclic group with linear
+		programming, by maximizing the total operations such that no Item has
+		negative net output; the group is perpetual if unbounded; see
+		_is_cyclic_group_valid();
+		"""
+		all_items = sorted({i for c in coefs for i in c.keys()})
+		item_ids = {v: i for i, v in enumerate(all_items)}
+		n_recipes, n_items = len(coefs), len(all_items)
+		coef_matrix = _scipy_m_.zeros((n_recipes, n_items), dtype = float)
+		for ir, coef in enumerate(coefs):
+			for iname, count in coef.items():
+				coef_matrix[ir, item_ids[iname]] = count
 		# test using linprog
 		A_T = -coef_matrix.T
 		b_ub = _scipy_m_.zeros(n_items, dtype = float)
-		c = _scipy_m_.ones(n_recipes, dtype = float)
+		# maximize, minimizing is always trivially bounded at zero
+		c = -_scipy_m_.ones(n_recipes, dtype = float)
 		x_bounds = [(0, None)] * n_recipes
 		# check linear programming
 		res = _scipy_m_.linprog(c = c, A_ub = A_T, b_ub = b_ub, bounds = x_bounds)
@@ -218,23 +392,33 @@ class RecipeSet(object):
 		necessary to ensure correctness after updating Recipes;
 		"""
 		# rescue manual flags since self._items will be refreshed
-		forced_raws = self.query_items(lambda x: x.is_forced_raw())
-		trivials = self.query_items(lambda x: x.is_trivial())
+		forced_raws, trivials = [], []
+		if self._index is not None:
+			forced_raws = self.query_items_by_flag("forced_raw")
+			trivials = self.query_items_by_flag("trivial")
 		# refresh
+		self._unshare()
 		self._setup_recipe_item_search_cache()
 		# lazy load now
 		#self._graph = self.to_graph()
 		#self._coef_mat = self.to_coef_matrix()
 		# reset rescued manual flags
-		self.set_items_flag(forced_raws, lambda x: x.setflag_forced_raw(True))
-		self.set_items_flag(trivials, lambda x: x.setflag_trivial(True))
+		self.set_items_flag_value(forced_raws, "forced_raw", True)
+		self.set_items_flag_value(trivials, "trivial", True)
 		return
 
 
 	def copy(self, net_yield: bool = None) -> "RecipeSet":
 		"""
-		reconstruct a RecipeSet with identical Recipes to caller;
-		all Recipes in collection are copied from their original;
+		return a RecipeSet with identical Recipes to caller; the copy shares
+		Recipe instances and derived data (encoders, index, matrices) with this
+		set, like a view without exclusions (see get_exclusion_view()); only
+		Items (including their flags) are duplicated; shared data are copied on
+		the first modification of either set, thus Recipes should be changed
+		by replace_recipe(), not in place;
+
+		Recipes are only reconstructed if converting to net yield changes any
+		of them; in that case, all caches are rebuilt;
 
 		PARAMETERS
 		----------
@@ -243,21 +427,411 @@ class RecipeSet(object):
 		"""
 		if net_yield is None:
 			net_yield = self.is_net_yield
-		new = RecipeSet(self.iterate_recipes(True), net_yield = net_yield)
-		# copy item manual falgs
-		for query_expr, set_expr in [
-				(lambda x: x.is_forced_raw(), lambda x: x.setflag_forced_raw(True)),
-				(lambda x: x.is_trivial(), lambda x: x.setflag_trivial(True)),
-			]:
-			item_list = self.query_items(query_expr)
-			new.set_items_flag(item_list, set_expr)
 		assert len(self.item_encoder) != 0
 		assert len(self.recipe_encoder) != 0
-		#print(len(self.item_encoder))
-		#print(len(self.recipe_encoder))
+		if net_yield and any([not r.inputs.keys().isdisjoint(r.products)\
+				for r in self.iterate_recipes(True)]):
+			new = RecipeSet(self.iterate_recipes(True), net_yield = net_yield,
+				coef_matrix_format = self.coef_matrix_format)
+			# copy item manual falgs
+			for flag in ["forced_raw", "trivial"]:
+				new.set_items_flag_value(filter(new.has_item,
+					self.query_items_by_flag(flag)), flag, True)
+			return new
+		new = self.get_exclusion_view([])
+		new.is_net_yield = net_yield
 		return new
 
 
+	def get_exclusion_view(self,
+			recipe_names: list,
+		) -> "RecipeSet":
+		"""
+		return a RecipeSet without given Recipes, as a cheap view over this
+		set; the view shares Recipe instances, encoders and coefficient matrix
+		with this set, thus nothing is rebuilt; only the cyclic groups
+		broken by the exclusion are re-checked, and flags of affected Items are
+		updated; Items not involved in any remaining Recipe are dropped, and
+		manual Item flags are inherited;
+
+		shared data are copied on the first modification of the view (e.g. by
+		add_recipe() or refresh()), thus never affects this set; like removed
+		Recipes, the excluded ones keep their labels in encoders and their
+		rows/columns in the shared matrix; see RecipeSet.remove_recipe();
+
+		PARAMETERS
+		----------
+		recipe_names:
+			names of Recipes to exclude; names not in this set are ignored;
+
+		RETURNS
+		-------
+		the view, as RecipeSet;
+		"""
+		excluded = {r for r in recipe_names if self.has_recipe(r)}
+		# resolve lazy load, then it is shared
+		self.get_coef_matrix()
+		view = type(self).__new__(type(self))
+		vars(view).update(vars(self))
+		# both sides are now sharing
+		self._cow_shared = True
+		view._cow_shared = True
+		# own containers, the unaffected elements are shared
+		view._recipes = {k: v for k, v in self._recipes.items()\
+			if k not in excluded}
+		view._items = _abc_m_.DefaultValueDict(lambda x: _item_m_.Item(x))
+		for i in self.iterate_items(True):
+			input_of = i.input_of - excluded
+			product_of = i.product_of - excluded
+			if input_of or product_of:
+				view._items[i.name] = _item_m_.Item(i.name,
+					input_of, product_of, i.flags)
+		view._item_flags = _item_m_.ItemFlagStore(len(self.item_encoder))
+		view._bind_item_flags(view.iterate_items())
+		view._memos = {}
+		view._memo_stamp = None
+		view._total_requirements = None
+		view._total_requirements_stamp = None
+		# the index only shares its rows/columns, then excluded rows are
+		# cleared; the graph is derived again from it on demand
+		view._index = self._index.copy()
+		for rid in self.recipe_encoder.encode(excluded):
+			view._index.clear_row(rid)
+		view._graph = None
+		# the view keeps the generation stamps; it is consistent by
+		# construction if this set is
+		view._cyclic_groups = self._cyclic_groups.copy()
+		view._recipe_cyclic_group = self._recipe_cyclic_group.copy()
+		# update flags, and cyclic groups broken by exclusion
+		affected = self.extract_items_from_recipes(excluded, "product_only")
+		view._update_complex_product_flags(affected)
+		for g in {self._recipe_cyclic_group[r] for r in excluded\
+				if r in self._recipe_cyclic_group}:
+			affected.update(self.extract_items_from_recipes(g, "product_only"))
+			view._remove_cyclic_group(g)
+			for sub in view._get_cyclic_groups_among(g - excluded):
+				view._add_cyclic_group(sub)
+		view._update_cyclic_product_flags(affected)
+		return view
+
+
+	def get_overlay_view(self,
+			recipes: list,
+			deleted_recipes: list = [],
+			copy: bool = True,
+			net_yield: bool = None,
+		) -> "RecipeSet":
+		"""
+		return a RecipeSet with given Recipes added (or overriding the ones of
+		the same name) and <deleted_recipes> removed, as an overlay over this
+		set, e.g. to apply a mod on top of a base recipe database; this set is
+		never modified;
+
+		the overlay starts as an exclusion view of the deleted and overridden
+		Recipes (see RecipeSet.get_exclusion_view()), then the Recipes are
+		added incrementally (see RecipeSet.add_recipe()); Recipe instances are
+		kept shared with this set; manual Item flags are inherited;
+
+		PARAMETERS
+		----------
+		recipes:
+			Recipes to add or override;
+
+		deleted_recipes:
+			names of Recipes to remove; names not in this set are ignored;
+
+		copy, net_yield:
+			see RecipeSet.add_recipe() for more information;
+
+		RETURNS
+		-------
+		the overlay, as RecipeSet;
+
+		EXCEPTIONS
+		----------
+		TypeError: if any of recipes is not of type Recipe;
+		InvalidRecipeSetError: if <recipes> has duplicated names;
+		"""
+		recipes = list(recipes)
+		overridden = {r.name for r in recipes if self.has_recipe(r.name)}
+		# rescue manual flags, Items may be removed then re-added
+		involved = [self.get_item(i) for i in\
+			self.extract_items_from_recipes(overridden)]
+		forced_raws = [i.name for i in involved if i.is_forced_raw()]
+		trivials = [i.name for i in involved if i.is_trivial()]
+		view = self.get_exclusion_view(set(deleted_recipes) | overridden)
+		for r in recipes:
+			view.add_recipe(r, copy, net_yield)
+		view.set_items_flag(filter(view.has_item, forced_raws),
+			lambda x: x.setflag_forced_raw(True))
+		view.set_items_flag(filter(view.has_item, trivials),
+			lambda x: x.setflag_trivial(True))
+		return view
+
+
+	def _unshare(self) -> None:
+		"""
+		(internal only) make local copies of data shared with other RecipeSet;
+		called before any modification; see get_exclusion_view();
+		"""
+		if not self._cow_shared:
+			return
+		self.recipe_encoder = self.recipe_encoder.copy()
+		self.item_encoder = self.item_encoder.copy()
+		if self._graph is not None:
+			self._graph = self._graph.copy()
+		if self._coef_mat is not None:
+			self._coef_mat = self._coef_mat.copy()
+		self._cow_shared = False
+		return
+
+
+	def add_recipe(self,
+			recipe: _recipe_m_.Recipe,
+			copy: bool = True,
+			net_yield: bool = None,
+		) -> None:
+		"""
+		add a Recipe to the collection; caches are updated incrementally, i.e.
+		only Items/Recipes connected to the new Recipe are touched, as opposed
+		to refresh();
+
+		PARAMETERS
+		----------
+		recipe:
+			Recipe to add, its name must not exist in the collection;
+
+		copy:
+			make local copy of the recipe;
+
+		net_yield:
+			if None, use inherited value; override otherwise; see
+			RecipeSet.__init__() for more information;
+
+		EXCEPTIONS
+		----------
+		TypeError: if recipe is not of type Recipe;
+		InvalidRecipeSetError: if a Recipe with the same name exists;
+		"""
+		if not isinstance(recipe, _recipe_m_.Recipe):
+			raise TypeError("'recipe' must be type of 'Recipe'")
+		if self.has_recipe(recipe.name):
+			raise InvalidRecipeSetError("recipe '%s' already exists, use "\
+				"replace_recipe() instead" % recipe.name)
+		if net_yield is None:
+			net_yield = self.is_net_yield
+		self._unshare()
+		self._add_recipe(recipe, copy, net_yield)
+		self._link_recipe(recipe.name)
+		return
+
+
+	def remove_recipe(self,
+			recipe_name: str,
+		) -> _recipe_m_.Recipe:
+		"""
+		remove a Recipe from the collection; caches are updated incrementally;
+		Items no longer involved in any Recipe are also removed (including
+		their flags);
+
+		RETURNS
+		-------
+		the removed Recipe;
+
+		EXCEPTIONS
+		----------
+		InvalidRecipeSetError: if the Recipe does not exist;
+		"""
+		if not self.has_recipe(recipe_name):
+			raise InvalidRecipeSetError("recipe '%s' does not exist"\
+				% recipe_name)
+		self._unshare()
+		return self._unlink_recipe(recipe_name)
+
+
+	def replace_recipe(self,
+			recipe: _recipe_m_.Recipe,
+			copy: bool = True,
+			net_yield: bool = None,
+		) -> _recipe_m_.Recipe:
+		"""
+		replace the Recipe of the same name; caches are updated incrementally;
+		manual flags (forced_raw and trivial) of involved Items are kept;
+
+		PARAMETERS
+		----------
+		see RecipeSet.add_recipe() for more information;
+
+		RETURNS
+		-------
+		the replaced (old) Recipe;
+
+		EXCEPTIONS
+		----------
+		TypeError: if recipe is not of type Recipe;
+		InvalidRecipeSetError: if no Recipe with the same name exists;
+		"""
+		if not isinstance(recipe, _recipe_m_.Recipe):
+			raise TypeError("'recipe' must be type of 'Recipe'")
+		if not self.has_recipe(recipe.name):
+			raise InvalidRecipeSetError("recipe '%s' does not exist"\
+				% recipe.name)
+		# rescue manual flags, Items may be removed then re-added
+		involved = [self.get_item(i) for i in\
+			self.extract_items_from_recipes([recipe.name])]
+		forced_raws = [i.name for i in involved if i.is_forced_raw()]
+		trivials = [i.name for i in involved if i.is_trivial()]
+		self._unshare()
+		old = self._unlink_recipe(recipe.name)
+		self.add_recipe(recipe, copy, net_yield)
+		self.set_items_flag(filter(self.has_item, forced_raws),
+			lambda x: x.setflag_forced_raw(True))
+		self.set_items_flag(filter(self.has_item, trivials),
+			lambda x: x.setflag_trivial(True))
+		return old
+
+
+	def _link_recipe(self, recipe_name: str) -> None:
+		"""
+		(internal only) incrementally update caches for a newly added Recipe;
+		see _setup_recipe_item_search_cache() for what are updated;
+		"""
+		recp = self.get_recipe(recipe_name)
+		self._generation += 1
+		self._coo_triplets = None
+		# Item links
+		for i in recp.inputs.keys():
+			self.get_item(i).input_of.add(recipe_name)
+		for i in recp.products.keys():
+			self.get_item(i).product_of.add(recipe_name)
+		# flags
+		self._update_complex_product_flags(recp.products.keys())
+		# encoders, new labels are appended
+		self.recipe_encoder.extend([recipe_name])
+		self.item_encoder.extend(self.extract_items_from_recipes([recipe_name]))
+		self._bind_item_flags(self.extract_items_from_recipes([recipe_name]))
+		self._update_index([recipe_name])
+		self._update_matrices([recipe_name])
+		# the new recipe can only merge groups cyclic through itself
+		merged = (self._fetch_recipe_closure(recipe_name, "up")\
+			& self._fetch_recipe_closure(recipe_name, "down"))
+		affected = set(recp.products.keys())
+		if recipe_name in merged:
+			for g in {self._recipe_cyclic_group[r] for r in merged\
+					if r in self._recipe_cyclic_group}:
+				affected.update(self.extract_items_from_recipes(g,
+					"product_only"))
+				self._remove_cyclic_group(g)
+			self._add_cyclic_group(merged)
+			affected.update(self.extract_items_from_recipes(merged,
+				"product_only"))
+		self._update_cyclic_product_flags(affected)
+		return
+
+
+	def _unlink_recipe(self, recipe_name: str) -> _recipe_m_.Recipe:
+		"""
+		(internal only) remove a Recipe and incrementally update caches;
+		"""
+		# affected Items, extracted before removal
+		affected = self.extract_items_from_recipes([recipe_name])
+		recp = self._recipes.pop(recipe_name)
+		self._generation += 1
+		self._coo_triplets = None
+		# Item links, remove Items no longer involved
+		for i in recp.inputs.keys():
+			self.get_item(i).input_of.discard(recipe_name)
+		for i in recp.products.keys():
+			self.get_item(i).product_of.discard(recipe_name)
+		for i in affected:
+			item = self.get_item(i)
+			if (not item.input_of) and (not item.product_of):
+				# the removed Item keeps its flags, while the slot is reset
+				item.flags.unbind()
+				self._item_flags.bits[self.item_encoder.encode([i])[0]] = 0
+				self._item_flags.version += 1
+				del self._items[i]
+		# flags
+		self._update_complex_product_flags(recp.products.keys())
+		# removed labels are kept in encoders, their index/matrix rows/columns
+		# are left blank; these are compacted in next refresh()
+		self._update_index([recipe_name])
+		self._update_matrices([recipe_name])
+		# the cyclic group involving this recipe may break into smaller ones
+		group = self._recipe_cyclic_group.get(recipe_name, None)
+		if group is not None:
+			affected.update(self.extract_items_from_recipes(\
+				group - {recipe_name}, "product_only"))
+			self._remove_cyclic_group(group)
+			for g in self._get_cyclic_groups_among(group - {recipe_name}):
+				self._add_cyclic_group(g)
+		self._update_cyclic_product_flags(affected)
+		return recp
+
+
+	def _update_complex_product_flags(self, item_names: list) -> None:
+		"""
+		(internal only) update product_of_complex_recipe flag of given Items;
+		"""
+		for i in item_names:
+			if not self.has_item(i):
+				continue
+			item = self.get_item(i)
+			item.setflag_product_of_complex_recipe(any([\
+				(self.get_recipe(r).n_products() >= 2)\
+				for r in item.product_of]))
+		return
+
+
+	def _update_index(self, recipe_names: list) -> None:
+		"""
+		(internal only) incrementally update the rows of given Recipes in the
+		Recipe <-> Item index; Recipes not in collection (i.e. removed) are
+		cleared;
+		"""
+		shape = (len(self.recipe_encoder), len(self.item_encoder))
+		if self._index.shape != shape:
+			self._index = self._index.expand(shape)
+		for rid, rname in zip(self.recipe_encoder.encode(recipe_names),
+				recipe_names):
+			if self.has_recipe(rname):
+				recp = self.get_recipe(rname)
+				self._index.set_row(rid,
+					self.item_encoder.encode(recp.products.keys()),
+					self.item_encoder.encode(recp.inputs.keys()))
+			else:
+				self._index.clear_row(rid)
+		return
+
+
+	def _update_matrices(self, recipe_names: list) -> None:
+		"""
+		(internal only) incrementally update the rows/columns of given Recipes
+		in graph and coefficient matrix, only if they are already loaded;
+		Recipes not in collection (i.e. removed) are cleared;
+		"""
+		n_recipes = len(self.recipe_encoder)
+		n_items = len(self.item_encoder)
+		recipe_ids = self.recipe_encoder.encode(recipe_names)
+		if self._coef_mat is not None:
+			if self._coef_mat.shape != (n_recipes, n_items):
+				self._coef_mat = self._coef_mat.expand((n_recipes, n_items))
+			for rid, rname in zip(recipe_ids, recipe_names):
+				if self.has_recipe(rname):
+					self._set_coef_matrix_row(self._coef_mat, rid, rname)
+				else:
+					self._coef_mat.set_row(rid, [], [])
+		if self._graph is not None:
+			if len(self._graph) != n_recipes:
+				self._graph = self._graph.expand(n_recipes)
+			for rid, rname in zip(recipe_ids, recipe_names):
+				self._graph.clear_vertex(rid)
+				for direction in ["down", "up"]:
+					self._graph.set_neighbors(rid,
+						self._index.row_successors(rid, direction), direction)
+		return
+
+
 	def get_recipe(self,
 			recipe_name: str,
 		) -> _recipe_m_.Recipe:
@@ -353,80 +927,390 @@ class RecipeSet(object):
 		return
 
 
-	def verify(self) -> None:
+	def _bind_item_flags(self, item_names: list) -> None:
+		"""
+		(internal only) store flags of given Items in self._item_flags, at
+		their encoded ids; Items already bound are skipped;
+		"""
+		store = self._item_flags
+		store.resize(len(self.item_encoder))
+		item_names = list(item_names)
+		for name, iid in zip(item_names, self.item_encoder.encode(item_names)):
+			flags = self.get_item(name).flags
+			if not flags.is_bound_to(store):
+				flags.bind(store, iid)
+		return
+
+
+	def get_item_flag_mask(self,
+			flag: str,
+			item_ids: list = None,
+		) -> "numpy.ndarray":
 		"""
-		verify if Recipe/Items search db is complete and correct;
+		return the values of a flag of Items as bool array;
+
+		PARAMETERS
+		----------
+		flag:
+			one of 'product_of_complex_recipe', 'cyclic_product', 'trivial' and
+			'forced_raw' (see ItemFlags), or 'actual_raw' (no Recipe produces
+			the Item, see Item.is_actual_raw());
+
+		item_ids:
+			encoded Item ids (see RecipeSet.item_encoder); if None, all ids of
+			the encoder, including labels of removed Items (always False);
+
+		RETURNS
+		-------
+		bool array, aligned with <item_ids>;
 
 		EXCEPTIONS
 		----------
-		InvalidRecipeSetError: if failed check
+		ValueError: if 'flag' is an unrecognized value;
 		"""
-		_item = lambda x: self.get_item(x)
-		_recp = lambda x: self.get_recipe(x)
-		# check for recipes-item connection
-		for r, i in _itertools_m_.product(
-			self.iterate_recipes(True), self.iterate_items(True)):
-			if (i.name in r.products) != (r.name in i.product_of):
-				break
-			if (i.name in r.inputs) != (r.name in i.input_of):
-				break
+		if item_ids is None:
+			item_ids = slice(None)
 		else:
-			return
-		raise InvalidRecipeSetError("broken integrity: r'%s' : i'%s'" %\
-			(r.name, i.name))
+			item_ids = _scipy_m_.asarray(item_ids, dtype = int)
+		if flag == "actual_raw":
+			return (self._index.col_degrees("up") == 0)[item_ids]\
+				& self._get_item_alive_mask()[item_ids]
+		elif flag in _item_m_.ItemFlags._flag_bits_:
+			bit = _item_m_.ItemFlags._flag_bits_[flag]
+			return (self._item_flags.bits[item_ids] & bit) != 0
+		raise ValueError("unrecognized flag '%s'" % flag)
+
+
+	def get_item_raw_mask(self,
+			item_ids: list = None,
+			ignore_trivial: bool = False,
+		) -> "numpy.ndarray":
+		"""
+		return whether Items are raw material as bool array; the vectorized
+		version of Item.is_raw();
+
+		PARAMETERS
+		----------
+		item_ids:
+			see RecipeSet.get_item_flag_mask();
+
+		ignore_trivial:
+			see Item.is_raw();
+		"""
+		ret = self.get_item_flag_mask("forced_raw", item_ids)\
+			| self.get_item_flag_mask("actual_raw", item_ids)
+		if not ignore_trivial:
+			ret |= self.get_item_flag_mask("trivial", item_ids)
+		return ret
+
+
+	def _get_item_alive_mask(self) -> "numpy.ndarray":
+		"""
+		(internal only) return bool array over encoded Item ids, True if the
+		Item exists, i.e. is involved in any Recipe;
+		"""
+		return (self._index.col_degrees("up")\
+			+ self._index.col_degrees("down")) > 0
+
+
+	def query_items_by_flag(self,
+			flag: str,
+			value: bool = True,
+		) -> list:
+		"""
+		get a list of names of Items with <flag> of given <value>; the
+		vectorized version of query_items();
+
+		PARAMETERS
+		----------
+		flag:
+			see RecipeSet.get_item_flag_mask();
+
+		value:
+			flag value to match;
+
+		RETURNS
+		-------
+		list of Item names;
+		"""
+		mask = self.get_item_flag_mask(flag)
+		if not value:
+			mask = _scipy_m_.logical_not(mask)
+		alive = self._get_item_alive_mask()
+		mask &= alive
+		ret = self.item_encoder.decode(_scipy_m_.nonzero(mask)[0])
+		# Items created by name only (e.g. by set_items_flag()) are not in any
+		# Recipe thus not stored in the bit array; these are checked one by one
+		if len(self._items) > alive.sum():
+			store = self._item_flags
+			for i in self.iterate_items(True):
+				if i.flags.is_bound_to(store):
+					continue
+				v = i.is_actual_raw() if flag == "actual_raw"\
+					else getattr(i.flags, flag)
+				if v == value:
+					ret.append(i.name)
+		return ret
+
+
+	def set_items_flag_value(self,
+			item_names: list,
+			flag: str,
+			value: bool = True,
+		) -> None:
+		"""
+		set <flag> of given Items to <value>; the vectorized version of
+		set_items_flag();
+
+		PARAMETERS
+		----------
+		item_names:
+			list of Item names;
+
+		flag:
+			one of the flag names of ItemFlags, see get_item_flag_mask();
+
+		value:
+			flag value to set;
+		"""
+		if flag not in _item_m_.ItemFlags._flag_bits_:
+			raise ValueError("unrecognized flag '%s'" % flag)
+		bit = _item_m_.ItemFlags._flag_bits_[flag]
+		store = self._item_flags
+		bound, others = [], []
+		for i in item_names:
+			if self.has_item(i) and self.get_item(i).flags.is_bound_to(store):
+				bound.append(i)
+			else:
+				others.append(i)
+		item_ids = self.item_encoder.encode_array(bound)
+		if value:
+			store.bits[item_ids] |= bit
+		else:
+			store.bits[item_ids] &= ~bit & 0xff
+		store.version += 1
+		# Items unknown to the encoder are kept one by one, and created if not
+		# exist, same as set_items_flag()
+		for i in others:
+			setattr(self.get_item(i).flags, flag, value)
 		return
 
 
-	def to_graph(self) -> _graph_util_m_.UnweightedDirectedGraph:
+	def get_generation(self) -> int:
+		"""
+		return the generation of this RecipeSet, which is incremented on every
+		change of Recipes through RecipeSet methods (including refresh()); thus
+		results derived from an unchanged generation are still valid;
+		"""
+		return self._generation
+
+
+	def get_memo(self, name: str) -> dict:
 		"""
-		construct an UnweightedDirectedGraph representing recipe structure base
-		on the input/output dependencies; returned graph is represent in an N by
-		N boolean array, where A_ij = True if <Recipe i> has any product that is
-		input of <Recipe j>, False otherwise;
+		return the memo dict of <name>, for caching results derived from this
+		RecipeSet (e.g. ProductionProfiler unit profiles); all memos are
+		cleared on the next change of Recipes (see get_generation()) or Item
+		flags made through RecipeSet/Item methods; memos are neither copied to
+		views nor pickled;
+
+		PARAMETERS
+		----------
+		name:
+			name of the memo, a new empty dict is created if not exists;
 
 		RETURNS
 		-------
-		construced graph (bool 2-d);
+		the memo dict;
+		"""
+		stamp = (self._generation, self._item_flags.version)
+		if self._memo_stamp != stamp:
+			self._memos = {}
+			self._memo_stamp = stamp
+		return self._memos.setdefault(name, {})
+
+
+	def verify(self, force: bool = False) -> None:
+		"""
+		verify if Recipe/Items search db is complete and correct; only the
+		actual Recipe <-> Item links are checked, in both directions;
+
+		a passed check is recorded with the current generation, and not
+		repeated until the next change (see get_generation()); Recipes modified
+		in place are only noticed after refresh(), or with <force>;
+
+		PARAMETERS
+		----------
+		force:
+			verify even if already verified in the current generation;
+
+		EXCEPTIONS
+		----------
+		InvalidRecipeSetError: if failed check
+		"""
+		if (not force) and (self._verified_generation == self._generation):
+			return
+		# check for recipes-item connection, i.e. each link of a Recipe is
+		# found in the Item, and vice versa
+		for r in self.iterate_recipes(True):
+			for i in r.products.keys():
+				if not (self.has_item(i) and (r.name in\
+						self.get_item(i).product_of)):
+					self._raise_broken_integrity(r.name, i)
+			for i in r.inputs.keys():
+				if not (self.has_item(i) and (r.name in\
+						self.get_item(i).input_of)):
+					self._raise_broken_integrity(r.name, i)
+		for i in self.iterate_items(True):
+			for r in i.product_of:
+				if not (self.has_recipe(r) and (i.name in\
+						self.get_recipe(r).products)):
+					self._raise_broken_integrity(r, i.name)
+			for r in i.input_of:
+				if not (self.has_recipe(r) and (i.name in\
+						self.get_recipe(r).inputs)):
+					self._raise_broken_integrity(r, i.name)
+		self._verified_generation = self._generation
+		return
+
+
+	@staticmethod
+	def _raise_broken_integrity(recipe_name: str, item_name: str) -> None:
+		"""
+		(internal only) raise the error of verify();
+		"""
+		raise InvalidRecipeSetError("broken integrity: r'%s' : i'%s'" %\
+			(recipe_name, item_name))
+
+
+	def to_graph(self) -> "graph_util.SparseUnweightedDirectedGraph":
 		"""
-		n_recipes = len(self._recipes)
-		# create an all-zero graph
-		graph = _graph_util_m_.UnweightedDirectedGraph(n_recipes)
-		# put data in
-		for rid, rname in enumerate(self.recipe_encoder):
-			# fetch connected recipe names from self._recipe_dwstr
-			conns = list(self._recipe_dwstr[rname])
-			# encode recipe names to ids then update
-			graph[rid, self.recipe_encoder.encode(conns)] = True
-		return graph
+		construct a SparseUnweightedDirectedGraph representing recipe structure
+		base on the input/output dependencies; vertices are encoded Recipe ids,
+		and graph[i, j] is True if <Recipe i> has any product that is input of
+		<Recipe j>, False otherwise;
 
+		RETURNS
+		-------
+		construced graph, stored as adjacency lists;
+		"""
+		# lazy load
+		from . import graph_util as _graph_util_m_
+		# NOTE: encoders may contain labels of removed recipes/items, see
+		# RecipeSet.remove_recipe(); their vertices are left unconnected
+		n_recipes = len(self.recipe_encoder)
+		upstr_ids, dwstr_ids = [], []
+		for rid in range(n_recipes):
+			conns = self._index.row_successors(rid, "down")
+			upstr_ids.extend([rid] * len(conns))
+			dwstr_ids.extend(conns)
+		return _graph_util_m_.SparseUnweightedDirectedGraph.from_edges(\
+			n_recipes, upstr_ids, dwstr_ids)
+
+
+	def to_recipe_item_index(self) -> "graph_util.BipartiteIndex":
+		"""
+		construct a BipartiteIndex between encoded Recipes (rows) and Items
+		(columns); Recipe -> Item edges are products, and Item -> Recipe edges
+		are inputs; the size of index is linear to the total number of inputs
+		and products, as opposed to the Recipe graph (see to_graph());
 
-	def to_coef_matrix(self) -> _coef_matrix_m_.CoefficientMatrix:
+		RETURNS
+		-------
+		constructed index;
+		"""
+		# lazy load
+		from . import graph_util as _graph_util_m_
+		recipe_ids = self.recipe_encoder.encode(self.iterate_recipes())
+		edges = dict(products = ([], []), inputs = ([], []))
+		for rid, recp in zip(recipe_ids, self.iterate_recipes(True)):
+			for key, items in [("products", recp.products),
+					("inputs", recp.inputs)]:
+				edges[key][0].extend([rid] * len(items))
+				edges[key][1].extend(items.keys())
+		# Items are encoded in bulk
+		return _graph_util_m_.BipartiteIndex.from_edges(\
+			(len(self.recipe_encoder), len(self.item_encoder)),
+			*[(rids, self.item_encoder.encode(inames))
+				for rids, inames in [edges["products"], edges["inputs"]]])
+
+
+	def to_coef_matrix(self) -> "coef_matrix.CoefficientMatrix":
 		"""
 		construct a coefficient matrix representing the Recipes input and yield;
 		each row is a Recipe, encoding for columns as coefficiets of different
 		Items;
 
+		the matrix is either a dense CoefficientMatrix or a
+		SparseCoefficientMatrix, by <self.coef_matrix_format>; both are sliced
+		by submatrix() into identical dense matrices;
+
 		RETURNS
 		-------
 		constructed matrix (float 2-d);
 		"""
+		# lazy load
+		from . import coef_matrix as _coef_matrix_m_
 		assert len(self.item_encoder) != 0
 		assert len(self.recipe_encoder) != 0
-		n_recipes = len(self._recipes)
-		n_items = len(self._items)
-		coef_mat = _coef_matrix_m_.CoefficientMatrix((n_recipes, n_items))
-		for rname, recp in self._recipes.items():
-			i, = self.recipe_encoder.encode([rname])
-			for iname, count in recp.inputs.items():
-				j, = self.item_encoder.encode([iname])
-				coef_mat[i, j] = -count
-			for iname, count in recp.products.items():
-				j, = self.item_encoder.encode([iname])
-				coef_mat[i, j] = count
+		n_recipes = len(self.recipe_encoder)
+		n_items = len(self.item_encoder)
+		matrix_format = self.coef_matrix_format
+		if matrix_format == "auto":
+			matrix_format = "sparse"\
+				if (n_recipes * n_items > self._sparse_coef_matrix_cells_)\
+				else "dense"
+		coef_mat = _coef_matrix_m_.get_coef_matrix_type(matrix_format).\
+			from_coo((n_recipes, n_items), *self._get_coo_triplets())
 		return coef_mat
 
 
-	def get_graph(self) -> _graph_util_m_.UnweightedDirectedGraph:
+	def _make_coo_triplets(self) -> tuple:
+		"""
+		(internal only) make coordinate (COO) triplets of the coefficient
+		matrix, for its bulk construction; see RecipeSet.to_coef_matrix();
+
+		RETURNS
+		-------
+		(recipe ids, item ids, coefficients), all as numpy.ndarray;
+		"""
+		recipe_ids = self.recipe_encoder.encode(self._recipes.keys())
+		coef_recipes, coef_items, coef_values = [], [], []
+		for rid, recp in zip(recipe_ids, self._recipes.values()):
+			# products overwrite inputs of the same Item (if not net)
+			coefs = {i: -count for i, count in recp.inputs.items()}
+			coefs.update(recp.products)
+			coef_recipes.extend([rid] * len(coefs))
+			coef_items.extend(coefs.keys())
+			coef_values.extend(coefs.values())
+		return (_scipy_m_.asarray(coef_recipes, dtype = int),
+			self.item_encoder.encode_array(coef_items),
+			_scipy_m_.asarray(coef_values, dtype = float))
+
+
+	def _get_coo_triplets(self) -> tuple:
+		"""
+		(internal only) return the COO triplets made in setup, or make new
+		ones if stale (e.g. after add_recipe()); see _make_coo_triplets();
+		"""
+		if self._coo_triplets is None:
+			return self._make_coo_triplets()
+		return self._coo_triplets
+
+
+	def _set_coef_matrix_row(self, coef_mat, row_id: int, recipe_name: str)\
+			-> None:
+		"""
+		(internal only) fill the coefficients of a Recipe into given row;
+		"""
+		recp = self.get_recipe(recipe_name)
+		coefs = {i: -count for i, count in recp.inputs.items()}
+		coefs.update(recp.products)
+		coef_mat.set_row(row_id, self.item_encoder.encode(coefs.keys()),
+			list(coefs.values()))
+		return
+
+
+	def get_graph(self) -> "graph_util.SparseUnweightedDirectedGraph":
 		"""
 		return the graph representation of this RecipeSet (lazy load);
 		"""
@@ -435,15 +1319,151 @@ class RecipeSet(object):
 		return self._graph
 
 
-	def get_coef_matrix(self) -> _coef_matrix_m_.CoefficientMatrix:
+	def get_coef_matrix(self) -> "coef_matrix.CoefficientMatrix":
 		"""
 		return the coefficient matrix of this RecipeSet (lazy load);
 		"""
 		if self._coef_mat is None:
 			self._coef_mat = self.to_coef_matrix()
+			# no longer needed
+			self._coo_triplets = None
 		return self._coef_mat
 
 
+	def to_total_requirements(self)\
+			-> "total_requirements.TotalRequirementsTable":
+		"""
+		construct the total requirements table of all Items involved in any
+		Recipe, by back-substitution in topological order; an Item is expanded
+		through its source Recipe the same way as in ProductionProfiler, unless
+		it is raw (see Item.is_raw()), multi-source (see
+		Item.is_multifurcation()), a cyclic product, or in any cycle of the
+		condensation DAG; these are the terminal Items (columns); see
+		TotalRequirementsTable;
+
+		RETURNS
+		-------
+		constructed table;
+		"""
+		# lazy load
+		from . import total_requirements as _total_requirements_m_
+		item_names = [i for i in self.iterate_items() if i in self.item_encoder]
+		item_ids = self.item_encoder.encode_array(item_names)
+		raw = self.get_item_raw_mask(item_ids)
+		dag = self.get_condensation()
+		offset = self._index.shape[0]
+		in_cycle = _scipy_m_.asarray([dag.cyclic[dag.component_of[offset + i]]
+			for i in item_ids.tolist()], dtype = bool)
+		deferred = self.get_item_flag_mask("product_of_complex_recipe",
+			item_ids) | self.get_item_flag_mask("cyclic_product", item_ids)\
+			| (self._index.col_degrees("up")[item_ids] >= 2) | in_cycle
+		deferred &= _scipy_m_.logical_not(raw)
+		terminal = (raw | deferred).tolist()
+		expanded = [i for i, t in zip(item_names, terminal) if not t]
+		columns = [i for i, t in zip(item_names, terminal) if t]
+		col_pos = {v: i for i, v in enumerate(columns)}
+		# totals of expanded Items, (I - A)^-1 B, by back-substitution: an
+		# expanded Item is neither in a cycle nor a side product, thus all its
+		# inputs are terminal or expanded Items of earlier components of the
+		# condensation DAG; no linear solve is needed, and a column is non-zero
+		# only if actually reachable from the row
+		rows, cols, values = [], [], []
+		item_rows = {v: i for i, v in enumerate(item_names)}
+		id_list = item_ids.tolist()
+		expanded.sort(key = lambda i: dag.component_of[offset\
+			+ id_list[item_rows[i]]])
+		# "item_name": {column: total}
+		totals = dict()
+		for iname in expanded:
+			rname, = self.get_item(iname).product_of
+			recp = self.get_recipe(rname)
+			scale = 1.0 / recp.products[iname]
+			total = dict()
+			for i, v in recp.inputs.items():
+				v *= scale
+				for col, w in (totals[i].items() if i in totals\
+						else [(col_pos[i], 1.0)]):
+					total[col] = total.get(col, 0.0) + v * w
+			# prune float noise relative to the largest requirement
+			atol = max([abs(v) for v in total.values()], default = 0.0)\
+				* self._total_requirements_rtol_
+			totals[iname] = {k: v for k, v in total.items() if abs(v) > atol}
+			rows.extend([item_rows[iname]] * len(totals[iname]))
+			cols.extend(totals[iname].keys())
+			values.extend(totals[iname].values())
+		# terminal Items are identity
+		rows.extend([i for i, t in enumerate(terminal) if t])
+		cols.extend(range(len(columns)))
+		values.extend([1.0] * len(columns))
+		matrix = _scipy_m_.csr_matrix((_scipy_m_.asarray(values, dtype = float),
+			(_scipy_m_.asarray(rows, dtype = int),
+			_scipy_m_.asarray(cols, dtype = int))),
+			shape = (len(item_names), len(columns)))
+		column_is_raw = [r for r, t in zip(raw.tolist(), terminal) if t]
+		return _total_requirements_m_.TotalRequirementsTable(item_names,
+			columns, column_is_raw, matrix)
+
+
+	def get_total_requirements(self)\
+			-> "total_requirements.TotalRequirementsTable":
+		"""
+		return the total requirements table of this RecipeSet (lazy load), for
+		instant lookups of raw inputs per unit of every Item; it is built on
+		first use and rebuilt after the next change of Recipes or Item flags;
+		it is not pickled; see to_total_requirements();
+		"""
+		stamp = (self._generation, self._item_flags.bits.tobytes())
+		if (self._total_requirements is None)\
+				or (self._total_requirements_stamp != stamp):
+			self._total_requirements = self.to_total_requirements()
+			self._total_requirements_stamp = stamp
+		return self._total_requirements
+
+
+	def get_recipe_item_index(self) -> "graph_util.BipartiteIndex":
+		"""
+		return the Recipe <-> Item index of this RecipeSet; see
+		RecipeSet.to_recipe_item_index();
+		"""
+		return self._index
+
+
+	def get_condensation(self) -> "graph_util.CondensationDAG":
+		"""
+		return the condensation DAG of Recipes and Items (lazy load), i.e.
+		cyclic groups collapsed into single components, in topological order
+		(from raw Items towards final products) with depth levels; it is cached
+		until the next change of Recipes (including refresh());
+
+		vertices are encoded Recipe ids (0, ..., #Recipes - 1) and Item ids
+		offset by #Recipes, both from the current encoders; edges are Recipe ->
+		product Item and input Item -> Recipe; use
+		decode_condensation_vertices() to get names; see
+		graph_util.CondensationDAG for more information;
+		"""
+		return self._index.get_condensation()
+
+
+	def decode_condensation_vertices(self, vertices: list) -> (list, list):
+		"""
+		decode vertices of the condensation DAG into names; see
+		RecipeSet.get_condensation();
+
+		RETURNS
+		-------
+		recipe_names (list):
+			names of Recipes in <vertices>, in the same order;
+
+		item_names (list):
+			names of Items in <vertices>, in the same order;
+		"""
+		n_recipes = self._index.shape[0]
+		recipe_ids = [v for v in vertices if v < n_recipes]
+		item_ids = [v - n_recipes for v in vertices if v >= n_recipes]
+		return (self.recipe_encoder.decode(recipe_ids),
+			self.item_encoder.decode(item_ids))
+
+
 	def get_directly_connected_recipes(self,
 			recipe_name: str,
 			direction: "up" or "down" or "both",
@@ -469,10 +1489,12 @@ class RecipeSet(object):
 		----------
 		ValueError: if 'direction' is an unrecognized value;
 		"""
-		if direction == "up":
-			return self._recipe_upstr[recipe_name]
-		elif direction == "down":
-			return self._recipe_dwstr[recipe_name]
+		if direction in ["up", "down"]:
+			if not self.has_recipe(recipe_name):
+				return set()
+			rid = self.recipe_encoder.encode([recipe_name])[0]
+			return set(self.recipe_encoder.decode(\
+				self._index.row_successors(rid, direction)))
 		elif direction == "both":
 			return set.union(\
 				self.get_directly_connected_recipes(recipe_name, "up"),
@@ -503,26 +1525,43 @@ class RecipeSet(object):
 		-------
 		a dict in signature "recipe": Recipe;
 		"""
-		if direction == "up":
-			# in stack_init, copy() is necessary
-			stack_init = lambda x: self.get_item(x).product_of.copy()
-		elif direction == "down":
-			stack_init = lambda x: self.get_item(x).input_of.copy()
-		else:
+		return self.fetch_recipes_in_dependency_of_items([item_name],
+			direction)
+
+
+	def fetch_recipes_in_dependency_of_items(self,
+			item_names: list,
+			direction: "up" or "down",
+		) -> dict:
+		"""
+		fetch all Recipes with dependency to any of given Items, both directly
+		and indirectly; closures are memoized in the Recipe <-> Item index as
+		bitsets, thus repeated queries and merging multiple Items are cheap;
+		the memo is dropped on any change of Recipes;
+
+		PARAMETERS
+		----------
+		item_names:
+			names of the start items to traverse;
+
+		direction:
+			see RecipeSet.fetch_recipes_in_dependency();
+
+		RETURNS
+		-------
+		a dict in signature "recipe": Recipe;
+		"""
+		# lazy load
+		from . import graph_util as _graph_util_m_
+		if direction not in ["up", "down"]:
 			raise ValueError("unrecognized 'direction' value '%s'"\
 				% direction)
-		ret = dict()
-		# here using the set as stack
-		stack = stack_init(item_name)
-		while stack:
-			rname = stack.pop()
-			if rname in ret:
-				continue
-			else:
-				ret[rname] = self.get_recipe(rname)
-				stack.update(self.\
-					get_directly_connected_recipes(rname, direction))
-		return ret
+		# Items unknown to the encoder are not involved in any Recipe
+		item_ids = self.item_encoder.encode(\
+			[i for i in item_names if i in self.item_encoder])
+		mask = self._index.reachable_row_mask(item_ids, direction)
+		rnames = self.recipe_encoder.decode(_graph_util_m_.bitset_to_ids(mask))
+		return {r: self.get_recipe(r) for r in rnames}
 
 
 	def extract_items_from_recipes(self,
@@ -622,6 +1661,10 @@ class RecipeSetEmbed(object):
 				return self._rset_emb_recipe_set.\
 					fetch_recipes_in_dependency(*ka, **kw)
 
+			def fetch_recipes_in_dependency_of_items(self, *ka, **kw) -> dict:
+				return self._rset_emb_recipe_set.\
+					fetch_recipes_in_dependency_of_items(*ka, **kw)
+
 			def extract_items_from_recipes(self, *ka, **kw) -> set:
 				return self._rset_emb_recipe_set.\
 					extract_items_from_recipes(*ka, **kw)
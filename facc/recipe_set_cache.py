@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+import os as _os_m_
+import json as _json_m_
+import pickle as _pickle_m_
+import hashlib as _hashlib_m_
+import tempfile as _tempfile_m_
+from . import recipe_set as _recipe_set_m_
+
+
+class CompiledRecipeSetCache(object):
+	"""
+	on-disk cache of compiled RecipeSet's; each entry is a pickled RecipeSet
+	with its search caches, encoders, Recipe/Item index, coefficient matrix
+	and cyclic flags already resolved, thus loading an entry skips all the
+	setup work; the total requirements table is not included, it depends on
+	Item flags which are usually applied after loading;
+	"""
+	# bump this when the pickled layout of RecipeSet (or any of its members)
+	# changes, or when compiled results change (e.g. cyclic group validity);
+	# old entries are then never hit again
+	_format_version_ = 15
+	_file_suffix_ = ".rset.pkl"
+	# sha256 hex digest of the facc source files, see get_source_hash()
+	_source_hash_ = None
+
+
+	def __init__(self,
+			cache_dir: str,
+		) -> None:
+		"""
+		PARAMETERS
+		----------
+		cache_dir:
+			directory to store the compiled entries; created on first save if
+			not exists;
+		"""
+		super(CompiledRecipeSetCache, self).__init__()
+		self.cache_dir = str(cache_dir)
+		return
+
+
+	@staticmethod
+	def hash_file(file_name: str, chunk_size: int = 1 << 20) -> str:
+		"""
+		return the sha256 hex digest of the file content;
+		"""
+		h = _hashlib_m_.sha256()
+		with open(file_name, "rb") as fh:
+			for chunk in iter(lambda: fh.read(chunk_size), b""):
+				h.update(chunk)
+		return h.hexdigest()
+
+
+	@classmethod
+	def get_source_hash(cls) -> str:
+		"""
+		return the sha256 hex digest of all source files of facc (computed
+		once per process); compiled entries depend on the code building them,
+		thus any change of the code invalidates them, even without bumping the
+		format version;
+		"""
+		if cls._source_hash_ is None:
+			h = _hashlib_m_.sha256()
+			src_dir = _os_m_.path.dirname(_os_m_.path.abspath(__file__))
+			for name in sorted(_os_m_.listdir(src_dir)):
+				if not name.endswith(".py"):
+					continue
+				h.update(name.encode() + b"\x00")
+				h.update(cls.hash_file(_os_m_.path.join(src_dir, name))\
+					.encode())
+			cls._source_hash_ = h.hexdigest()
+		return cls._source_hash_
+
+
+	@classmethod
+	def make_key(cls, *parts) -> str:
+		"""
+		make a cache key from given parts; each part must be json serializable;
+		the cache format version and the facc source hash (see
+		get_source_hash()) are always included;
+
+		PARAMETERS
+		----------
+		*parts:
+			e.g. the content hash of the recipe database, yield level, sorted
+			list of excluded recipes, etc.;
+
+		RETURNS
+		-------
+		key string (sha256 hex digest);
+		"""
+		h = _hashlib_m_.sha256()
+		h.update(("v%d" % cls._format_version_).encode())
+		h.update(cls.get_source_hash().encode())
+		for p in parts:
+			h.update(_json_m_.dumps(p, sort_keys = True).encode())
+			# separator, avoid ambiguity between parts
+			h.update(b"\x00")
+		return h.hexdigest()
+
+
+	def _entry_path(self, key: str) -> str:
+		"""
+		(internal only) file path of the entry with given key;
+		"""
+		return _os_m_.path.join(self.cache_dir, key + self._file_suffix_)
+
+
+	def has(self, key: str) -> bool:
+		"""
+		return True if an entry with <key> exists;
+		"""
+		return _os_m_.path.isfile(self._entry_path(key))
+
+
+	def load(self, key: str) -> _recipe_set_m_.RecipeSet or None:
+		"""
+		load the compiled RecipeSet by key;
+
+		RETURNS
+		-------
+		the loaded RecipeSet; None if the entry does not exist or is not usable
+		(e.g. corrupted or written by an incompatible version);
+		"""
+		try:
+			with open(self._entry_path(key), "rb") as fh:
+				ret = _pickle_m_.load(fh)
+		except (OSError, EOFError, _pickle_m_.UnpicklingError,
+				AttributeError, ImportError, TypeError, ValueError):
+			return None
+		if not isinstance(ret, _recipe_set_m_.RecipeSet):
+			return None
+		return ret
+
+
+	def save(self,
+			key: str,
+			recipe_set: _recipe_set_m_.RecipeSet,
+		) -> None:
+		"""
+		save a RecipeSet as compiled entry; the lazy loaded coefficient matrix
+		is forced to be resolved before saving, such that it is also included
+		in the entry; the graph is not included, it is derived from the index
+		on demand;
+
+		the entry is written into a temporary file first then moved in place,
+		concurrent writers/readers will never see a partially written entry;
+		"""
+		if not isinstance(recipe_set, _recipe_set_m_.RecipeSet):
+			raise TypeError("'recipe_set' must be of type 'RecipeSet'")
+		recipe_set.get_coef_matrix()
+		_os_m_.makedirs(self.cache_dir, exist_ok = True)
+		fd, tmp = _tempfile_m_.mkstemp(dir = self.cache_dir, suffix = ".tmp")
+		try:
+			with _os_m_.fdopen(fd, "wb") as fh:
+				_pickle_m_.dump(recipe_set, fh,
+					protocol = _pickle_m_.HIGHEST_PROTOCOL)
+			_os_m_.replace(tmp, self._entry_path(key))
+		except BaseException:
+			if _os_m_.path.exists(tmp):
+				_os_m_.remove(tmp)
+			raise
+		return
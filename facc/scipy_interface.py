@@ -1,6 +1,44 @@
 #!/usr/bin/env python3
 # by using this module, a separate interface for foreign routines can be created
+#
+# the foreign modules are imported lazily, i.e. on first access of a name;
+# importing numpy/scipy dominates the start-up time, while many paths (e.g.
+# listing, argument errors) never need them; thus 'import facc' must stay free
+# of both (see README 'Start-up time')
 
-from numpy import asarray, dot, hstack, isclose, ix_, logical_and, logical_not,\
-	logical_or, ndarray, nonzero, ones, take, vstack, zeros
-from scipy.optimize import linprog
+import sys as _sys_m_
+import types as _types_m_
+import importlib as _importlib_m_
+
+
+# exported names, in signature "name": "module"
+_LAZY_NAMES_ = dict(
+	**{k: "numpy" for k in ["around", "asarray", "dot", "fromiter", "hstack",
+		"isclose", "ix_", "logical_and", "logical_not", "logical_or", "ndarray",
+		"nonzero", "ones", "take", "vstack", "zeros"]},
+	linprog = "scipy.optimize",
+	csr_matrix = "scipy.sparse",
+)
+
+
+class _LazyInterfaceModule(_types_m_.ModuleType):
+	"""
+	module type resolving exported names on first access;
+	"""
+	def __getattr__(self, name):
+		# only called when <name> is not found as regular attribute
+		if name not in _LAZY_NAMES_:
+			raise AttributeError("module '%s' has no attribute '%s'"\
+				% (self.__name__, name))
+		value = getattr(_importlib_m_.import_module(_LAZY_NAMES_[name]), name)
+		# cache as regular attribute, later access won't reach here
+		setattr(self, name, value)
+		return value
+
+
+	def __dir__(self):
+		return sorted(set(super(_LazyInterfaceModule, self).__dir__())\
+			| set(_LAZY_NAMES_))
+
+
+_sys_m_.modules[__name__].__class__ = _LazyInterfaceModule
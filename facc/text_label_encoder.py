@@ -3,6 +3,8 @@
 #import collections as _collections_m_
 import numbers as _numbers_m_
 
+from . import scipy_interface as _scipy_m_
+
 
 class TextLabelEncoder(object):
 	"""
@@ -16,9 +18,29 @@ class TextLabelEncoder(object):
 	def __init__(self) -> None:
 		super(TextLabelEncoder, self).__init__()
 		self._encode_dict = {}
-		self._decode_list = {}
+		self._decode_list = []
+		self._encoding_ = lambda x: self._encode_dict[x]
+		self._decoding_ = lambda x: self._decode_list[x]
+		# object array of labels indexed by id, for decode_array() (lazy load)
+		self._decode_array = None
+		return
+
+
+	def __getstate__(self) -> dict:
+		# lambda expressions are not picklable; rebuilt in __setstate__
+		# the decoding array is cheap to rebuild, thus not pickled either
+		state = vars(self).copy()
+		state.pop("_encoding_", None)
+		state.pop("_decoding_", None)
+		state.pop("_decode_array", None)
+		return state
+
+
+	def __setstate__(self, state: dict) -> None:
+		vars(self).update(state)
 		self._encoding_ = lambda x: self._encode_dict[x]
 		self._decoding_ = lambda x: self._decode_list[x]
+		self._decode_array = None
 		return
 
 
@@ -30,12 +52,29 @@ class TextLabelEncoder(object):
 		return iter(self._decode_list)
 
 
+	def __contains__(self, label):
+		return label in self._encode_dict
+
+
+	def copy(self) -> "TextLabelEncoder":
+		"""
+		return a new encoder with identical trained maps;
+		"""
+		new = type(self)()
+		new._encode_dict.update(self._encode_dict)
+		new._decode_list.extend(self._decode_list)
+		# never modified in-place, thus shared
+		new._decode_array = self._decode_array
+		return new
+
+
 	def reset(self) -> None:
 		"""
 		reset trained maps
 		"""
 		self._encode_dict.clear()
 		self._decode_list.clear()
+		self._decode_array = None
 		return
 
 
@@ -66,6 +105,50 @@ class TextLabelEncoder(object):
 		return
 
 
+	def extend(self,
+			labels: list,
+		) -> None:
+		"""
+		add new labels without retraining; new labels are assigned with ids
+		following the current largest, labels already known are ignored; ids of
+		known labels are not changed; NOTE: after extending, the decoding order
+		is no longer guaranteed sorted;
+
+		PARAMETERS
+		----------
+		labels: a list of str instances
+
+		EXCEPTIONS
+		----------
+		TypeError: if any label misses the expected type
+		"""
+		labels = list(labels)
+		if not all([isinstance(i, str) for i in labels]):
+			raise TypeError("each label must be of type 'str'")
+		n_old = len(self._decode_list)
+		for i in labels:
+			if i not in self._encode_dict:
+				self._encode_dict[i] = len(self._decode_list)
+				self._decode_list.append(i)
+		# only the new tail is appended to the decoding array, if already built
+		if (self._decode_array is not None)\
+				and (len(self._decode_list) > n_old):
+			self._decode_array = _scipy_m_.hstack([self._decode_array,
+				_scipy_m_.asarray(self._decode_list[n_old:], dtype = object)])
+		return
+
+
+	def _get_decode_array(self) -> "numpy.ndarray":
+		"""
+		(internal only) return labels as object array indexed by id (lazy
+		load);
+		"""
+		if self._decode_array is None:
+			self._decode_array = _scipy_m_.asarray(self._decode_list,
+				dtype = object)
+		return self._decode_array
+
+
 	def encode(self,
 			labels: list,
 		) -> int or list:
@@ -79,8 +162,35 @@ class TextLabelEncoder(object):
 		RETURNS
 		-------
 		list of encoded ids;
+
+		EXCEPTIONS
+		----------
+		KeyError: if any label is unknown;
+		"""
+		return list(map(self._encode_dict.__getitem__, labels))
+
+
+	def encode_array(self,
+			labels: list or "numpy.ndarray",
+		) -> "numpy.ndarray":
+		"""
+		encode the input labels into an int array; the bulk version of
+		encode();
+
+		PARAMETERS
+		----------
+		labels: iterable of labels (incl. 1-d numpy str array) to be encoded;
+
+		RETURNS
+		-------
+		int array of encoded ids;
+
+		EXCEPTIONS
+		----------
+		KeyError: if any label is unknown;
 		"""
-		return [self._encoding_(i) for i in labels]
+		# hashed lookups beat a binary search over fixed-width numpy strings
+		return _scipy_m_.asarray(self.encode(labels), dtype = int)
 
 
 	def decode(self,
@@ -97,4 +207,25 @@ class TextLabelEncoder(object):
 		-------
 		list of decoded labels
 		"""
-		return [self._decoding_(i) for i in label_ids]
+		if isinstance(label_ids, _scipy_m_.ndarray):
+			return self.decode_array(label_ids).tolist()
+		return list(map(self._decode_list.__getitem__, label_ids))
+
+
+	def decode_array(self,
+			label_ids: list or "numpy.ndarray",
+		) -> "numpy.ndarray":
+		"""
+		decode the input label ids into an object array of labels, by fancy
+		indexing; the bulk version of decode();
+
+		PARAMETERS
+		----------
+		label_ids: list or numpy int array of label ids to be decoded
+
+		RETURNS
+		-------
+		object array of decoded labels, in the same shape as <label_ids>
+		"""
+		return self._get_decode_array()[_scipy_m_.asarray(label_ids,
+			dtype = int)]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+from . import scipy_interface as _scipy_m_
+
+
+class TotalRequirementsTable(object):
+	"""
+	total requirements of producing one unit of each Item, as in an input-
+	output model; Items are split into expanded ones (produced by a single
+	Recipe, not raw and not in any cycle) and terminal ones (raw materials, and
+	Items deferred to the linear programming optimizer, i.e. multi-source,
+	cyclic products or in cycles); with A the direct requirements among
+	expanded Items and B those of terminal Items, the totals per unit of
+	expanded Items are (I - A)^-1 B; rows of terminal Items are identity;
+
+	rows are Items and columns are terminal Items; the table is immutable, see
+	RecipeSet.get_total_requirements() for building it;
+	"""
+	def __init__(self,
+			item_names: list,
+			column_names: list,
+			column_is_raw: list,
+			matrix: "scipy.sparse.csr_matrix",
+		) -> None:
+		"""
+		PARAMETERS
+		----------
+		item_names:
+			names of Items as rows;
+
+		column_names:
+			names of terminal Items as columns;
+
+		column_is_raw:
+			bool for each column, True if the Item is raw material, False if
+			deferred to optimization;
+
+		matrix:
+			sparse matrix of total requirements, #rows by #columns;
+		"""
+		super(TotalRequirementsTable, self).__init__()
+		self.item_names = list(item_names)
+		self.column_names = list(column_names)
+		self.column_is_raw = [bool(i) for i in column_is_raw]
+		self.matrix = matrix
+		# "item_name": row id
+		self._rows = {v: i for i, v in enumerate(self.item_names)}
+		return
+
+
+	def __len__(self) -> int:
+		return len(self.item_names)
+
+
+	def __contains__(self, item_name: str) -> bool:
+		return item_name in self._rows
+
+
+	def _split_columns(self,
+			values: "numpy.ndarray",
+		) -> (dict, dict):
+		"""
+		(internal only) split non-zero values of columns into raw and deferred
+		dicts;
+		"""
+		raw, deferred = {}, {}
+		for col in _scipy_m_.nonzero(values)[0].tolist():
+			dest = raw if self.column_is_raw[col] else deferred
+			dest[self.column_names[col]] = float(values[col])
+		return raw, deferred
+
+
+	def get_requirements(self,
+			item_name: str,
+		) -> (dict, dict):
+		"""
+		return the total requirements of producing one <item_name>;
+
+		RETURNS
+		-------
+		raw_inputs (dict in signature "item": count):
+			raw input Items;
+
+		deferred (dict in signature "item": count):
+			Items to be resolved by the linear programming optimizer;
+
+		EXCEPTIONS
+		----------
+		KeyError: if <item_name> is not in the table;
+		"""
+		row = self.matrix.getrow(self._rows[item_name])
+		return self._split_columns(row.toarray().ravel())
+
+
+	def calculate(self,
+			targets: dict,
+		) -> (dict, dict):
+		"""
+		return the total requirements of production targets, as the sum of
+		scaled rows;
+
+		PARAMETERS
+		----------
+		targets:
+			dict of targets in signature "item": count;
+
+		RETURNS
+		-------
+		see TotalRequirementsTable.get_requirements();
+
+		EXCEPTIONS
+		----------
+		KeyError: if any target is not in the table;
+		"""
+		x = _scipy_m_.zeros(len(self), dtype = float)
+		for item_name, count in targets.items():
+			x[self._rows[item_name]] += count
+		return self._split_columns(self.matrix.T.dot(x))
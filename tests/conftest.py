@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import argparse
+import collections as _collections_m_
+import collections.abc as _collections_abc_m_
+import os as _os_m_
+import runpy
+import sys as _sys_m_
+
+import numpy
+import pytest
+
+# facc annotates with collections.Iterable, which moved to collections.abc
+# since Python 3.10
+if not hasattr(_collections_m_, "Iterable"):
+	_collections_m_.Iterable = _collections_abc_m_.Iterable
+ROOT_DIR = _os_m_.path.dirname(_os_m_.path.dirname(_os_m_.path.abspath(\
+	__file__)))
+_sys_m_.path.insert(0, ROOT_DIR)
+
+import facc
+
+
+def make_recipes() -> list:
+	"""
+	a small recipe list with a plain chain (circuit), a multi-source Item
+	(gas, resolved by optimization) and a valid cyclic group (fuel-cell,
+	burn-cell and reprocess);
+	"""
+	R = facc.Recipe
+	return [
+		R({"iron-ore": 1}, {"iron-plate": 1}, "smelting", 3.2),
+		R({"copper-ore": 1}, {"copper-plate": 1}, "smelting", 3.2),
+		R({"copper-plate": 1}, {"copper-cable": 2}, "crafting", 0.5),
+		R({"iron-plate": 1, "copper-cable": 3}, {"circuit": 1}, "crafting",
+			0.5),
+		R({"coal": 1}, {"gas": 2}, "chemistry", 1.0, "coal-gas"),
+		R({"oil": 1}, {"gas": 3}, "chemistry", 1.0, "oil-gas"),
+		R({"gas": 2, "coal": 1}, {"plastic": 1}, "chemistry", 1.0),
+		R({"uranium-ore": 10}, {"uranium": 1}, "centrifuging", 12.0,
+			"uranium-processing"),
+		R({"uranium": 1, "iron-plate": 1}, {"fuel-cell": 1}, "crafting",
+			10.0),
+		R({"fuel-cell": 1}, {"spent-cell": 1}, "burning", 200.0, "burn-cell"),
+		R({"spent-cell": 2}, {"uranium": 1}, "centrifuging", 60.0,
+			"reprocess"),
+	]
+
+
+def recipe_set_state(recipe_set: facc.RecipeSet) -> dict:
+	"""
+	canonical state of a RecipeSet by names, independent of the encoding;
+	for comparing sets built in different ways;
+	"""
+	items = {}
+	for i in recipe_set.iterate_items(True):
+		items[i.name] = (sorted(i.input_of), sorted(i.product_of),
+			i.is_product_of_complex_recipe(), i.is_cyclic_product(),
+			i.is_trivial(), i.is_forced_raw(), i.is_raw())
+	links = {r: (sorted(recipe_set.get_directly_connected_recipes(r, "up")),
+			sorted(recipe_set.get_directly_connected_recipes(r, "down")))
+		for r in recipe_set.iterate_recipes()}
+	coef_mat = recipe_set.get_coef_matrix().toarray()
+	coefs = {}
+	for r in recipe_set.iterate_recipes():
+		row = coef_mat[recipe_set.recipe_encoder.encode([r])[0]]
+		coefs[r] = {recipe_set.item_encoder.decode([j])[0]: float(row[j])
+			for j in row.nonzero()[0]}
+	cyclic_groups = {tuple(sorted(g)): v
+		for g, v in recipe_set._cyclic_groups.items()}
+	return dict(items = items, links = links, coefs = coefs,
+		cyclic_groups = cyclic_groups)
+
+
+def make_args(factorious: dict, *argv) -> argparse.Namespace:
+	"""
+	parse the command line arguments of Factorious;
+	"""
+	old_argv = _sys_m_.argv
+	_sys_m_.argv = ["Factorious"] + list(argv)
+	try:
+		return factorious["get_args"]()
+	finally:
+		_sys_m_.argv = old_argv
+
+
+@pytest.fixture(scope = "session")
+def factorious() -> dict:
+	"""
+	the global namespace of the Factorious command line tool;
+	"""
+	old_cwd = _os_m_.getcwd()
+	_os_m_.chdir(ROOT_DIR)
+	try:
+		return runpy.run_path(_os_m_.path.join(ROOT_DIR, "Factorious"),
+			run_name = "factorious")
+	finally:
+		_os_m_.chdir(old_cwd)
+
+
+@pytest.fixture(autouse = True)
+def _root_dir(monkeypatch) -> None:
+	# recipe databases are located relative to the top directory
+	monkeypatch.chdir(ROOT_DIR)
+	return
+
+
+@pytest.fixture
+def recipe_set() -> facc.RecipeSet:
+	return facc.RecipeSet(make_recipes())
+
+
+@pytest.fixture
+def optim_args() -> dict:
+	"""
+	optimizer arguments as set by the command line with default options; a
+	new dict for each test, the optimizer may update it in place;
+	"""
+	return dict(weights = {}, ignore_trivial = False, no_cyclic = False,
+		tol = 1e-6)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+import json
+
+import pytest
+
+from conftest import make_args
+
+
+LINES = [
+	'{"id": "a", "targets": {"inserter": 10, "iron-plate": 20}}\n',
+	"iron-gear-wheel,5,inserter,2\n",
+	"\n",
+	'{"id": "bad-item", "targets": {"no-such-item": 1}}\n',
+	"inserter\n",
+	'{"targets": "inserter,3:plastic-bar,4"}\n',
+	'{"id": "zero", "targets": {"inserter": 0}}\n',
+]
+
+
+def _make_network(factorious, args):
+	# as set up by main()
+	recipe_set = factorious["load_compiled_recipe_set"](args)
+	factorious["apply_maunal_item_flags"](recipe_set,
+		raw_items = args.refined_raws, trivial_items = args.refined_trivials)
+	return factorious["ExportableProductionNetwork"](recipe_set)
+
+
+def _calculate_single(factorious, targets: dict, *argv) -> dict:
+	args = make_args(factorious, "--no-cache", *argv,
+		":".join("%s,%r" % i for i in targets.items()))
+	prod_network = _make_network(factorious, args)
+	prod_network.calculate_targets(args.refined_targets,
+		optim_args = factorious["get_optim_args"](args))
+	return prod_network.to_record()
+
+
+@pytest.mark.parametrize("argv", [[], ["-L", "-y", "expensive"]])
+def test_batch_equals_single(factorious, argv):
+	args = make_args(factorious, "--no-cache", "--batch", "-", *argv)
+	prod_network = _make_network(factorious, args)
+	results = list(factorious["iterate_batch_results"](prod_network, LINES,
+		args))
+	# one record per non-empty line, in order
+	assert [r["id"] for r in results]\
+		== ["a", 2, "bad-item", 5, 6, "zero"]
+	for rec, targets in [(results[0], {"inserter": 10.0, "iron-plate": 20.0}),
+			(results[1], {"iron-gear-wheel": 5.0, "inserter": 2.0}),
+			(results[4], {"inserter": 3.0, "plastic-bar": 4.0})]:
+		expected = _calculate_single(factorious, targets, *argv)
+		assert {k: v for k, v in rec.items() if k != "id"} == expected
+	for rec in [results[2], results[3]]:
+		assert set(rec) == {"id", "error"}
+	assert "no-such-item" in results[2]["error"]
+	# the line end is not part of the message
+	assert results[3]["error"].endswith("pairs: 'inserter'")
+	# nothing to calculate
+	assert results[5]["recipe_execs"] == {}
+
+
+def test_run_batch_files(factorious, tmp_path):
+	batch_in, batch_out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+	batch_in.write_text("".join(LINES))
+	args = make_args(factorious, "--no-cache", "--batch", str(batch_in),
+		"--batch-output", str(batch_out))
+	prod_network = _make_network(factorious, args)
+	factorious["run_batch"](prod_network, args)
+	results = [json.loads(l) for l in batch_out.read_text().splitlines()]
+	assert results == list(factorious["iterate_batch_results"](\
+		_make_network(factorious, args), LINES, args))
+
+
+@pytest.mark.parametrize("count", ["null", "[1]", '{"n": 1}', "true", '"x"',
+	"1e15", "1e-9", "NaN", "Infinity", "-Infinity", '"nan"', '"-inf"'])
+def test_bad_count_keeps_id(factorious, count):
+	args = make_args(factorious, "--no-cache", "--batch", "-")
+	line = '{"id": "rec", "targets": {"inserter": %s}}' % count
+	results = list(factorious["iterate_batch_results"](\
+		_make_network(factorious, args), [line, "inserter,1"], args))
+	assert set(results[0]) == {"id", "error"}
+	assert results[0]["id"] == "rec"
+	assert results[0]["error"].startswith("ValueError")
+	# the run goes on
+	assert "recipe_execs" in results[1]
+
+
+def test_total_requirements(factorious):
+	args = make_args(factorious, "--no-cache", "--batch", "-",
+		"--total-requirements")
+	prod_network = _make_network(factorious, args)
+	lines = ["inserter,10", "inserter,10,plastic-bar,5"]
+	plain, mixed = factorious["iterate_batch_results"](prod_network, lines,
+		args)
+	# without multi-source or cyclic Items, equal to the optimized inputs
+	assert plain["total_requirements"]["deferred"] == {}
+	assert plain["total_requirements"]["raw_inputs"]\
+		== pytest.approx(plain["raw_inputs"], rel = 1e-9)
+	table = prod_network.get_recipe_set().get_total_requirements()
+	raws, deferred = table.calculate({"inserter": 10.0, "plastic-bar": 5.0})
+	assert mixed["total_requirements"] == dict(raw_inputs = raws,
+		deferred = deferred)
+	assert set(deferred) == {"petroleum-gas"}
+
+
+def test_non_finite_csv_count(factorious):
+	args = make_args(factorious, "--no-cache", "--batch", "-")
+	results = list(factorious["iterate_batch_results"](\
+		_make_network(factorious, args), ["inserter,nan", "inserter,inf"],
+		args))
+	for rec in results:
+		assert rec["error"].startswith("ValueError: bad target count")
+
+
+def test_dump_record_strict(factorious):
+	text, ok = factorious["dump_record"](dict(id = 1, raw_inputs = {"coal":
+		1.5}))
+	assert ok and json.loads(text) == dict(id = 1, raw_inputs = {"coal": 1.5})
+	text, ok = factorious["dump_record"](dict(id = 1, raw_inputs = {"coal":
+		float("nan")}))
+	assert not ok
+	assert "NaN" not in text
+	assert set(json.loads(text)) == {"id", "error"}
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import pickle
+
+import numpy
+import pytest
+
+from facc.coef_matrix import CoefficientMatrix, SparseCoefficientMatrix,\
+	get_coef_matrix_type
+
+
+def _random_rows(rng, shape, n_rows) -> list:
+	ret = []
+	for _ in range(n_rows):
+		cols = rng.choice(shape[1], size = rng.integers(0, 4), replace = False)
+		ret.append((int(rng.integers(shape[0])), sorted(cols.tolist()),
+			rng.choice([-3.0, -1.0, 0.5, 2.0], size = len(cols)).tolist()))
+	return ret
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sparse_ops_equal_dense(seed):
+	rng = numpy.random.default_rng(seed)
+	shape = (8, 11)
+	dense, sparse = CoefficientMatrix(shape), SparseCoefficientMatrix(shape)
+	for row_id, col_ids, values in _random_rows(rng, shape, 30):
+		for m in [dense, sparse]:
+			m.set_row(row_id, col_ids, values)
+		numpy.testing.assert_array_equal(dense.toarray(), sparse.toarray())
+		rows = rng.choice(shape[0], size = 3, replace = False).tolist()
+		cols = rng.choice(shape[1], size = 4, replace = False).tolist()
+		numpy.testing.assert_array_equal(dense.submatrix(rows, cols),
+			sparse.submatrix(rows, cols))
+	assert sparse.nnz() == numpy.count_nonzero(sparse.toarray())
+	numpy.testing.assert_array_equal(sparse.tocsr().toarray(),
+		dense.toarray())
+	# expanded matrices are independent of the origin
+	dense_x, sparse_x = dense.expand((10, 12)), sparse.expand((10, 12))
+	numpy.testing.assert_array_equal(dense_x.toarray()[:8, :11],
+		sparse.toarray())
+	for m in [dense_x, sparse_x]:
+		m.set_row(9, [11], [1.0])
+		m.set_row(0, [], [])
+	numpy.testing.assert_array_equal(dense_x.toarray(), sparse_x.toarray())
+	numpy.testing.assert_array_equal(dense.toarray(), sparse.toarray())
+
+
+def test_sparse_copy_and_pickle():
+	m = SparseCoefficientMatrix((3, 4))
+	m.set_row(1, [0, 3], [1.0, -2.0])
+	m.tocsr()
+	new = m.copy()
+	new.set_row(1, [2], [5.0])
+	assert m.toarray().tolist() == [[0] * 4, [1, 0, 0, -2], [0] * 4]
+	loaded = pickle.loads(pickle.dumps(new))
+	numpy.testing.assert_array_equal(loaded.toarray(), new.toarray())
+
+
+def test_bad_shape_and_row():
+	for matrix_t in [CoefficientMatrix, SparseCoefficientMatrix]:
+		m = matrix_t((3, 4))
+		with pytest.raises(ValueError):
+			m.expand((2, 4))
+		with pytest.raises(IndexError):
+			m.set_row(3, [0], [1.0])
+
+
+def test_get_coef_matrix_type():
+	assert get_coef_matrix_type("dense") is CoefficientMatrix
+	assert get_coef_matrix_type("sparse") is SparseCoefficientMatrix
+	with pytest.raises(ValueError):
+		get_coef_matrix_type("csr")
+
+
+@pytest.mark.parametrize("matrix_t", [CoefficientMatrix,
+	SparseCoefficientMatrix])
+@pytest.mark.parametrize("seed", range(5))
+def test_from_coo_equals_set_row(matrix_t, seed):
+	rng = numpy.random.default_rng(seed)
+	shape = (9, 7)
+	expected = matrix_t(shape)
+	row_ids, col_ids, values = [], [], []
+	for row_id in rng.permutation(shape[0]).tolist():
+		cols = sorted(rng.choice(shape[1], size = rng.integers(0, 4),
+			replace = False).tolist())
+		vals = rng.integers(1, 6, size = len(cols)).astype(float).tolist()
+		expected.set_row(row_id, cols, vals)
+		row_ids += [row_id] * len(cols)
+		col_ids += cols
+		values += vals
+	m = matrix_t.from_coo(shape, row_ids, col_ids, values)
+	assert m.shape == expected.shape
+	numpy.testing.assert_array_equal(m.toarray(), expected.toarray())
+	# rows are still updatable after the bulk construction
+	for x in [m, expected]:
+		x.set_row(2, [1, 6], [3.0, -1.0])
+		x.set_row(4, [], [])
+	numpy.testing.assert_array_equal(m.toarray(), expected.toarray())
+	numpy.testing.assert_array_equal(m.expand((10, 9)).toarray(),
+		expected.expand((10, 9)).toarray())
+	numpy.testing.assert_array_equal(m.submatrix([4, 2], [6, 1]),
+		expected.submatrix([4, 2], [6, 1]))
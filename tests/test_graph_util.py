@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+
+import numpy
+import pytest
+
+from facc import graph_util
+
+
+def _random_adj(seed: int, size: int, density: float) -> numpy.ndarray:
+	rng = numpy.random.default_rng(seed)
+	return rng.random((size, size)) < density
+
+
+def _reachability(adj: numpy.ndarray) -> numpy.ndarray:
+	# reach[u, v] if v is reachable from u, by at least one edge
+	reach = adj.copy()
+	for k in range(len(adj)):
+		reach |= numpy.outer(reach[:, k], reach[k])
+	return reach
+
+
+def _successor_lists(adj: numpy.ndarray) -> list:
+	return [numpy.flatnonzero(row).tolist() for row in adj]
+
+
+# (seed, size, density): from sparse DAG-alike to densely cyclic
+RANDOM_GRAPHS = [(seed, size, density) for seed in range(4)
+	for size, density in [(1, 0.5), (12, 0.05), (30, 0.04), (30, 0.1),
+	(25, 0.3)]]
+
+
+@pytest.mark.parametrize("seed, size, density", RANDOM_GRAPHS)
+def test_scc_equals_reachability(seed, size, density):
+	adj = _random_adj(seed, size, density)
+	reach = _reachability(adj)
+	sccs = graph_util.strongly_connected_components(_successor_lists(adj))
+	# a partition of all vertices
+	assert sorted(v for scc in sccs for v in scc) == list(range(size))
+	component = {v: k for k, scc in enumerate(sccs) for v in scc}
+	for u in range(size):
+		expected = {v for v in range(size) if reach[u, v] and reach[v, u]}
+		assert set(sccs[component[u]]) == (expected | {u})
+	# reverse topological order
+	for u, v in zip(*adj.nonzero()):
+		assert component[u] >= component[v]
+	# cyclic groups, by the dense graph class too
+	expected = sorted(sorted(scc) for scc in sccs
+		if reach[scc[0], scc[0]])
+	for groups in [graph_util.find_cyclic_groups(_successor_lists(adj)),
+			graph_util.UnweightedDirectedGraph(adj).\
+			get_cyclic_vertex_groups()]:
+		assert sorted(sorted(g) for g in groups) == expected
+
+
+def test_scc_deep_graph():
+	# far deeper than the recursion limit
+	size = 20000
+	successors = [[v + 1] for v in range(size - 1)] + [[0]]
+	groups = graph_util.find_cyclic_groups(successors)
+	assert groups == [set(range(size))]
+	successors[-1] = []
+	sccs = graph_util.strongly_connected_components(successors)
+	assert sccs == [[v] for v in reversed(range(size))]
+	assert graph_util.find_cyclic_groups(successors) == []
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_sparse_graph_equals_dense(seed):
+	rng = numpy.random.default_rng(seed)
+	size = 15
+	adj = _random_adj(seed, size, 0.15)
+	src, dest = adj.nonzero()
+	# duplicated edges are merged
+	src, dest = numpy.r_[src, src[:3]], numpy.r_[dest, dest[:3]]
+	dense = graph_util.UnweightedDirectedGraph.from_edges(size, src, dest)
+	sparse = graph_util.SparseUnweightedDirectedGraph.from_edges(size, src,
+		dest)
+	numpy.testing.assert_array_equal(dense.toarray(), adj)
+	for _ in range(20):
+		v = int(rng.integers(size))
+		ids = rng.choice(size, size = 3, replace = False).tolist()
+		op = rng.integers(3)
+		for g in [dense, sparse]:
+			if op == 0:
+				g.clear_vertex(v)
+			else:
+				g.set_neighbors(v, ids, ["down", "up"][op - 1])
+		numpy.testing.assert_array_equal(dense.toarray(), sparse.toarray())
+	for v in range(size):
+		for direction in ["up", "down"]:
+			assert sorted(dense.neighbors(v, direction))\
+				== list(sparse.neighbors(v, direction))
+	assert [sorted(i) for i in dense.get_successor_lists()]\
+		== [list(i) for i in sparse.get_successor_lists()]
+	assert sorted(map(sorted, dense.get_cyclic_vertex_groups()))\
+		== sorted(map(sorted, sparse.get_cyclic_vertex_groups()))
+	assert all(sparse[u, v] == dense[u, v] for u in range(size)
+		for v in range(size))
+
+
+def test_sparse_graph_copy_and_expand():
+	g = graph_util.SparseUnweightedDirectedGraph.from_edges(3, [0, 1],
+		[1, 2])
+	new = g.expand(5)
+	assert len(new) == 5 and new.shape == (5, 5)
+	new.set_neighbors(4, [0, 2])
+	new.clear_vertex(1)
+	assert g.toarray().nonzero()[0].tolist() == [0, 1]
+	assert g.neighbors(1, "up") == (0, )
+	assert new.toarray().nonzero()[0].tolist() == [4, 4]
+	with pytest.raises(ValueError):
+		g.expand(2)
+	with pytest.raises(ValueError):
+		g.neighbors(0, "both")
+
+
+def _random_bipartite(seed: int, shape: tuple, density: float) -> tuple:
+	# dense (row -> column, column -> row) edge matrices, both rows by columns
+	rng = numpy.random.default_rng(seed)
+	return rng.random(shape) < density, rng.random(shape) < density
+
+
+def _bipartite_index(down: numpy.ndarray, up: numpy.ndarray)\
+		-> graph_util.BipartiteIndex:
+	return graph_util.BipartiteIndex.from_edges(down.shape, down.nonzero(),
+		up.nonzero())
+
+
+def _row_adj(down: numpy.ndarray, up: numpy.ndarray) -> numpy.ndarray:
+	# row -> row, through any column
+	return (down.astype(int) @ up.T.astype(int)) > 0
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_bipartite_index_equals_dense(seed):
+	down, up = _random_bipartite(seed, (20, 14), 0.1)
+	index = _bipartite_index(down, up)
+	adj = _row_adj(down, up)
+	reach = _reachability(adj)
+	for r in range(20):
+		assert list(index.row_neighbors(r, "down"))\
+			== numpy.flatnonzero(down[r]).tolist()
+		assert list(index.row_neighbors(r, "up"))\
+			== numpy.flatnonzero(up[r]).tolist()
+		assert index.row_successors(r, "down")\
+			== set(numpy.flatnonzero(adj[r]).tolist())
+		assert index.row_successors(r, "up")\
+			== set(numpy.flatnonzero(adj[:, r]).tolist())
+	for c in range(14):
+		assert list(index.col_neighbors(c, "down"))\
+			== numpy.flatnonzero(up[:, c]).tolist()
+		assert list(index.col_neighbors(c, "up"))\
+			== numpy.flatnonzero(down[:, c]).tolist()
+	# rows reachable from columns, directly or through other rows
+	for cols in [[0], [3, 5], list(range(14))]:
+		direct = up[:, cols].any(axis = 1)
+		expected = direct | reach[direct].any(axis = 0)
+		assert index.reachable_rows(cols, "down")\
+			== set(numpy.flatnonzero(expected).tolist())
+		direct = down[:, cols].any(axis = 1)
+		expected = direct | reach[:, direct].any(axis = 1)
+		assert index.reachable_rows(cols, "up")\
+			== set(numpy.flatnonzero(expected).tolist())
+	# cyclic groups, also restricted to a subset of rows
+	for rows in [None, list(range(0, 20, 2))]:
+		sub = numpy.arange(20) if rows is None else numpy.asarray(rows)
+		expected = graph_util.find_cyclic_groups(_successor_lists(\
+			adj[numpy.ix_(sub, sub)]))
+		expected = sorted(sorted(sub[list(g)].tolist()) for g in expected)
+		assert sorted(map(sorted, index.get_cyclic_row_groups(rows)))\
+			== expected
+
+
+def test_bipartite_index_set_row():
+	down, up = _random_bipartite(0, (10, 8), 0.2)
+	index = _bipartite_index(down, up)
+	old = index.copy()
+	index = index.expand((12, 9))
+	down = numpy.pad(down, ((0, 2), (0, 1)))
+	up = numpy.pad(up, ((0, 2), (0, 1)))
+	for row, down_cols, up_cols in [(3, [0, 8], [1]), (11, [2], [3, 4]),
+			(0, [], [])]:
+		index.set_row(row, down_cols, up_cols)
+		down[row], up[row] = False, False
+		down[row, down_cols], up[row, up_cols] = True, True
+	index.clear_row(5)
+	down[5], up[5] = False, False
+	expected = _bipartite_index(down, up)
+	for r in range(12):
+		for direction in ["down", "up"]:
+			assert index.row_neighbors(r, direction)\
+				== expected.row_neighbors(r, direction)
+	for c in range(9):
+		for direction in ["down", "up"]:
+			assert index.col_neighbors(c, direction)\
+				== expected.col_neighbors(c, direction)
+	# the copy is untouched
+	assert old.shape == (10, 8)
+	assert old.row_neighbors(3, "down")\
+		== tuple(numpy.flatnonzero(_random_bipartite(0, (10, 8),
+		0.2)[0][3]).tolist())
+	with pytest.raises(IndexError):
+		index.set_row(12, [], [])
+	with pytest.raises(ValueError):
+		index.expand((11, 9))
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_reachable_row_mask_equals_traversal(seed):
+	down, up = _random_bipartite(seed, (25, 18), 0.08)
+	index = _bipartite_index(down, up)
+	rng = numpy.random.default_rng(seed)
+	for k in range(30):
+		cols = rng.choice(18, size = rng.integers(0, 4), replace = False)
+		for direction in ["down", "up"]:
+			mask = index.reachable_row_mask(cols.tolist(), direction)
+			assert graph_util.bitset_to_ids(mask)\
+				== sorted(index.reachable_rows(cols.tolist(), direction))
+		if k % 10 == 9:
+			# the memo is dropped on modification
+			row = int(rng.integers(25))
+			index.set_row(row, rng.choice(18, size = 2).tolist(),
+				rng.choice(18, size = 2).tolist())
+	with pytest.raises(ValueError):
+		index.reachable_row_mask([0], "both")
+
+
+def test_bitset_to_ids():
+	assert graph_util.bitset_to_ids(0) == []
+	assert graph_util.bitset_to_ids(0b1010) == [1, 3]
+	rng = numpy.random.default_rng(0)
+	for _ in range(20):
+		ids = sorted(set(rng.integers(0, 300, size = 20).tolist()))
+		assert graph_util.bitset_to_ids(sum(1 << i for i in ids)) == ids
+
+
+@pytest.mark.parametrize("seed, size, density", RANDOM_GRAPHS)
+def test_condensation_dag(seed, size, density):
+	adj = _random_adj(seed, size, density)
+	reach = _reachability(adj)
+	cond = graph_util.CondensationDAG(_successor_lists(adj))
+	assert sorted(map(sorted, cond.components)) == sorted(map(sorted,
+		graph_util.strongly_connected_components(_successor_lists(adj))))
+	assert len(cond) == len(cond.components)
+	for k, comp in enumerate(cond.components):
+		assert all(cond.component_of[v] == k for v in comp)
+		assert cond.cyclic[k] == bool(reach[comp[0], comp[0]])
+	# edges between components, only towards latter ones
+	edges = {(cond.component_of[u], cond.component_of[v])
+		for u, v in zip(*adj.nonzero())}
+	edges = {(a, b) for a, b in edges if a != b}
+	assert all(a < b for a, b in edges)
+	for k in range(len(cond)):
+		assert list(cond.successors[k]) == sorted(b for a, b in edges
+			if a == k)
+		assert list(cond.predecessors[k]) == sorted(a for a, b in edges
+			if b == k)
+	# level is the longest path from any source
+	levels = [0] * len(cond)
+	for a, b in sorted(edges):
+		levels[b] = max(levels[b], levels[a] + 1)
+	assert cond.levels == levels
+	groups = cond.get_level_groups()
+	assert sorted(sum(groups, [])) == list(range(len(cond)))
+	assert all(levels[k] == lv for lv, g in enumerate(groups) for k in g)
+
+
+def test_condensation_dag_empty():
+	cond = graph_util.CondensationDAG([])
+	assert len(cond) == 0
+	assert cond.get_level_groups() == []
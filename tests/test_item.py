@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import itertools
+import pickle
+
+import numpy
+import pytest
+
+import facc
+from facc.item import Item, ItemFlags
+
+
+FLAGS = ["product_of_complex_recipe", "cyclic_product", "trivial",
+	"forced_raw"]
+
+
+def _flag_values(flags: ItemFlags) -> dict:
+	return {f: getattr(flags, f) for f in FLAGS}
+
+
+def test_slotted():
+	recipe = facc.Recipe({"a": 1}, {"b": 2}, "crafting", 1.0)
+	item = Item("b", product_of = ["b"])
+	for obj in [recipe, item, item.flags]:
+		assert not hasattr(obj, "__dict__")
+		with pytest.raises(AttributeError):
+			obj.no_such_attr = 1
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_packed_flags_equal_reference(seed):
+	rng = numpy.random.default_rng(seed)
+	flags, expected = ItemFlags(), dict.fromkeys(FLAGS, False)
+	for _ in range(50):
+		f, v = FLAGS[rng.integers(4)], bool(rng.integers(2))
+		setattr(flags, f, v)
+		expected[f] = v
+		assert _flag_values(flags) == expected
+	copied = flags.copy()
+	assert _flag_values(copied) == expected
+	copied.trivial = not copied.trivial
+	assert _flag_values(flags) == expected
+
+
+def test_item_flag_methods():
+	for values in itertools.product([False, True], repeat = 2):
+		item = Item("x", product_of = ["x"])
+		item.setflag_trivial(values[0])
+		item.setflag_forced_raw(values[1])
+		assert (item.is_trivial(), item.is_forced_raw()) == values
+		assert item.is_raw() == any(values)
+		assert item.is_raw(ignore_trivial = True) == values[1]
+
+
+def test_pickle_round_trip():
+	recipe = facc.Recipe({"a": 1, "c": 2}, {"b": 2, "c": 3}, "crafting", 1.5,
+		"r")
+	item = Item("b", input_of = ["s"], product_of = ["r"])
+	item.setflag_cyclic_product(True)
+	item.setflag_forced_raw(True)
+	new_recipe, new_item = pickle.loads(pickle.dumps((recipe, item)))
+	for attr in ["name", "category", "craft_time", "inputs", "products"]:
+		assert getattr(new_recipe, attr) == getattr(recipe, attr)
+	for attr in ["name", "input_of", "product_of"]:
+		assert getattr(new_item, attr) == getattr(item, attr)
+	assert _flag_values(new_item.flags) == _flag_values(item.flags)
+	assert recipe.copy(net_yield = True).inputs == {"a": 1}
+	assert recipe.copy(net_yield = True).products == {"b": 2, "c": 1}
+
+
+def test_names_interned():
+	recipe = facc.Recipe({"".join(["iron", "-plate"]): 1},
+		{"".join(["iron", "-gear"]): 1}, "crafting", 0.5)
+	item = Item("".join(["iron", "-plate"]))
+	assert next(iter(recipe.inputs)) is item.name
+	assert recipe.name is next(iter(recipe.products))
+
+
+def test_flags_bound_to_store():
+	store = facc.item.ItemFlagStore(2)
+	flags = ItemFlags()
+	flags.trivial = True
+	flags.bind(store, 1)
+	assert flags.is_bound_to(store)
+	assert store.bits.tolist() == [0, ItemFlags._flag_bits_["trivial"]]
+	# array writes are seen by the bound flags
+	store.bits[1] |= ItemFlags._flag_bits_["cyclic_product"]
+	assert flags.cyclic_product and flags.trivial
+	flags.forced_raw = True
+	store.resize(4)
+	assert store.bits.tolist()[2:] == [0, 0]
+	assert flags.forced_raw and flags.is_bound_to(store)
+	copied = flags.copy()
+	assert not copied.is_bound_to(store)
+	flags.unbind()
+	store.bits[:] = 0
+	for f in [flags, copied]:
+		assert _flag_values(f) == dict(product_of_complex_recipe = False,
+			cyclic_product = True, trivial = True, forced_raw = True)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+import pickle
+
+import numpy
+import pytest
+
+import facc
+from conftest import make_args, make_recipes
+
+
+TARGETS = {"circuit": 2.0, "plastic": 3.0, "fuel-cell": 1.0}
+
+
+def _calculate(recipe_set, optim_args, targets = TARGETS) -> tuple:
+	return facc.ProductionProfiler(recipe_set).calculate_targets(targets,
+		optim_args = dict(optim_args))
+
+
+def _assert_balanced(recipe_set, targets, execs, raws, wastes) -> None:
+	# for each Item, production - consumption = target + waste - raw input
+	net = dict.fromkeys(recipe_set.iterate_items(), 0.0)
+	for r, v in execs.items():
+		recipe = recipe_set.get_recipe(r)
+		for i, c in recipe.products.items():
+			net[i] += v * c
+		for i, c in recipe.inputs.items():
+			net[i] -= v * c
+	for i, v in net.items():
+		expected = targets.get(i, 0.0) + wastes.get(i, 0.0) - raws.get(i, 0.0)
+		assert v == pytest.approx(expected, rel = 1e-6, abs = 1e-6), i
+	assert all(v >= -1e-9 for d in [execs, raws, wastes] for v in d.values())
+
+
+# targets in cyclic groups are excluded, as these are consumed by the group
+@pytest.mark.parametrize("targets", [{"circuit": 1.0},
+	{"circuit": 3.0, "iron-plate": 1.0}, {"gas": 4.0, "plastic": 1.0},
+	{"uranium": 2.0, "copper-cable": 5.0}])
+def test_profile_balanced(recipe_set, optim_args, targets):
+	_, execs, raws, wastes = _calculate(recipe_set, optim_args, targets)
+	_assert_balanced(recipe_set, targets, execs, raws, wastes)
+
+
+@pytest.mark.parametrize("targets", [{"rocket-part": 1.0},
+	{"production-science-pack": 2.0, "utility-science-pack": 3.0},
+	{"processing-unit": 1.0, "plastic-bar": 5.0}])
+def test_database_profile_balanced(factorious, optim_args, targets):
+	args = make_args(factorious, "--no-cache", "--no-default-trivial",
+		":".join("%s,%r" % i for i in targets.items()))
+	recipe_set = factorious["load_compiled_recipe_set"](args)
+	profiler = facc.ProductionProfiler(recipe_set)
+	_, execs, raws, wastes = profiler.calculate_targets(targets,
+		optim_args = factorious["get_optim_args"](args))
+	_assert_balanced(recipe_set, targets, execs, raws, wastes)
+
+
+def test_add_targets_equals_add_target(recipe_set):
+	together = facc.ProductionProfiler(recipe_set)
+	together.add_targets(TARGETS)
+	one_by_one = facc.ProductionProfiler(recipe_set)
+	for k, v in TARGETS.items():
+		one_by_one.add_target(k, v)
+	for a, b in zip([together._recipe_execs, together._raw_inputs,
+			together._linprog_resolves], [one_by_one._recipe_execs,
+			one_by_one._raw_inputs, one_by_one._linprog_resolves]):
+		assert a.keys() == b.keys()
+		for k, v in a.items():
+			assert b[k] == pytest.approx(v, rel = 1e-12)
+	with pytest.raises(facc.TargetItemNotFoundError):
+		together.add_targets({"circuit": 1.0, "steam": 1.0})
+
+
+def test_diamond_chain_expanded_once(optim_args):
+	# each level consumes both items of the level below, i.e. 2 ** depth
+	# paths from the top to the raw material
+	depth = 40
+	R = facc.Recipe
+	recipes = [R({"ore": 1}, {"a0": 1}, "crafting", 1.0, "a0"),
+		R({"ore": 1}, {"b0": 1}, "crafting", 1.0, "b0")]
+	for k in range(1, depth):
+		for n in "ab":
+			recipes.append(R({"a%d" % (k - 1): 1, "b%d" % (k - 1): 1},
+				{"%s%d" % (n, k): 1}, "crafting", 1.0, "%s%d" % (n, k)))
+	recipe_set = facc.RecipeSet(recipes)
+	_, execs, raws, _ = facc.ProductionProfiler(recipe_set).calculate_targets(\
+		{"a%d" % (depth - 1): 1.0}, optim_args = optim_args)
+	assert raws == {"ore": 2.0 ** (depth - 1)}
+	assert execs["a0"] == execs["b0"] == 2.0 ** (depth - 2)
+
+
+def _assert_profiles_close(a: dict, b: dict) -> None:
+	assert a.keys() == b.keys()
+	for k, v in a.items():
+		assert b[k] == pytest.approx(v, rel = 1e-9)
+
+
+def test_unit_profile_scales(recipe_set, optim_args):
+	_, execs_1, raws_1, _ = _calculate(recipe_set, optim_args,
+		{"circuit": 2.0})
+	_, execs_2, raws_2, _ = _calculate(recipe_set, optim_args,
+		{"circuit": 5.0})
+	_assert_profiles_close(execs_2, {k: v * 2.5 for k, v in execs_1.items()})
+	_assert_profiles_close(raws_2, {k: v * 2.5 for k, v in raws_1.items()})
+	assert "circuit" in recipe_set.get_memo("unit_profile")
+
+
+def test_memo_invalidated_by_flags(recipe_set, optim_args):
+	_, _, raws, _ = _calculate(recipe_set, optim_args)
+	assert recipe_set.get_memo("unit_profile")
+	# flag set through Item
+	recipe_set.get_item("copper-cable").setflag_forced_raw(True)
+	assert recipe_set.get_memo("unit_profile") == {}
+	_, execs_raw, raws_raw, _ = _calculate(recipe_set, optim_args)
+	assert raws_raw["copper-cable"] == 6.0
+	assert "copper-cable" not in execs_raw
+	# and through RecipeSet
+	recipe_set.set_items_flag_value(["copper-cable"], "forced_raw", False)
+	assert recipe_set.get_memo("unit_profile") == {}
+	assert _calculate(recipe_set, optim_args)[2] == raws
+	recipe_set.set_items_flag_value(["iron-plate"], "trivial", True)
+	assert "iron-ore" not in _calculate(recipe_set, optim_args)[2]
+
+
+def test_memo_invalidated_by_recipes(recipe_set, optim_args):
+	expected = _calculate(recipe_set, optim_args)
+	old = recipe_set.remove_recipe("copper-cable")
+	assert recipe_set.get_memo("unit_profile") == {}
+	assert "copper-cable" in _calculate(recipe_set, optim_args)[2]
+	recipe_set.add_recipe(old)
+	assert _calculate(recipe_set, optim_args) == expected
+
+
+def test_memo_not_shared(recipe_set, optim_args):
+	_calculate(recipe_set, optim_args)
+	view = recipe_set.get_exclusion_view(["copper-cable"])
+	assert view.get_memo("unit_profile") == {}
+	assert "copper-cable" in _calculate(view, optim_args)[2]
+	assert "copper-cable" not in _calculate(recipe_set, optim_args)[2]
+	assert pickle.loads(pickle.dumps(recipe_set)).get_memo("unit_profile")\
+		== {}
+
+
+def test_memoized_equals_propagated(recipe_set):
+	profiler = facc.ProductionProfiler(recipe_set)
+	for item_name in recipe_set.iterate_items():
+		profiler.clear_current_profile()
+		profiler.add_targets({item_name: 7.0})
+		for memoized, propagated in zip([profiler._recipe_execs,
+				profiler._raw_inputs, profiler._linprog_resolves],
+				profiler._propagate_targets({item_name: 7.0})):
+			assert memoized.keys() == propagated.keys()
+			for k, v in propagated.items():
+				assert memoized[k] == pytest.approx(v, rel = 1e-12)
+
+
+def test_results_snapped(recipe_set, optim_args):
+	# 2 gas per plastic, from oil at 3 gas each
+	_, execs, raws, _ = _calculate(recipe_set, optim_args, {"plastic": 1.0})
+	assert raws["oil"] == execs["oil-gas"] == float("%.12g" % (2 / 3))
+
+
+def test_batch_equals_single(recipe_set, optim_args):
+	item_names = ["circuit", "plastic", "fuel-cell", "gas"]
+	counts = numpy.asarray([
+		[1, 0, 0, 0],
+		[2, 3, 1, 0],
+		[4, 6, 2, 0],  # same direction as above
+		[0, 1, 0, 5],
+		[0, 0, 0, 0],
+		[0.5, 7, 3, 2],
+	], dtype = float)
+	profiler = facc.ProductionProfiler(recipe_set)
+	profiler.calculate_targets({"circuit": 1.0},
+		optim_args = dict(optim_args))
+	cached = [dict(i) for i in profiler.get_current_profile()]
+	recipe_names, execs, raw_names, raws, waste_names, wastes\
+		= profiler.calculate_targets_batch(item_names, counts,
+		optim_args = optim_args)
+	assert execs.shape == (len(counts), len(recipe_names))
+	assert raws.shape == (len(counts), len(raw_names))
+	assert wastes.shape == (len(counts), len(waste_names))
+	for k, row in enumerate(counts):
+		_, single_execs, single_raws, single_wastes = _calculate(recipe_set,
+			optim_args, {i: c for i, c in zip(item_names, row) if c})
+		for names, batch, single in [(recipe_names, execs, single_execs),
+				(raw_names, raws, single_raws),
+				(waste_names, wastes, single_wastes)]:
+			batch = {i: v for i, v in zip(names, batch[k]) if v}
+			assert batch.keys() == {i for i, v in single.items() if v}
+			for i, v in single.items():
+				assert batch.get(i, 0.0) == pytest.approx(v, rel = 1e-9)
+	# cached results of the profiler are not touched
+	assert [dict(i) for i in profiler.get_current_profile()] == cached
+
+
+def test_batch_keeps_optim_args(recipe_set, optim_args):
+	recipe_set.set_items_flag_value(["coal"], "trivial", True)
+	weights = {"oil": 2.0}
+	optim_args["weights"] = weights
+	expected = dict(optim_args)
+	profiler = facc.ProductionProfiler(recipe_set)
+	_, execs, _, raws, _, _ = profiler.calculate_targets_batch(["plastic",
+		"gas"], [[1, 0], [0, 1], [2, 1]], optim_args = optim_args)
+	# neither replaced nor updated in place, e.g. by the trivial coal
+	assert optim_args == expected
+	assert optim_args["weights"] is weights
+	assert weights == {"oil": 2.0}
+	_, single_execs, _, _ = _calculate(recipe_set, optim_args, {"gas": 1.0})
+	assert execs[1].sum() == pytest.approx(sum(single_execs.values()))
+
+
+def test_batch_errors(recipe_set):
+	profiler = facc.ProductionProfiler(recipe_set)
+	with pytest.raises(ValueError):
+		profiler.calculate_targets_batch(["circuit", "plastic"], [[1, 2, 3]])
+	with pytest.raises(ValueError):
+		profiler.calculate_targets_batch(["circuit"], [1, 2])
+	with pytest.raises(facc.TargetItemNotFoundError):
+		profiler.calculate_targets_batch(["steam"], [[1]])
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+import glob
+import json
+import os
+
+import pytest
+
+import facc
+from conftest import make_args, make_recipes, recipe_set_state
+
+
+def _json_recipes(json_f: str) -> list:
+	with open(json_f, "r") as fh:
+		raws = json.load(fh)
+	return list(raws.values()) if isinstance(raws, dict) else raws
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+@pytest.mark.parametrize("json_f",
+	sorted(glob.glob("versions/recipe.*.json")))
+def test_stream_equals_json_load(factorious, json_f, chunk_size):
+	assert list(factorious["iterate_raw_recipes"](json_f,
+		chunk_size = chunk_size)) == _json_recipes(json_f)
+
+
+@pytest.mark.parametrize("content", [
+	'{}', ' [ ] ', '[{"a": 1}]',
+	'{"r1": {"n": 4.5, "m": [1e-3, -20]}, "r2": {}}\n',
+	'[\n{"s": "a,b}]"}\t,\r\n[1.25e10, true, null]\n]\n\n',
+])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 1 << 16])
+def test_stream_edge_cases(factorious, tmp_path, content, chunk_size):
+	json_f = tmp_path / "recipes.json"
+	json_f.write_text(content)
+	assert list(factorious["iterate_raw_recipes"](str(json_f),
+		chunk_size = chunk_size)) == _json_recipes(str(json_f))
+
+
+@pytest.mark.parametrize("content", ['', '4', '"recipes"', '[1, 2',
+	'{"a": 1} []', '{"a" 1}', '{1: 2}', '[1 2]'])
+@pytest.mark.parametrize("chunk_size", [1, 1 << 16])
+def test_stream_bad_json(factorious, tmp_path, content, chunk_size):
+	json_f = tmp_path / "recipes.json"
+	json_f.write_text(content)
+	with pytest.raises(json.JSONDecodeError):
+		list(factorious["iterate_raw_recipes"](str(json_f),
+			chunk_size = chunk_size))
+
+
+def test_overlay_view_equals_fresh_set(recipe_set):
+	base = recipe_set_state(recipe_set)
+	R = facc.Recipe
+	layer = [R({"copper-plate": 1}, {"copper-cable": 3}, "crafting", 0.5),
+		R({"circuit": 2, "plastic": 1}, {"board": 1}, "crafting", 5.0)]
+	overlay = recipe_set.get_overlay_view(layer, ["oil-gas", "no-such-recipe"])
+	names = {r.name for r in layer} | {"oil-gas"}
+	fresh = facc.RecipeSet([r for r in make_recipes() if r.name not in names]\
+		+ layer)
+	assert recipe_set_state(overlay) == recipe_set_state(fresh)
+	assert recipe_set_state(recipe_set) == base
+	# layers over layers
+	upper = overlay.get_overlay_view([R({"spent-cell": 3}, {"uranium": 2},
+		"centrifuging", 60.0, "reprocess")], ["board"])
+	overlay_state = recipe_set_state(overlay)
+	upper.remove_recipe("circuit")
+	assert recipe_set_state(overlay) == overlay_state
+	assert recipe_set_state(recipe_set) == base
+	assert recipe_set_state(upper)["coefs"]["reprocess"]\
+		== {"spent-cell": -3.0, "uranium": 2.0}
+
+
+MOD_LAYERS = [
+	{
+		"delete": ["coal-liquefaction", "no-such-recipe"],
+		"recipes": {
+			"iron-gear-wheel": {"category": "crafting", "name":
+				"iron-gear-wheel", "normal": {"craft_time": 1.0, "ingredients":
+				{"iron-plate": 1}, "results": {"iron-gear-wheel": 1}}},
+			"gear-box": {"category": "crafting", "name": "gear-box", "normal":
+				{"craft_time": 2.0, "ingredients": {"iron-gear-wheel": 4,
+				"plastic-bar": 1}, "results": {"gear-box": 1}}},
+		},
+	},
+	{
+		"delete": ["gear-box"],
+		"recipes": [{"category": "crafting", "name": "gear-box-2", "normal":
+			{"craft_time": 1.0, "ingredients": {"iron-gear-wheel": 2},
+			"results": {"gear-box": 1}}}],
+	},
+]
+
+
+def _write_mod_layers(tmp_path) -> list:
+	ret = []
+	for k, layer in enumerate(MOD_LAYERS):
+		ret.append(str(tmp_path / ("layer%d.json" % k)))
+		with open(ret[-1], "w") as fh:
+			json.dump(layer, fh)
+	return ret
+
+
+def _merged_recipe_set(factorious, args, n_layers: int) -> facc.RecipeSet:
+	raws = {r["name"]: r for r in _json_recipes(args.FACTORIO.RECIPE_JSON)\
+		+ args.FACTORIO.MADEUP_RECIPES}
+	for layer in MOD_LAYERS[:n_layers]:
+		for name in layer["delete"]:
+			raws.pop(name, None)
+		recipes = layer["recipes"]
+		for r in (recipes.values() if isinstance(recipes, dict) else recipes):
+			raws[r["name"]] = r
+	return factorious["get_recipe_set"](list(raws.values()))
+
+
+def test_mod_layers_equal_merged_database(factorious, tmp_path):
+	layers = _write_mod_layers(tmp_path)
+	cache_dir = str(tmp_path / "cache")
+	for n_layers in [2, 1, 0, 2]:
+		args = make_args(factorious, "inserter,10", "--cache-dir", cache_dir,
+			"--mod-layer", ":".join(layers[:n_layers]))
+		loaded = factorious["load_compiled_recipe_set"](args)
+		assert recipe_set_state(loaded)\
+			== recipe_set_state(_merged_recipe_set(factorious, args, n_layers))
+	# an entry per stack of layers
+	assert len(os.listdir(cache_dir)) == 3
+
+
+@pytest.mark.parametrize("layer", ["[]", '{"recipes": 1}', '{"remove": []}'])
+def test_bad_mod_layer(factorious, tmp_path, layer):
+	json_f = tmp_path / "layer.json"
+	json_f.write_text(layer)
+	with pytest.raises(ValueError):
+		factorious["load_mod_layer"](str(json_f))
@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+
+import collections
+import os
+import warnings
+
+import numpy
+import pytest
+
+import facc
+from conftest import make_args, make_recipes, recipe_set_state
+
+
+def _graph_edges(recipe_set: facc.RecipeSet) -> set:
+	graph = recipe_set.get_graph().toarray()
+	encode = recipe_set.recipe_encoder.encode
+	return {(a, b) for a in recipe_set.iterate_recipes()
+		for b in recipe_set.iterate_recipes()
+		if graph[encode([a])[0], encode([b])[0]]}
+
+
+@pytest.mark.parametrize("recipe_name", ["circuit", "copper-plate", "oil-gas",
+	"reprocess", "fuel-cell"])
+def test_remove_then_add_recipe(recipe_set, recipe_name):
+	# graph and matrix are loaded, thus updated incrementally
+	expected = recipe_set_state(recipe_set), _graph_edges(recipe_set)
+	generation = recipe_set.get_generation()
+	old = recipe_set.remove_recipe(recipe_name)
+	assert not recipe_set.has_recipe(recipe_name)
+	fresh = facc.RecipeSet([r for r in make_recipes()
+		if r.name != recipe_name])
+	assert (recipe_set_state(recipe_set), _graph_edges(recipe_set))\
+		== (recipe_set_state(fresh), _graph_edges(fresh))
+	recipe_set.add_recipe(old)
+	assert (recipe_set_state(recipe_set), _graph_edges(recipe_set))\
+		== expected
+	assert recipe_set.get_generation() > generation
+	recipe_set.verify(force = True)
+
+
+def test_remove_recipe_drops_items(recipe_set):
+	recipe_set.remove_recipe("oil-gas")
+	assert not recipe_set.has_item("oil")
+	assert recipe_set.get_item("gas").product_of == {"coal-gas"}
+	with pytest.raises(facc.InvalidRecipeSetError):
+		recipe_set.remove_recipe("oil-gas")
+
+
+def test_add_and_replace_recipe_errors(recipe_set):
+	with pytest.raises(facc.InvalidRecipeSetError):
+		recipe_set.add_recipe(facc.Recipe({"iron-ore": 2}, {"iron-plate": 1},
+			"smelting", 3.2))
+	with pytest.raises(facc.InvalidRecipeSetError):
+		recipe_set.replace_recipe(facc.Recipe({"stone": 2}, {"brick": 1},
+			"smelting", 3.2))
+	with pytest.raises(TypeError):
+		recipe_set.add_recipe("brick")
+
+
+def test_replace_recipe_keeps_manual_flags(recipe_set):
+	recipe_set.set_items_flag(["copper-cable"],
+		lambda i: i.setflag_forced_raw(True))
+	old = recipe_set.replace_recipe(facc.Recipe({"copper-plate": 1},
+		{"copper-cable": 3}, "crafting", 0.5))
+	assert old.products["copper-cable"] == 2
+	assert recipe_set.get_item("copper-cable").is_forced_raw()
+	assert recipe_set_state(recipe_set)["coefs"]["copper-cable"]\
+		== {"copper-plate": -1.0, "copper-cable": 3.0}
+
+
+def test_add_recipe_merges_cyclic_group(recipe_set):
+	assert list(recipe_set._cyclic_groups) == [frozenset(["fuel-cell",
+		"burn-cell", "reprocess"])]
+	# closes a loop over plastic and the gas recipes
+	recipe_set.add_recipe(facc.Recipe({"plastic": 1}, {"coal": 2},
+		"chemistry", 1.0, "recycle"))
+	assert sorted(map(sorted, recipe_set._cyclic_groups)) == [
+		["burn-cell", "fuel-cell", "reprocess"],
+		["coal-gas", "plastic", "recycle"]]
+	fresh = facc.RecipeSet(make_recipes() + [facc.Recipe({"plastic": 1},
+		{"coal": 2}, "chemistry", 1.0, "recycle")])
+	assert recipe_set_state(recipe_set) == recipe_set_state(fresh)
+
+
+def test_exclusion_view_isolated_from_base(recipe_set):
+	recipe_set.set_items_flag(["copper-cable"],
+		lambda i: i.setflag_trivial(True))
+	view = recipe_set.get_exclusion_view(["oil-gas", "reprocess"])
+	expected = recipe_set_state(view)
+	assert not view.has_recipe("oil-gas")
+	assert not view.has_item("oil")
+	assert view.get_item("copper-cable").is_trivial()
+	# the cyclic group is broken in the view only
+	assert expected["cyclic_groups"] == {}
+	assert recipe_set.get_item("fuel-cell").is_cyclic_product()
+	# mutating the base does not leak into the view
+	recipe_set.remove_recipe("copper-cable")
+	recipe_set.add_recipe(facc.Recipe({"iron-plate": 2}, {"gear": 1},
+		"crafting", 0.5))
+	recipe_set.set_items_flag(["iron-plate"],
+		lambda i: i.setflag_forced_raw(True))
+	assert recipe_set_state(view) == expected
+	# nor the other way around
+	base = recipe_set_state(recipe_set)
+	view.remove_recipe("circuit")
+	view.add_recipe(facc.Recipe({"oil": 1}, {"gas": 3}, "chemistry", 2.0,
+		"oil-gas"))
+	assert recipe_set_state(recipe_set) == base
+
+
+@pytest.mark.parametrize("excluded", [[], ["reprocess", "no-such-recipe"],
+	["circuit", "oil-gas", "coal-gas"]])
+def test_exclusion_view_equals_fresh_set(recipe_set, excluded):
+	view = recipe_set.get_exclusion_view(excluded)
+	fresh = facc.RecipeSet([r for r in make_recipes()
+		if r.name not in excluded])
+	assert recipe_set_state(view) == recipe_set_state(fresh)
+	assert _graph_edges(view) == _graph_edges(fresh)
+
+
+def test_exclusion_view_of_compiled_cache(tmp_path, factorious):
+	# all exclusion lists share a single cache entry
+	cache_dir = str(tmp_path)
+	for excluded in [[], ["-L"], ["-O", "-R", "rocket-part"]]:
+		args = make_args(factorious, "inserter,10", "--cache-dir", cache_dir,
+			*excluded)
+		loaded = factorious["load_compiled_recipe_set"](args)
+		raws = factorious["load_raw_recipes"](args.FACTORIO.RECIPE_JSON)\
+			+ args.FACTORIO.MADEUP_RECIPES
+		fresh = factorious["get_recipe_set"](raws,
+			excluded_recipes = args.refined_excluded_recipes)
+		assert recipe_set_state(loaded) == recipe_set_state(fresh)
+	assert len(os.listdir(cache_dir)) == 1
+
+
+@pytest.mark.parametrize("matrix_format", ["sparse", "auto"])
+def test_sparse_coef_matrix_equals_dense(matrix_format, monkeypatch,
+		optim_args):
+	dense = facc.RecipeSet(make_recipes(), coef_matrix_format = "dense")
+	# 'auto' selects sparse for any matrix larger than this
+	monkeypatch.setattr(facc.RecipeSet, "_sparse_coef_matrix_cells_", 0)
+	other = facc.RecipeSet(make_recipes(), coef_matrix_format = matrix_format)
+	assert isinstance(other.get_coef_matrix(),
+		facc.coef_matrix.SparseCoefficientMatrix)
+	assert recipe_set_state(dense) == recipe_set_state(other)
+	numpy.testing.assert_array_equal(dense.get_coef_matrix().toarray(),
+		other.get_coef_matrix().toarray())
+	rows, cols = [0, 2, 5], [1, 3, 4, 7]
+	numpy.testing.assert_array_equal(dense.get_coef_matrix().submatrix(rows,
+		cols), other.get_coef_matrix().submatrix(rows, cols))
+	# same optimization results
+	targets = {"circuit": 2.0, "plastic": 3.0, "fuel-cell": 1.0}
+	assert facc.ProductionProfiler(dense).calculate_targets(targets,
+		optim_args = dict(optim_args)) == facc.ProductionProfiler(other).\
+		calculate_targets(targets, optim_args = dict(optim_args))
+
+
+def test_sparse_coef_matrix_incremental():
+	dense = facc.RecipeSet(make_recipes(), coef_matrix_format = "dense")
+	sparse = facc.RecipeSet(make_recipes(), coef_matrix_format = "sparse")
+	for rs in [dense, sparse]:
+		# matrices loaded, then updated row by row
+		rs.get_coef_matrix()
+		rs.remove_recipe("oil-gas")
+		rs.add_recipe(facc.Recipe({"gas": 1, "iron-plate": 2},
+			{"pipe": 1}, "crafting", 0.5))
+	numpy.testing.assert_array_equal(dense.get_coef_matrix().toarray(),
+		sparse.get_coef_matrix().toarray())
+
+
+def _reference_coefs_and_edges(recipes: list) -> (dict, set):
+	# coefficients and graph edges straight from the Recipes
+	coefs = {}
+	for r in recipes:
+		coefs[r.name] = {i: -float(c) for i, c in r.inputs.items()}
+		coefs[r.name].update({i: float(c) for i, c in r.products.items()})
+	edges = {(a.name, b.name) for a in recipes for b in recipes
+		if set(a.products) & set(b.inputs)}
+	return coefs, edges
+
+
+@pytest.mark.parametrize("matrix_format", ["dense", "sparse"])
+@pytest.mark.parametrize("loaded", [False, True])
+def test_bulk_matrices_equal_reference(matrix_format, loaded):
+	recipes = make_recipes()
+	recipe_set = facc.RecipeSet(recipes, coef_matrix_format = matrix_format)
+	assert (recipe_set_state(recipe_set)["coefs"], _graph_edges(recipe_set))\
+		== _reference_coefs_and_edges(recipes)
+	# rebuilt after updates, from stale or released triplets
+	recipe_set = facc.RecipeSet(recipes, coef_matrix_format = matrix_format)
+	if loaded:
+		recipe_set.get_graph()
+		recipe_set.get_coef_matrix()
+	recipe_set.remove_recipe("circuit")
+	recipe_set.add_recipe(facc.Recipe({"circuit": 1, "plastic": 2},
+		{"board": 1}, "crafting", 1.0))
+	recipes = [r for r in recipes if r.name != "circuit"]\
+		+ [facc.Recipe({"circuit": 1, "plastic": 2}, {"board": 1},
+		"crafting", 1.0)]
+	coefs, edges = _reference_coefs_and_edges(recipes)
+	assert recipe_set_state(recipe_set)["coefs"] == coefs
+	assert _graph_edges(recipe_set) == edges
+
+
+def test_links_from_index(recipe_set):
+	assert recipe_set.get_directly_connected_recipes("circuit", "up")\
+		== {"iron-plate", "copper-cable"}
+	assert recipe_set.get_directly_connected_recipes("iron-plate", "down")\
+		== {"circuit", "fuel-cell"}
+	assert recipe_set.get_directly_connected_recipes("plastic", "up")\
+		== {"coal-gas", "oil-gas"}
+	assert set(recipe_set.fetch_recipes_in_dependency("circuit", "up"))\
+		== {"circuit", "iron-plate", "copper-plate", "copper-cable"}
+	_, edges = _reference_coefs_and_edges(make_recipes())
+	for r in recipe_set.iterate_recipes():
+		assert recipe_set.get_directly_connected_recipes(r, "down")\
+			== {b for a, b in edges if a == r}
+		assert recipe_set.get_directly_connected_recipes(r, "up")\
+			== {a for a, b in edges if b == r}
+
+
+def _reference_dependency(recipes: list, item_name: str, direction: str)\
+		-> set:
+	# traverse the Recipes, one Item at a time
+	ret, visited, stack = set(), {item_name}, [item_name]
+	while stack:
+		item = stack.pop()
+		for r in recipes:
+			src, dest = (r.products, r.inputs) if direction == "up"\
+				else (r.inputs, r.products)
+			if item in src and r.name not in ret:
+				ret.add(r.name)
+				for i in dest:
+					if i not in visited:
+						visited.add(i)
+						stack.append(i)
+	return ret
+
+
+def test_dependency_closures_equal_reference(recipe_set):
+	recipes = make_recipes()
+	for step in range(3):
+		for item in recipe_set.iterate_items():
+			for direction in ["up", "down"]:
+				assert set(recipe_set.fetch_recipes_in_dependency(item,
+					direction)) == _reference_dependency(recipes, item,
+					direction)
+		# memoized closures are invalidated by updates
+		if step == 0:
+			recipes.append(facc.Recipe({"plastic": 1}, {"coal": 2},
+				"chemistry", 1.0, "recycle"))
+			recipe_set.add_recipe(recipes[-1])
+		elif step == 1:
+			recipe_set.remove_recipe("copper-cable")
+			recipes = [r for r in recipes if r.name != "copper-cable"]
+	assert set(recipe_set.fetch_recipes_in_dependency_of_items(["circuit",
+		"plastic"], "up")) == _reference_dependency(recipes, "circuit", "up")\
+		| _reference_dependency(recipes, "plastic", "up")
+
+
+def test_condensation_of_recipes_and_items(recipe_set):
+	cond = recipe_set.get_condensation()
+	names = [recipe_set.decode_condensation_vertices(comp)
+		for comp in cond.components]
+	cyclic = [sorted(r) + sorted(i) for (r, i), c in zip(names, cond.cyclic)
+		if c]
+	assert cyclic == [["burn-cell", "fuel-cell", "reprocess", "fuel-cell",
+		"spent-cell", "uranium"]]
+	# Items before Recipes consuming them, and after Recipes producing them
+	position = {}
+	for k, (recipes, items) in enumerate(names):
+		position.update({("r", n): k for n in recipes})
+		position.update({("i", n): k for n in items})
+	for r in make_recipes():
+		assert all(position[("i", i)] <= position[("r", r.name)]
+			for i in r.inputs)
+		assert all(position[("r", r.name)] <= position[("i", i)]
+			for i in r.products)
+	# cached until the Recipes change
+	assert recipe_set.get_condensation() is cond
+	recipe_set.remove_recipe("reprocess")
+	cond = recipe_set.get_condensation()
+	assert not any(cond.cyclic)
+
+
+def test_generation(recipe_set):
+	generation = recipe_set.get_generation()
+	recipe_set.get_coef_matrix()
+	recipe_set.fetch_recipes_in_dependency("circuit", "up")
+	recipe_set.verify()
+	assert recipe_set.get_generation() == generation
+	for update in [lambda: recipe_set.remove_recipe("circuit"),
+			lambda: recipe_set.add_recipe(facc.Recipe({"iron-plate": 2},
+				{"gear": 1}, "crafting", 0.5)),
+			lambda: recipe_set.replace_recipe(facc.Recipe({"iron-plate": 4},
+				{"gear": 1}, "crafting", 0.5)),
+			recipe_set.refresh]:
+		update()
+		assert recipe_set.get_generation() > generation
+		generation = recipe_set.get_generation()
+
+
+@pytest.mark.parametrize("corrupt", ["recipe-input", "recipe-product",
+	"item-input-of", "item-product-of"])
+def test_verify_in_place_changes(recipe_set, corrupt):
+	recipe_set.verify()
+	if corrupt == "recipe-input":
+		recipe_set.get_recipe("circuit").inputs["gas"] = 1
+	elif corrupt == "recipe-product":
+		recipe_set.get_recipe("circuit").products["no-such-item"] = 1
+	elif corrupt == "item-input-of":
+		item = recipe_set.get_item("gas")
+		item.input_of = item.input_of | {"circuit"}
+	else:
+		item = recipe_set.get_item("gas")
+		item.product_of = item.product_of | {"no-such-recipe"}
+	# unnoticed until forced, as verified in the current generation
+	recipe_set.verify()
+	with pytest.raises(facc.InvalidRecipeSetError):
+		recipe_set.verify(force = True)
+
+
+def _cyclic_recipes(group: str) -> list:
+	R = facc.Recipe
+	if group == "perpetual":
+		# a loop producing more than it consumes
+		return [R({"x": 1}, {"y": 2}, "crafting", 1.0, "x-to-y"),
+			R({"y": 1}, {"x": 1}, "crafting", 1.0, "y-to-x")]
+	elif group == "fed":
+		# every recipe consumes an Item from outside of the group
+		return [R({"x": 1, "ore-a": 1}, {"y": 1}, "crafting", 1.0, "x-to-y"),
+			R({"y": 1, "ore-b": 1}, {"x": 1}, "crafting", 1.0, "y-to-x")]
+	elif group == "catalyst":
+		# kovarex alike, u235 is both input and product (catalyst) of enrich
+		return [R({"u235": 40, "u238": 5}, {"u235": 41, "u238": 2},
+				"centrifuging", 60.0, "enrich"),
+			R({"u235": 1}, {"u238": 1}, "centrifuging", 1.0, "deplete")]
+	raise ValueError(group)
+
+
+@pytest.mark.parametrize("group, structure, valid", [
+	("perpetual", None, False),
+	("fed", True, True),
+	("catalyst", None, True),
+])
+def test_cyclic_group_validity(group, structure, valid, monkeypatch):
+	monkeypatch.setattr(facc.RecipeSet, "_cyclic_group_validity_cache_", {})
+	recipes = _cyclic_recipes(group)
+	coefs = []
+	for r in recipes:
+		coef = collections.Counter(r.products)
+		coef.subtract(r.inputs)
+		coefs.append(coef)
+	assert facc.RecipeSet._check_cyclic_group_structure(coefs) is structure
+	assert facc.RecipeSet._check_cyclic_group_linprog(coefs) is valid
+	with warnings.catch_warnings(record = True) as caught:
+		warnings.simplefilter("always")
+		recipe_set = facc.RecipeSet(recipes)
+	assert (not valid) == any([issubclass(w.category, UserWarning)
+		and "perpetual" in str(w.message) for w in caught])
+	groups = list(recipe_set._cyclic_groups.items())
+	assert groups == [(frozenset(r.name for r in recipes), valid)]
+	# products unique to a valid cycle are cyclic products
+	for i in recipe_set.iterate_items(True):
+		assert i.is_cyclic_product() == (valid and bool(i.product_of))
+
+
+def test_cyclic_group_structure_perpetual():
+	# a recipe consuming nothing from the group makes it perpetual
+	coefs = [collections.Counter({"x": 1}), collections.Counter({"x": -1,
+		"y": 1})]
+	assert facc.RecipeSet._check_cyclic_group_structure(coefs) is False
+
+
+def test_cyclic_group_validity_cached(recipe_set, monkeypatch):
+	def fail(coefs):
+		raise AssertionError("cyclic group checked again")
+	monkeypatch.setattr(facc.RecipeSet, "_check_cyclic_group_linprog",
+		staticmethod(fail))
+	# same groups, decided already when building <recipe_set>
+	assert recipe_set_state(facc.RecipeSet(make_recipes()))\
+		== recipe_set_state(recipe_set)
+	recipe_set.copy().refresh()
+	recipe_set.get_exclusion_view(["circuit"])
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_cyclic_group_structure_agrees_with_linprog(seed):
+	rng = numpy.random.default_rng(seed)
+	n_decided = 0
+	for _ in range(100):
+		coefs = []
+		for _ in range(rng.integers(2, 4)):
+			values = rng.integers(-2, 3, size = 4).tolist()
+			coefs.append(collections.Counter({i: v for i, v
+				in zip(["x", "y", "z", "ore"], values) if v}))
+		structure = facc.RecipeSet._check_cyclic_group_structure(coefs)
+		if structure is not None:
+			n_decided += 1
+			assert structure is\
+				facc.RecipeSet._check_cyclic_group_linprog(coefs)
+	assert n_decided
+
+
+@pytest.mark.parametrize("version", ["0.15", "0.16", "0.17"])
+def test_database_cyclic_groups_valid(factorious, version):
+	args = make_args(factorious, "-v", version, "--no-cache", "iron-plate,1")
+	recipe_set = factorious["load_compiled_recipe_set"](args)
+	assert recipe_set._cyclic_groups
+	assert all(recipe_set._cyclic_groups.values())
+
+
+def test_copy_on_write(recipe_set):
+	recipe_set.set_items_flag(["copper-cable"],
+		lambda i: i.setflag_forced_raw(True))
+	coef_mat = recipe_set.get_coef_matrix()
+	expected = recipe_set_state(recipe_set), _graph_edges(recipe_set)
+	new = recipe_set.copy()
+	assert (recipe_set_state(new), _graph_edges(new)) == expected
+	# shared until modified
+	assert new.get_coef_matrix() is coef_mat
+	assert new.get_recipe("circuit") is recipe_set.get_recipe("circuit")
+	new.remove_recipe("oil-gas")
+	new.set_items_flag(["iron-plate"], lambda i: i.setflag_trivial(True))
+	assert (recipe_set_state(recipe_set), _graph_edges(recipe_set))\
+		== expected
+	# and the other way around
+	new_state = recipe_set_state(new)
+	recipe_set.add_recipe(facc.Recipe({"iron-plate": 2}, {"gear": 1},
+		"crafting", 0.5))
+	recipe_set.set_items_flag(["copper-cable"],
+		lambda i: i.setflag_forced_raw(False))
+	assert recipe_set_state(new) == new_state
+	fresh = facc.RecipeSet([r for r in make_recipes() if r.name != "oil-gas"])
+	fresh.set_items_flag(["copper-cable"],
+		lambda i: i.setflag_forced_raw(True))
+	fresh.set_items_flag(["iron-plate"], lambda i: i.setflag_trivial(True))
+	assert new_state == recipe_set_state(fresh)
+
+
+def test_copy_to_net_yield():
+	recipes = make_recipes() + _cyclic_recipes("catalyst")
+	recipe_set = facc.RecipeSet(recipes)
+	recipe_set.set_items_flag(["u238", "copper-cable"],
+		lambda i: i.setflag_trivial(True))
+	new = recipe_set.copy(net_yield = True)
+	fresh = facc.RecipeSet(recipes, net_yield = True)
+	fresh.set_items_flag(["u238", "copper-cable"],
+		lambda i: i.setflag_trivial(True))
+	assert recipe_set_state(new) == recipe_set_state(fresh)
+	assert recipe_set_state(new)["coefs"]["enrich"]\
+		== {"u235": 1.0, "u238": -3.0}
+
+
+def _assert_flag_queries_equal_items(recipe_set: facc.RecipeSet) -> None:
+	for flag in ["product_of_complex_recipe", "cyclic_product", "trivial",
+			"forced_raw", "actual_raw"]:
+		if flag == "actual_raw":
+			query = lambda i: i.is_actual_raw()
+		else:
+			query = lambda i: getattr(i.flags, flag)
+		for value in [True, False]:
+			assert sorted(recipe_set.query_items_by_flag(flag, value))\
+				== sorted(recipe_set.query_items(lambda i: query(i) == value))
+	items = [i for i in recipe_set.iterate_items(True)
+		if i.input_of or i.product_of]
+	item_ids = recipe_set.item_encoder.encode([i.name for i in items])
+	for ignore_trivial in [False, True]:
+		assert recipe_set.get_item_raw_mask(item_ids, ignore_trivial).tolist()\
+			== [i.is_raw(ignore_trivial) for i in items]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_flag_bitmaps_equal_items(recipe_set, seed):
+	rng = numpy.random.default_rng(seed)
+	names = sorted(recipe_set.iterate_items())
+	_assert_flag_queries_equal_items(recipe_set)
+	for step in range(12):
+		picked = rng.choice(names, size = 3).tolist()
+		flag = ["trivial", "forced_raw"][step % 2]
+		if step % 3:
+			recipe_set.set_items_flag_value(picked, flag, bool(step % 4))
+		else:
+			for i in picked:
+				getattr(recipe_set.get_item(i), "setflag_" + flag)(True)
+		if step == 4:
+			recipe_set.remove_recipe("copper-cable")
+			names.remove("copper-cable")
+		elif step == 6:
+			recipe_set = recipe_set.get_exclusion_view(["oil-gas"])
+		elif step == 8:
+			recipe_set = recipe_set.copy()
+			recipe_set.add_recipe(facc.Recipe({"copper-plate": 1},
+				{"copper-cable": 2}, "crafting", 0.5))
+		_assert_flag_queries_equal_items(recipe_set)
+	# Items created by name only
+	recipe_set.set_items_flag_value(["steam"], "trivial", True)
+	assert "steam" in recipe_set.query_items_by_flag("trivial")
+	with pytest.raises(ValueError):
+		recipe_set.set_items_flag_value(["gas"], "raw", True)
+	with pytest.raises(ValueError):
+		recipe_set.get_item_flag_mask("raw")
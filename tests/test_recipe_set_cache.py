@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import os
+import pickle
+
+import pytest
+
+import facc
+from conftest import make_args, make_recipes, recipe_set_state
+
+
+def test_save_load_round_trip(tmp_path, recipe_set):
+	cache = facc.CompiledRecipeSetCache(str(tmp_path / "cache"))
+	key = cache.make_key("db-hash", "normal")
+	assert not cache.has(key)
+	assert cache.load(key) is None
+	cache.save(key, recipe_set)
+	assert cache.has(key)
+	loaded = cache.load(key)
+	assert isinstance(loaded, facc.RecipeSet)
+	assert recipe_set_state(loaded) == recipe_set_state(recipe_set)
+	# no temporary files are left
+	assert os.listdir(str(tmp_path / "cache")) == [os.path.basename(\
+		cache._entry_path(key))]
+
+
+def test_make_key():
+	make_key = facc.CompiledRecipeSetCache.make_key
+	assert make_key("a", "normal", []) == make_key("a", "normal", [])
+	assert make_key("a", "normal", []) != make_key("a", "expensive", [])
+	assert make_key("a", "normal", []) != make_key("b", "normal", [])
+	# parts are separated, thus never ambiguous
+	assert make_key("ab", "c") != make_key("a", "bc")
+
+
+def test_format_version_in_key(monkeypatch):
+	key = facc.CompiledRecipeSetCache.make_key("a")
+	monkeypatch.setattr(facc.CompiledRecipeSetCache, "_format_version_",
+		facc.CompiledRecipeSetCache._format_version_ + 1)
+	assert facc.CompiledRecipeSetCache.make_key("a") != key
+
+
+def test_source_hash_in_key(monkeypatch):
+	cache_t = facc.CompiledRecipeSetCache
+	key = cache_t.make_key("a")
+	# computed again from the facc sources gives the same key
+	monkeypatch.setattr(cache_t, "_source_hash_", None)
+	assert cache_t.make_key("a") == key
+	assert len(cache_t._source_hash_) == 64
+	# any change of the sources gives another key
+	monkeypatch.setattr(cache_t, "_source_hash_", None)
+	monkeypatch.setattr(cache_t, "hash_file", staticmethod(lambda f: "-"))
+	assert cache_t.make_key("a") != key
+
+
+def test_hash_file(tmp_path):
+	f = tmp_path / "recipes.json"
+	f.write_text("[]")
+	h = facc.CompiledRecipeSetCache.hash_file(str(f), chunk_size = 1)
+	assert h == facc.CompiledRecipeSetCache.hash_file(str(f))
+	f.write_text("[ ]")
+	assert h != facc.CompiledRecipeSetCache.hash_file(str(f))
+
+
+@pytest.mark.parametrize("content", [b"", b"not a pickle",
+	pickle.dumps(["not", "a", "recipe set"])])
+def test_unusable_entry(tmp_path, content):
+	cache = facc.CompiledRecipeSetCache(str(tmp_path))
+	key = cache.make_key("db-hash")
+	with open(cache._entry_path(key), "wb") as fh:
+		fh.write(content)
+	assert cache.has(key)
+	assert cache.load(key) is None
+
+
+def test_save_type_error(tmp_path):
+	cache = facc.CompiledRecipeSetCache(str(tmp_path))
+	with pytest.raises(TypeError):
+		cache.save(cache.make_key("db-hash"), make_recipes())
+
+
+def test_load_compiled_recipe_set(tmp_path, factorious):
+	cache_dir = str(tmp_path / "cache")
+	args = make_args(factorious, "inserter,10", "--cache-dir", cache_dir)
+	built = factorious["load_compiled_recipe_set"](args)
+	assert len(os.listdir(cache_dir)) == 1
+	loaded = factorious["load_compiled_recipe_set"](args)
+	assert loaded is not built
+	expected = recipe_set_state(factorious["load_compiled_recipe_set"](\
+		make_args(factorious, "inserter,10", "--no-cache")))
+	assert recipe_set_state(built) == expected
+	assert recipe_set_state(loaded) == expected
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+import http.client
+import json
+import socket
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from conftest import make_args
+
+
+@pytest.fixture
+def service(factorious):
+	args = make_args(factorious, "--no-cache", "--serve", "0")
+	return factorious["CalculatorService"](args)
+
+
+def _batch_record(factorious, line: str, *argv) -> dict:
+	args = make_args(factorious, "--no-cache", "--batch", "-", *argv)
+	recipe_set = factorious["load_compiled_recipe_set"](args)
+	factorious["apply_maunal_item_flags"](recipe_set,
+		raw_items = args.refined_raws, trivial_items = args.refined_trivials)
+	prod_network = factorious["ExportableProductionNetwork"](recipe_set)
+	rec, = factorious["iterate_batch_results"](prod_network, [line], args)
+	return rec
+
+
+def _handle(service, req) -> (int, dict):
+	return service.handle_raw(json.dumps(req).encode("utf-8"))
+
+
+@pytest.mark.parametrize("options, argv", [
+	({}, []),
+	({"without_coal_liquefaction": True, "yield_level": "expensive"},
+		["-L", "-y", "expensive"]),
+	({"raw_material": ["plastic-bar"], "use_weight": {"crude-oil": 2}},
+		["--raw-material", "plastic-bar", "--use-weight", "crude-oil,2"]),
+	({"total_requirements": True}, ["--total-requirements"]),
+])
+def test_response_equals_batch_record(factorious, service, options, argv):
+	req = dict(id = "r1", targets = {"inserter": 10, "plastic-bar": 5},
+		**options)
+	expected = _batch_record(factorious, json.dumps(dict(id = "r1",
+		targets = req["targets"])), *argv)
+	for warm in [False, True]:
+		status, resp = _handle(service, req)
+		assert status == 200
+		timings = resp.pop("timings")
+		assert timings["warm"] is warm
+		assert timings["total"] >= timings["calculate"] >= 0
+		assert resp == expected
+	assert service.status()["loaded_recipe_sets"] == 1
+
+
+def test_bad_requests(service):
+	for data in [b"not json", b"[1, 2]", json.dumps(dict(targets = {},
+			no_such_option = 1)).encode(), json.dumps(dict(
+			targets = {"no-such-item": 1})).encode(), json.dumps(dict(
+			targets = {}, yield_level = "cheap")).encode()]:
+		status, resp = service.handle_raw(data)
+		assert status == 400
+		assert list(resp) == ["error"]
+
+
+def test_http_server(factorious, service):
+	server = factorious["ThreadingHTTPServer"](("127.0.0.1", 0),
+		factorious["CalculatorHTTPRequestHandler"])
+	server.service = service
+	thread = threading.Thread(target = server.serve_forever)
+	thread.start()
+	url = "http://127.0.0.1:%d/" % server.server_address[1]
+	try:
+		req = dict(id = 7, targets = {"inserter": 1})
+		with urllib.request.urlopen(url, json.dumps(req).encode()) as fh:
+			resp = json.load(fh)
+		assert resp["id"] == 7 and "recipe_execs" in resp
+		with pytest.raises(urllib.error.HTTPError) as e:
+			urllib.request.urlopen(url, b"{")
+		assert e.value.code == 400
+		assert "error" in json.load(e.value)
+		with urllib.request.urlopen(url) as fh:
+			assert json.load(fh)["loaded_recipe_sets"] == 1
+		# missing, non-numeric, negative or too large Content-Length
+		for length in [None, "x", "-1", str(1 << 30)]:
+			conn = http.client.HTTPConnection("127.0.0.1",
+				server.server_address[1])
+			conn.putrequest("POST", "/")
+			if length is not None:
+				conn.putheader("Content-Length", length)
+			conn.endheaders()
+			resp = conn.getresponse()
+			assert resp.status == 400
+			assert "Content-Length" in json.load(resp)["error"]
+			conn.close()
+	finally:
+		server.shutdown()
+		server.server_close()
+		thread.join()
+
+
+def test_unix_stream_server(factorious, service, tmp_path, monkeypatch):
+	monkeypatch.setattr(factorious["CalculatorStreamRequestHandler"],
+		"max_request_bytes", 256)
+	sock_path = str(tmp_path / "sock")
+	server = factorious["ThreadingUnixStreamServer"](sock_path,
+		factorious["CalculatorStreamRequestHandler"])
+	server.service = service
+	thread = threading.Thread(target = server.serve_forever)
+	thread.start()
+	try:
+		with socket.socket(socket.AF_UNIX) as sock:
+			sock.connect(sock_path)
+			sock.sendall(b'{"id": 1, "targets": {"inserter": 1}}\n\n'
+				b'{"id": 2, "targets": {"inserter": 2}}\nnot json\n')
+			sock.shutdown(socket.SHUT_WR)
+			with sock.makefile("r") as fh:
+				resps = [json.loads(l) for l in fh]
+		# answered in order, empty lines skipped
+		assert [r.get("id") for r in resps[:2]] == [1, 2]
+		assert resps[1]["recipe_execs"] == {k: v * 2 for k, v\
+			in resps[0]["recipe_execs"].items()}
+		assert list(resps[2]) == ["error"]
+		# a line longer than allowed ends the stream
+		with socket.socket(socket.AF_UNIX) as sock:
+			sock.connect(sock_path)
+			sock.sendall(b" " * 512 + b"\n")
+			with sock.makefile("r") as fh:
+				resps = [json.loads(l) for l in fh]
+		assert len(resps) == 1 and "longer than" in resps[0]["error"]
+	finally:
+		server.shutdown()
+		server.server_close()
+		thread.join()
+
+
+@pytest.mark.parametrize("req", [
+	dict(id = "x", targets = {"no-such-item": 1}),
+	dict(id = "x", targets = {"inserter": 1}, tolerance = None),
+	dict(id = "x", targets = {"inserter": 1}, tolerance = "tight"),
+	dict(id = "x", targets = {"inserter": 1}, no_such_option = True),
+	dict(id = "x", targets = {"inserter": float("nan")}),
+	dict(id = "x", targets = {"inserter": float("-inf")}),
+])
+def test_error_echoes_id(service, req):
+	status, resp = _handle(service, req)
+	assert status == 400
+	assert resp == dict(id = "x", error = resp["error"])
+
+
+def test_mod_layer_request(factorious, tmp_path):
+	(tmp_path / "mods").mkdir()
+	layer = tmp_path / "mods" / "layer.json"
+	service = factorious["CalculatorService"](make_args(factorious,
+		"--no-cache", "--serve", "0", "--allow-mod-layer",
+		str(tmp_path / "mods")))
+	layer.write_text(json.dumps({"delete": ["inserter"], "recipes": [{
+		"category": "crafting", "name": "inserter", "normal": {"craft_time":
+		1.0, "ingredients": {"iron-plate": 3}, "results": {"inserter": 1}}}]}))
+	line = json.dumps(dict(id = 1, targets = {"inserter": 10}))
+	status, resp = _handle(service, dict(id = 1, targets = {"inserter": 10},
+		mod_layer = [str(layer)]))
+	assert status == 200
+	resp.pop("timings")
+	assert resp == _batch_record(factorious, line, "--mod-layer", str(layer))
+	assert resp["recipe_execs"] == {"inserter": 10.0,
+		"iron-plate": resp["recipe_execs"]["iron-plate"]}
+	# the base database stays shared, and untouched
+	status, resp = _handle(service, dict(id = 1, targets = {"inserter": 10}))
+	resp.pop("timings")
+	assert resp == _batch_record(factorious, line)
+	# only files directly in allowed directories
+	outside = tmp_path / "outside.json"
+	outside.write_text(layer.read_text())
+	(tmp_path / "mods" / "sub").mkdir()
+	(tmp_path / "mods" / "link.json").symlink_to(outside)
+	for path in ["/etc/passwd", str(outside),
+			str(tmp_path / "mods" / "link.json"),
+			str(tmp_path / "mods" / "sub" / ".." / ".." / "outside.json")]:
+		status, resp = _handle(service, dict(id = 2, targets = {"inserter": 1},
+			mod_layer = [path]))
+		assert status == 400
+		assert "not allowed" in resp["error"]
+
+
+def test_mod_layer_not_allowed_by_default(service):
+	status, resp = _handle(service, dict(targets = {"inserter": 1},
+		mod_layer = ["/etc/passwd"]))
+	assert status == 400
+	assert resp == dict(error = "ValueError: mod layer '/etc/passwd' is not"
+		" allowed")
+
+
+def test_loaded_recipe_sets_bounded(factorious):
+	service = factorious["CalculatorService"](make_args(factorious,
+		"--no-cache", "--serve", "0", "--max-loaded", "2"))
+	keys = []
+	for excluded in [[], ["coal-liquefaction"], ["basic-oil-processing"],
+			[]]:
+		status, resp = _handle(service, dict(targets = {"inserter": 1},
+			without_recipe = excluded))
+		assert status == 200
+		keys.append(service._warm_key(factorious["request_to_args"](dict(
+			without_recipe = excluded), service._args)))
+	# least recently used first; the oldest is dropped with its lock and pool
+	assert list(service._recipe_sets) == keys[2:]
+	assert keys[1] not in service._key_locks
+	assert keys[1] not in service._idle_networks
+	assert service.status() == dict(loaded_base_recipe_sets = 1,
+		loaded_recipe_sets = 2, idle_networks = 2)
+	# loaded again when requested again
+	status, resp = _handle(service, dict(targets = {"inserter": 1},
+		without_recipe = ["coal-liquefaction"]))
+	assert resp["timings"]["warm"] is False
+	assert list(service._recipe_sets) == keys[3:] + keys[1:2]
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import ROOT_DIR, make_args
+
+
+# run in a fresh interpreter, reports the foreign packages loaded
+_PROBE = """
+import collections, collections.abc, runpy, sys
+if not hasattr(collections, "Iterable"):
+	collections.Iterable = collections.abc.Iterable
+sys.path.insert(0, ".")
+sys.argv = ["Factorious"] + sys.argv[1:]
+try:
+	if sys.argv[1:] == ["import"]:
+		import facc
+	else:
+		runpy.run_path("Factorious", run_name = "__main__")
+except SystemExit:
+	pass
+finally:
+	sys.stdout.flush()
+	sys.stderr.write(repr(sorted({"numpy", "scipy"} & set(sys.modules))))
+"""
+
+
+def _probe(*argv) -> tuple:
+	proc = subprocess.run([sys.executable, "-c", _PROBE] + list(argv),
+		cwd = ROOT_DIR, stdout = subprocess.PIPE, stderr = subprocess.PIPE,
+		universal_newlines = True)
+	return proc.stdout, proc.stderr.splitlines()[-1]
+
+
+@pytest.mark.parametrize("argv", [
+	["import"],
+	["--help"],
+	["--list-versions"],
+	["--list-items"],
+	["-v", "0.16", "--list-recipes"],
+	["--no-such-option"],
+])
+def test_no_numeric_imports(argv):
+	assert _probe(*argv)[1] == "[]"
+
+
+def _min_wall_time(argv: list, env: dict, repeat = 5) -> float:
+	ret = float("inf")
+	for i in range(repeat):
+		t = time.perf_counter()
+		subprocess.run(argv, cwd = ROOT_DIR, env = env,
+			stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+		ret = min(ret, time.perf_counter() - t)
+	return ret
+
+
+@pytest.mark.parametrize("argv, budget", [
+	(["import"], 0.050),
+	(["--list-items"], 0.150),
+	(["--help"], 0.150),
+])
+def test_startup_budget(argv, budget):
+	# measured as in README 'Start-up time': bytecode caches written, best of
+	# 5 runs, interpreter start-up excluded
+	env = {k: v for k, v in os.environ.items()
+		if k != "PYTHONDONTWRITEBYTECODE"}
+	_min_wall_time([sys.executable, "-c", _PROBE] + argv, env, repeat = 1)
+	interpreter = _min_wall_time([sys.executable, "-c", "pass"], env)
+	assert _min_wall_time([sys.executable, "-c", _PROBE] + argv, env)\
+		- interpreter <= budget
+
+
+@pytest.mark.parametrize("version", ["0.15", "0.16", "0.17"])
+def test_listing_equals_recipe_set(factorious, capsys, version):
+	with pytest.raises(SystemExit):
+		make_args(factorious, "-v", version, "--list-items", "--list-recipes")
+	lines = capsys.readouterr().out.splitlines()
+	assert lines[1].startswith("ITEMS >> ")
+	db = lines[1].split(" >> ")[1]
+	assert (".%s." % version) in db
+	n_items = lines.index("RECIPES >> " + db) - 1
+	recipe_set = factorious["get_recipe_set"](\
+		factorious["load_raw_recipes"](db))
+	assert lines[2:n_items] == sorted(recipe_set.iterate_items())
+	assert lines[n_items + 2:] == sorted(recipe_set.iterate_recipes())
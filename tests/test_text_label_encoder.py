@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import pickle
+
+import numpy
+import pytest
+
+import facc.text_label_encoder
+
+
+LABELS = ["iron-plate", "copper-cable", "circuit", "gas", "plastic"]
+
+
+@pytest.fixture
+def encoder() -> facc.text_label_encoder.TextLabelEncoder:
+	encoder = facc.text_label_encoder.TextLabelEncoder()
+	encoder.train(LABELS)
+	return encoder
+
+
+def test_bulk_round_trip(encoder):
+	labels = ["gas", "circuit", "gas", "plastic"]
+	ids = encoder.encode_array(labels)
+	assert ids.dtype.kind == "i"
+	assert ids.tolist() == encoder.encode(labels)
+	assert encoder.decode_array(ids).tolist() == labels
+	assert encoder.decode(ids) == labels
+	assert encoder.decode(ids.tolist()) == labels
+	# numpy str arrays are accepted
+	assert encoder.encode_array(numpy.asarray(labels)).tolist()\
+		== ids.tolist()
+
+
+def test_decode_array_keeps_shape(encoder):
+	ids = numpy.arange(len(LABELS)).reshape(-1, 1)
+	decoded = encoder.decode_array(ids)
+	assert decoded.shape == ids.shape
+	assert decoded.ravel().tolist() == sorted(LABELS)
+	assert encoder.decode_array([]).shape == (0,)
+
+
+def test_encode_unknown_label(encoder):
+	with pytest.raises(KeyError):
+		encoder.encode_array(["gas", "steam"])
+
+
+def test_extend_after_decode_array(encoder):
+	encoder.decode_array([0])
+	encoder.extend(["steam", "gas", "water"])
+	assert len(encoder) == len(LABELS) + 2
+	ids = encoder.encode_array(["steam", "water", "gas"])
+	assert ids.tolist()[:2] == [len(LABELS), len(LABELS) + 1]
+	assert encoder.decode_array(ids).tolist() == ["steam", "water", "gas"]
+
+
+def test_copy_and_pickle_isolated(encoder):
+	encoder.decode_array([0])
+	new = encoder.copy()
+	new.extend(["steam"])
+	assert "steam" not in encoder
+	assert encoder.decode_array(numpy.arange(len(encoder))).tolist()\
+		== sorted(LABELS)
+	loaded = pickle.loads(pickle.dumps(new))
+	assert loaded.decode_array(loaded.encode_array(["steam", "gas"])).\
+		tolist() == ["steam", "gas"]
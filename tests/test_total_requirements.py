@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import pytest
+
+import facc
+from conftest import make_args
+
+
+def _assert_rows_equal_propagated(recipe_set) -> None:
+	table = recipe_set.get_total_requirements()
+	profiler = facc.ProductionProfiler(recipe_set)
+	assert len(table) == len(list(recipe_set.iterate_items()))
+	for item_name in recipe_set.iterate_items():
+		_, raws, resolves = profiler._get_unit_profile(item_name)
+		for row, propagated in zip(table.get_requirements(item_name),
+				[raws, resolves]):
+			# no float noise, i.e. exactly the same non-zero entries
+			assert row.keys() == {k for k, v in propagated.items() if v},\
+				item_name
+			for k, v in row.items():
+				assert v == pytest.approx(propagated[k], rel = 1e-9)
+				assert v > 0.0
+
+
+def test_rows_equal_propagated(recipe_set):
+	_assert_rows_equal_propagated(recipe_set)
+	assert recipe_set.get_total_requirements().get_requirements("circuit")\
+		== ({"iron-ore": 1.0, "copper-ore": 1.5}, {})
+	assert recipe_set.get_total_requirements().get_requirements("plastic")\
+		== ({"coal": 1.0}, {"gas": 2.0})
+	# cyclic products and Items in cycles are deferred to the optimizer
+	for item_name in ["fuel-cell", "spent-cell", "uranium"]:
+		assert recipe_set.get_total_requirements().get_requirements(\
+			item_name) == ({}, {item_name: 1.0})
+
+
+@pytest.mark.parametrize("version", ["0.16", "0.17"])
+def test_database_rows_equal_propagated(factorious, version):
+	args = make_args(factorious, "--no-cache", "-v", version, "rocket-part,1")
+	_assert_rows_equal_propagated(factorious["load_compiled_recipe_set"](args))
+
+
+def test_database_oil_processing(factorious):
+	args = make_args(factorious, "--no-cache", "-v", "0.17", "rocket-part,1")
+	recipe_set = factorious["load_compiled_recipe_set"](args)
+	table = recipe_set.get_total_requirements()
+	# oil products are multi-source, and heavy-oil is in the cycle of
+	# coal-liquefaction; both are left to the optimizer
+	assert table.get_requirements("heavy-oil") == ({}, {"heavy-oil": 1.0})
+	assert table.get_requirements("lubricant") == ({}, {"heavy-oil": 1.0})
+	assert table.get_requirements("plastic-bar")\
+		== ({"coal": 0.5}, {"petroleum-gas": 10.0})
+	# unrelated columns are exactly absent, not near-zero noise
+	assert table.get_requirements("iron-plate") == ({"iron-ore": 1.0}, {})
+	raws, deferred = table.get_requirements("fusion-reactor-equipment")
+	assert deferred == {"petroleum-gas": pytest.approx(12000.0)}
+	assert "heavy-oil" not in deferred
+	assert table.matrix.data.min() > 0.0
+
+
+def test_calculate_equals_sum_of_rows(recipe_set):
+	table = recipe_set.get_total_requirements()
+	targets = {"circuit": 2.0, "plastic": 3.0, "fuel-cell": 1.0,
+		"iron-plate": 0.5}
+	expected = [{}, {}]
+	for item_name, count in targets.items():
+		for total, row in zip(expected, table.get_requirements(item_name)):
+			for k, v in row.items():
+				total[k] = total.get(k, 0.0) + v * count
+	for total, calculated in zip(expected, table.calculate(targets)):
+		assert calculated == pytest.approx(total, rel = 1e-12)
+	with pytest.raises(KeyError):
+		table.calculate({"steam": 1.0})
+
+
+def test_rebuilt_after_changes(recipe_set):
+	table = recipe_set.get_total_requirements()
+	assert recipe_set.get_total_requirements() is table
+	recipe_set.set_items_flag_value(["copper-cable"], "forced_raw", True)
+	assert recipe_set.get_total_requirements().get_requirements("circuit")\
+		== ({"iron-ore": 1.0, "copper-cable": 3.0}, {})
+	recipe_set.set_items_flag_value(["copper-cable"], "forced_raw", False)
+	recipe_set.remove_recipe("copper-cable")
+	assert recipe_set.get_total_requirements().get_requirements("circuit")\
+		== ({"iron-ore": 1.0, "copper-cable": 3.0}, {})
+	_assert_rows_equal_propagated(recipe_set)